@@ -0,0 +1,63 @@
+"""Parser throughput on the recorded corpus, in lines per second.
+
+    python benchmarks/bench_parsers.py [--min-time SECONDS]
+
+Each corpus file is decoded and parsed repeatedly for at least --min-time
+seconds; cp950 decoding is measured separately from parsing. "stream lines/s"
+feeds the raw lines one at a time, decoding each, as a running command's
+output is consumed.
+"""
+import argparse
+import time
+from corpus_cases import load_expected, read_raw, system_of
+import output_parsers
+
+
+def measure(func, argument, min_time):
+    """Calls func(argument) until ``min_time`` seconds have passed; returns calls per second."""
+    calls = 0
+    started = time.perf_counter()
+    while True:
+        func(argument)
+        calls += 1
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time:
+            return calls / elapsed
+
+
+def new_parser_for(name, count):
+    system = system_of(name)
+    if name.startswith("ping"):
+        return lambda: output_parsers.PingParser(count, system)
+    if name.startswith("tracert"):
+        return lambda: output_parsers.TraceParser(system)
+    return output_parsers.IpconfigParser
+
+
+def feed_lines(parser, lines):
+    for line in lines:
+        parser.feed(line)
+    return parser.result()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--min-time", type=float, default=0.5, help="seconds to run each measurement for")
+    args = parser.parse_args(argv)
+
+    print(f"{'corpus file':<26} {'lines':>5} {'decode lines/s':>15} {'parse lines/s':>14} {'stream lines/s':>15}")
+    for name, case in load_expected().items():
+        raw = read_raw(name)
+        output = output_parsers.decode_output(raw)
+        lines = len(output.splitlines())
+        decode_rate = measure(output_parsers.decode_output, raw, args.min_time) * lines
+        new_parser = new_parser_for(name, case.get("count", 4))
+        parse_rate = measure(lambda text: feed_lines(new_parser(), text.splitlines()), output, args.min_time) * lines
+        raw_lines = raw.splitlines(keepends=True)
+        stream_rate = measure(lambda data: feed_lines(new_parser(), map(output_parsers.decode_line, data)),
+                              raw_lines, args.min_time) * lines
+        print(f"{name:<26} {lines:>5} {decode_rate:>15,.0f} {parse_rate:>14,.0f} {stream_rate:>15,.0f}")
+
+
+if __name__ == "__main__":
+    main()
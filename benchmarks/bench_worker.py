@@ -0,0 +1,76 @@
+"""End-to-end DiagnosticWorker wall time against the fake ping command, for growing target counts.
+
+    python benchmarks/bench_worker.py [--targets 1,100,10000] [--locale linux|win_zh_tw|win_en]
+                                      [--delay SECONDS] [--loss P] [--count N] [--workers N]
+
+Each run gives a DiagnosticWorker a plan of one ping test per target. The plan
+goes through the scheduler, the system-ping fallback (fakebin/ping, which
+replays the chosen locale's output) and the output parser. It also covers the
+Qt signals that report each test. Needs PySide6.
+"""
+import argparse
+import os
+import tempfile
+import time
+from unittest import mock
+from corpus_cases import FAKEBIN_DIR, as_platform
+from PySide6.QtCore import QCoreApplication, QEventLoop
+import diagnostic_worker
+import network_diagnostics
+from config_manager import ConfigurationManager
+from diagnostic_plan import create_scheduler
+
+
+def ping_plan(target_count, count):
+    return [(f"ping_{index}", f"Ping {index}", f"10.{index >> 16 & 255}.{index >> 8 & 255}.{index & 255}",
+             network_diagnostics.ping_host, (f"10.{index >> 16 & 255}.{index >> 8 & 255}.{index & 255}",),
+             {"count": count, "timeout": 1000})
+            for index in range(target_count)]
+
+
+def run_worker(config_manager, plan, workers):
+    """Runs one DiagnosticWorker over ``plan``; returns (wall seconds, signals received)."""
+    signals = []
+    loop = QEventLoop()
+    with mock.patch.object(diagnostic_worker, "build_diagnostic_plan", return_value=plan):
+        worker = diagnostic_worker.DiagnosticWorker(config_manager)
+        worker.scheduler = create_scheduler(config_manager.snapshot(), max_workers=workers)
+        worker.info_update.connect(signals.append)
+        worker.record_update.connect(signals.append)
+        worker.finished.connect(loop.quit)
+        started = time.perf_counter()
+        worker.start()
+        loop.exec()
+        elapsed = time.perf_counter() - started
+        worker.wait()
+        worker.deleteLater()
+    return elapsed, len(signals)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--targets", default="1,100,10000", help="comma-separated target counts to run")
+    parser.add_argument("--locale", default="linux", choices=["linux", "win_zh_tw", "win_en"])
+    parser.add_argument("--delay", type=float, default=0.0, help="seconds the fake ping waits per reply")
+    parser.add_argument("--loss", type=float, default=0.0, help="probability the fake ping drops a reply")
+    parser.add_argument("--count", type=int, default=1, help="echo requests per target")
+    parser.add_argument("--workers", type=int, default=8, help="scheduler worker threads")
+    args = parser.parse_args(argv)
+
+    os.environ["PATH"] = FAKEBIN_DIR + os.pathsep + os.environ.get("PATH", "")
+    os.environ.update(FAKE_NET_LOCALE=args.locale, FAKE_NET_DELAY=str(args.delay), FAKE_NET_LOSS=str(args.loss))
+    app = QCoreApplication.instance() or QCoreApplication([]) # noqa: F841  (signals need an application)
+    with tempfile.TemporaryDirectory() as directory:
+        config_manager = ConfigurationManager(os.path.join(directory, "config.ini"))
+        config_manager.set_setting('TestParameters', 'TimeBudget', '0')
+        system = "Linux" if args.locale == "linux" else "Windows"
+        print(f"{'targets':>8} {'wall s':>9} {'targets/s':>10} {'signals':>8}")
+        # No ICMP engine, so every ping runs the fake command and its output parser
+        with mock.patch.object(network_diagnostics, "get_engine", return_value=None), as_platform(system):
+            for target_count in (int(value) for value in args.targets.split(",")):
+                elapsed, signals = run_worker(config_manager, ping_plan(target_count, args.count), args.workers)
+                print(f"{target_count:>8} {elapsed:>9.2f} {target_count / elapsed:>10.1f} {signals:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Recorded ping/tracert/traceroute/ipconfig output and the results the parsers should produce.
+
+Files in corpus/ are stored as the commands print them: Windows output
+(zh-TW and English) in cp950 with CRLF line endings, Linux output in ASCII.
+corpus/expected.json holds the expected ping_host result fields, tracert_host
+hops or get_network_info dict for each file.
+"""
+import contextlib
+import json
+import os
+import sys
+from unittest import mock
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+CORPUS_DIR = os.path.join(BENCHMARK_DIR, "corpus")
+FAKEBIN_DIR = os.path.join(BENCHMARK_DIR, "fakebin")
+sys.path.insert(0, os.path.join(os.path.dirname(BENCHMARK_DIR), "src"))
+
+import network_diagnostics # noqa: E402  (needs the src path above)
+import output_parsers # noqa: E402
+
+
+def load_expected():
+    with open(os.path.join(CORPUS_DIR, "expected.json"), encoding="utf-8") as expected_file:
+        return json.load(expected_file)
+
+
+def read_raw(name):
+    with open(os.path.join(CORPUS_DIR, name), "rb") as corpus_file:
+        return corpus_file.read()
+
+
+def read_output(name):
+    """The file decoded to text, as output_parsers.decode_output decodes command output."""
+    return output_parsers.decode_output(read_raw(name))
+
+
+def system_of(name):
+    return "Windows" if "_win" in name else "Linux"
+
+
+@contextlib.contextmanager
+def as_platform(system):
+    """Makes network_diagnostics parse as if running on ``system`` ("Windows" or "Linux")."""
+    with mock.patch.object(network_diagnostics.platform, "system", return_value=system):
+        yield
+
+
+def parser_for(name, count=4):
+    """A one-argument function parsing the decoded output of corpus file ``name``.
+
+    ipconfig output goes through get_network_info's adapter selection too, so
+    that one must be called inside as_platform("Windows").
+    """
+    system = system_of(name)
+    if name.startswith("ping"):
+        return lambda output: output_parsers.parse_ping(output, count, system)
+    if name.startswith("tracert"):
+        return lambda output: output_parsers.parse_trace(output, system)
+
+    def _parse_ipconfig(output):
+        def _stream_command(command, parser, *_):
+            for line in output.splitlines():
+                parser.feed(line)
+            return 0
+        with mock.patch.object(network_diagnostics, "_stream_command", _stream_command):
+            return network_diagnostics.get_network_info()
+    return _parse_ipconfig
+
+
+def parse(name, count=4):
+    with as_platform(system_of(name)):
+        return parser_for(name, count)(read_output(name))
@@ -0,0 +1,138 @@
+"""Stand-in for ping, traceroute/tracert and ipconfig that prints output in the corpus formats.
+
+Usage: fake_net.py ping|traceroute|tracert|ipconfig [the real command's arguments]
+(the wrappers next to this file pass the tool name). Put this directory first in
+PATH to run network_diagnostics against it. Environment variables:
+
+    FAKE_NET_LOCALE  linux, win_zh_tw or win_en (default linux); Windows locales
+                     print cp950 with CRLF line endings
+    FAKE_NET_DELAY   seconds to wait before each echo reply or hop line (default 0)
+    FAKE_NET_LOSS    probability that an echo request or hop gets no reply (default 0)
+    FAKE_NET_RTT     round-trip time printed for replies, in ms (default 12)
+    FAKE_NET_SEED    random seed, for reproducible loss
+"""
+import os
+import random
+import re
+import sys
+import time
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "corpus")
+
+# Line formats of the recorded ping output, per locale
+PING_FORMATS = {
+    "linux": {
+        "header": "PING {host} ({host}) 56(84) bytes of data.",
+        "reply": "64 bytes from {host}: icmp_seq={seq} ttl=117 time={rtt:.1f} ms",
+        "lost": None, # Linux ping prints nothing for a lost request
+        "summary": ["", "--- {host} ping statistics ---",
+                    "{sent} packets transmitted, {received} received, {loss}% packet loss, time {elapsed}ms"],
+        "rtt_summary": "rtt min/avg/max/mdev = {min:.3f}/{avg:.3f}/{max:.3f}/0.000 ms",
+    },
+    "win_zh_tw": {
+        "header": "\nPing {host} (使用 32 位元組的資料):",
+        "reply": "回覆自 {host}: 位元組=32 時間={rtt:.0f}ms TTL=117",
+        "lost": "要求等候逾時。",
+        "summary": ["", "{host} 的 Ping 統計資料:",
+                    "    封包: 已傳送 = {sent}，已收到 = {received}, 已遺失 = {lost} ({loss}% 遺失)，"],
+        "rtt_summary": "大約的來回時間 (毫秒):\n    最小值 = {min:.0f}ms，最大值 = {max:.0f}ms，平均 = {avg:.0f}ms",
+    },
+    "win_en": {
+        "header": "\nPinging {host} with 32 bytes of data:",
+        "reply": "Reply from {host}: bytes=32 time={rtt:.0f}ms TTL=117",
+        "lost": "Request timed out.",
+        "summary": ["", "Ping statistics for {host}:",
+                    "    Packets: Sent = {sent}, Received = {received}, Lost = {lost} ({loss}% loss),"],
+        "rtt_summary": "Approximate round trip times in milli-seconds:\n"
+                       "    Minimum = {min:.0f}ms, Maximum = {max:.0f}ms, Average = {avg:.0f}ms",
+    },
+}
+TRACE_TIMEOUT_LINES = {
+    "linux": "{num:2d}  * * *",
+    "win_zh_tw": "{num:3d}     *        *        *     要求等候逾時。",
+    "win_en": "{num:3d}     *        *        *     Request timed out.",
+}
+_hop_line_pattern = re.compile(r"^\s*(\d+)\s")
+
+
+class Output:
+    def __init__(self, locale):
+        self.windows = locale.startswith("win")
+
+    def line(self, text=""):
+        text += "\n"
+        if self.windows:
+            sys.stdout.buffer.write(text.replace("\n", "\r\n").encode("cp950"))
+        else:
+            sys.stdout.buffer.write(text.encode("utf-8"))
+        sys.stdout.buffer.flush()
+
+
+def _option(args, names, default):
+    for index, arg in enumerate(args[:-1]):
+        if arg in names:
+            return args[index + 1]
+    return default
+
+
+def fake_ping(args, locale, output, delay, loss, rtt):
+    host = args[-1] if args else "127.0.0.1"
+    count = int(_option(args, ("-c", "-n"), 4))
+    formats = PING_FORMATS[locale]
+    output.line(formats["header"].format(host=host))
+    started = time.monotonic()
+    rtts = []
+    for seq in range(1, count + 1):
+        time.sleep(delay)
+        if random.random() < loss:
+            if formats["lost"]:
+                output.line(formats["lost"])
+            continue
+        sample = rtt * random.uniform(0.9, 1.1)
+        rtts.append(sample)
+        output.line(formats["reply"].format(host=host, seq=seq, rtt=sample))
+    fields = {"host": host, "sent": count, "received": len(rtts), "lost": count - len(rtts),
+              "loss": round(100 * (count - len(rtts)) / count), "elapsed": int((time.monotonic() - started) * 1000)}
+    for line in formats["summary"]:
+        output.line(line.format(**fields))
+    if rtts:
+        output.line(formats["rtt_summary"].format(min=min(rtts), avg=sum(rtts) / len(rtts), max=max(rtts)))
+    return 0 if rtts else 1
+
+
+def replay(name, output, delay=0.0, loss=0.0, locale=None):
+    """Prints a corpus file line by line; with ``locale``, hop lines are delayed and dropped like replies."""
+    with open(os.path.join(CORPUS_DIR, name), "rb") as corpus_file:
+        lines = corpus_file.read().decode("cp950" if "_win" in name else "ascii").splitlines()
+    for line in lines:
+        match = _hop_line_pattern.match(line) if locale else None
+        if match:
+            time.sleep(delay)
+            if random.random() < loss:
+                line = TRACE_TIMEOUT_LINES[locale].format(num=int(match.group(1)))
+        output.line(line)
+    return 0
+
+
+def main(argv):
+    tool, args = argv[0], argv[1:]
+    locale = os.environ.get("FAKE_NET_LOCALE", "linux")
+    delay = float(os.environ.get("FAKE_NET_DELAY", 0))
+    loss = float(os.environ.get("FAKE_NET_LOSS", 0))
+    rtt = float(os.environ.get("FAKE_NET_RTT", 12))
+    if os.environ.get("FAKE_NET_SEED"):
+        random.seed(os.environ["FAKE_NET_SEED"])
+    output = Output(locale)
+    if tool == "ping":
+        return fake_ping(args, locale, output, delay, loss, rtt)
+    if tool in ("traceroute", "tracert"):
+        return replay("tracert_linux.txt" if locale == "linux" else f"tracert_{locale}.txt", output, delay, loss, locale)
+    if tool == "ipconfig":
+        # There is no ipconfig on Linux; replay the zh-TW output there too
+        return replay("ipconfig_win_en.txt" if locale == "win_en" else "ipconfig_win_zh_tw.txt", output)
+    print(f"fake_net.py: unknown tool {tool}", file=sys.stderr)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
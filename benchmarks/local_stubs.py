@@ -0,0 +1,150 @@
+"""Local stand-ins for the network services the probes talk to, so tests never leave the machine.
+
+StubResolver is a UDP DNS server on 127.0.0.1 that answers from a table, and
+StubHttpServer a keep-alive HTTP/1.1 server that counts the connections it accepts.
+"""
+import socket
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import corpus_cases # noqa: F401  (puts src/ on sys.path)
+from dns_probe import QTYPE_A, QTYPE_AAAA
+
+_HEADER = struct.Struct("!HHHHHH")
+RCODE_NXDOMAIN = 3
+
+
+def _encode_name(name):
+    return b"".join(struct.pack("!B", len(label)) + label
+                    for label in name.rstrip(".").encode("idna").split(b".") if label) + b"\x00"
+
+
+def _encode_rdata(qtype, value):
+    if qtype == QTYPE_A:
+        return socket.inet_pton(socket.AF_INET, value)
+    if qtype == QTYPE_AAAA:
+        return socket.inet_pton(socket.AF_INET6, value)
+    return _encode_name(value) # CNAME and PTR
+
+
+class StubResolver:
+    """Answers DNS queries on 127.0.0.1 from ``records``: {(name, qtype): [(ttl, value), ...]}.
+
+    Names missing from ``records`` get NXDOMAIN; names in ``drop`` are never
+    answered, so their queries time out. Replies are sent ``delay`` seconds
+    after the query arrives. ``queries`` lists every (name, qtype) received.
+    """
+
+    def __init__(self, records, delay=0.0, drop=()):
+        self.records = records
+        self.delay = delay
+        self.drop = set(drop)
+        self.queries = []
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.settimeout(0.05) # close() does not wake a blocked recvfrom, so poll for it
+        self._stopped = threading.Event()
+        self.address = f"127.0.0.1:{self.sock.getsockname()[1]}"
+        self._thread = threading.Thread(target=self._serve, name="stub-resolver", daemon=True)
+        self._thread.start()
+
+    def _serve(self):
+        while not self._stopped.is_set():
+            try:
+                data, peer = self.sock.recvfrom(4096)
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            query_id = _HEADER.unpack_from(data)[0]
+            offset, labels = _HEADER.size, []
+            while data[offset]:
+                labels.append(data[offset + 1:offset + 1 + data[offset]].decode("ascii"))
+                offset += 1 + data[offset]
+            question = data[_HEADER.size:offset + 5]
+            name, qtype = ".".join(labels), struct.unpack_from("!H", data, offset + 1)[0]
+            self.queries.append((name, qtype))
+            if name in self.drop:
+                continue
+            answers = self.records.get((name, qtype))
+            rcode = RCODE_NXDOMAIN if answers is None else 0
+            reply = _HEADER.pack(query_id, 0x8180 | rcode, 1, len(answers or ()), 0, 0) + question
+            for ttl, value in answers or ():
+                rdata = _encode_rdata(qtype, value)
+                reply += struct.pack("!HHHIH", 0xC00C, qtype, 1, ttl, len(rdata)) + rdata
+            if self.delay:
+                threading.Timer(self.delay, self._send, (reply, peer)).start()
+            else:
+                self._send(reply, peer)
+
+    def _send(self, reply, peer):
+        try:
+            self.sock.sendto(reply, peer)
+        except OSError:
+            pass # Closed while the reply was delayed
+
+    def close(self):
+        self._stopped.set()
+        self._thread.join()
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class _StubHttpHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append(self.path)
+        time.sleep(server.delay)
+        self.send_response(server.status)
+        self.send_header("Content-Length", str(len(server.body)))
+        if server.close_connections:
+            self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(server.body)
+
+
+class StubHttpServer(ThreadingHTTPServer):
+    """Serves GET on 127.0.0.1 with ``status`` and ``body`` after ``delay`` seconds, keeping connections alive.
+
+    With ``close_connections`` every response says "Connection: close".
+    ``accepted`` counts TCP connections and ``requests`` lists the paths asked for.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, status=200, body=b"ok", delay=0.0, close_connections=False):
+        super().__init__(("127.0.0.1", 0), _StubHttpHandler)
+        self.status = status
+        self.body = body
+        self.delay = delay
+        self.close_connections = close_connections
+        self.accepted = 0
+        self.requests = []
+        self.url = f"http://127.0.0.1:{self.server_address[1]}"
+        threading.Thread(target=self.serve_forever, args=(0.05,), daemon=True).start()
+
+    def get_request(self):
+        request = super().get_request()
+        self.accepted += 1
+        return request
+
+    def close(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,112 @@
+"""Probe agents and the coordinator, with several agents on localhost.
+
+Run with ``python -m pytest benchmarks`` or ``python -m unittest discover benchmarks``.
+"""
+import os
+import socket
+import tempfile
+import threading
+import unittest
+import corpus_cases # noqa: F401  (puts src/ on sys.path)
+from agent import ARGUMENT_LIMITS, AgentServer, plan_from_specs
+from config_manager import ConfigurationManager
+from coordinator import Coordinator
+
+TOKEN = "secret"
+
+
+class CountingAgentServer(AgentServer):
+    """An agent that counts the TCP connections it accepts."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.accepted = 0
+
+    def get_request(self):
+        request = super().get_request()
+        self.accepted += 1
+        return request
+
+
+class AgentTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        config_manager = ConfigurationManager(os.path.join(self.directory.name, "config.ini"))
+        self.agents = [CountingAgentServer(("127.0.0.1", 0), config_manager, token=TOKEN, name=f"agent{index}")
+                       for index in range(3)]
+        for agent in self.agents:
+            threading.Thread(target=agent.serve_forever, args=(0.05,), daemon=True).start() # Quick shutdown()
+        self.addresses = [f"127.0.0.1:{agent.server_address[1]}" for agent in self.agents]
+        self.listener = socket.create_server(("127.0.0.1", 0)) # Target of the TCP connect probes
+
+    def tearDown(self):
+        for agent in self.agents:
+            agent.shutdown()
+            agent.server_close()
+        self.listener.close()
+        self.directory.cleanup()
+
+    def probe_specs(self):
+        # Probes that stay on this machine: a lookup of localhost and a TCP connect to a local listener
+        return [{"key": "resolve", "probe": "resolve", "args": ["localhost"]},
+                {"key": "tcp", "probe": "tcp_connect", "args": ["127.0.0.1", self.listener.getsockname()[1]],
+                 "kwargs": {"count": 2, "timeout": 1000}}]
+
+    def test_records_from_every_agent_are_merged(self):
+        with Coordinator(self.addresses, token=TOKEN) as coordinator:
+            records = list(coordinator.run(self.probe_specs()))
+        self.assertEqual(sorted((record["agent"], record["test"]) for record in records),
+                         sorted((f"agent{index}", test) for index in range(3) for test in ("resolve", "tcp")))
+        self.assertTrue(all(record["success"] for record in records), records)
+        self.assertEqual({record["agent_address"] for record in records}, set(self.addresses))
+
+    def test_connections_are_reused_across_runs(self):
+        with Coordinator(self.addresses, token=TOKEN) as coordinator:
+            for _ in range(3):
+                self.assertEqual(len(list(coordinator.run(self.probe_specs()))), 6)
+        self.assertEqual([agent.accepted for agent in self.agents], [1, 1, 1])
+
+    def test_wrong_token_is_rejected(self):
+        with Coordinator(self.addresses[:1], token="wrong") as coordinator:
+            records = list(coordinator.run(self.probe_specs()))
+        self.assertEqual(records, [{"agent_address": self.addresses[0], "test": "agent", "success": False,
+                                    "error": "HTTP 401: unauthorized"}])
+
+    def test_invalid_probe_arguments_are_rejected(self):
+        bad_specs = [
+            {"probe": "ping", "args": ["127.0.0.1"], "kwargs": {"bogus": 1}},
+            {"probe": "ping", "args": "127.0.0.1"},
+            {"probe": "ping"},
+            {"probe": "tracert", "args": ["127.0.0.1"], "kwargs": {"on_hop": None}},
+            {"probe": "shell", "args": ["ls"]},
+        ]
+        for spec in bad_specs:
+            with self.subTest(spec=spec):
+                with self.assertRaises(ValueError):
+                    plan_from_specs([spec])
+                with Coordinator(self.addresses[:1], token=TOKEN) as coordinator:
+                    [record] = coordinator.run([spec])
+                self.assertTrue(record["error"].startswith("HTTP 400: "), record)
+
+    def test_numeric_arguments_are_clamped(self):
+        [(_, _, _, _, args, kwargs)] = plan_from_specs([{"probe": "ping", "args": ["127.0.0.1", 100000],
+                                                         "kwargs": {"timeout": 0}}])
+        # Arguments come back bound positionally where the signature allows it
+        self.assertEqual((args, kwargs), (("127.0.0.1", ARGUMENT_LIMITS["count"][1], ARGUMENT_LIMITS["timeout"][0]), {}))
+        [(_, _, _, _, args, kwargs)] = plan_from_specs([{"probe": "tracert", "args": ["127.0.0.1"],
+                                                         "kwargs": {"max_hops": 255}}])
+        self.assertEqual(args, ("127.0.0.1", ARGUMENT_LIMITS["max_hops"][1]))
+        with self.assertRaises(ValueError):
+            plan_from_specs([{"probe": "ping", "args": ["127.0.0.1"], "kwargs": {"count": "4"}}])
+
+
+class AgentBindTests(unittest.TestCase):
+    def test_non_loopback_bind_needs_a_token(self):
+        with self.assertRaises(ValueError):
+            AgentServer(("0.0.0.0", 0))
+        for server in (AgentServer(("127.0.0.1", 0)), AgentServer(("0.0.0.0", 0), token=TOKEN)):
+            server.server_close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,193 @@
+"""Typed config snapshots, [Site <name>] profiles, validated saves and ConfigWatcher reloads.
+
+Run with ``python -m pytest benchmarks`` or ``python -m unittest discover benchmarks``.
+"""
+import configparser
+import os
+import tempfile
+import time
+import unittest
+import corpus_cases # noqa: F401  (puts src/ on sys.path)
+from config_manager import SCHEMA, ConfigError, ConfigurationManager, ConfigWatcher, build_snapshot
+
+
+def parse(text):
+    config = configparser.ConfigParser()
+    config.read_string(text)
+    return config
+
+
+class SchemaParserTests(unittest.TestCase):
+    def test_values_are_typed(self):
+        snapshot = build_snapshot(parse("""
+[NetworkSettings]
+gatewayip = 10.0.0.1
+TestURL = https://intranet.example/health
+[TestParameters]
+PingCount = 7
+TimeBudget = 12.5
+AdaptivePing = no
+DualStack = YES
+[Custom]
+Anything = kept as text
+"""))
+        self.assertEqual(snapshot.get('NetworkSettings', 'GatewayIP'), '10.0.0.1') # Key spelling restored
+        self.assertEqual(snapshot.get('NetworkSettings', 'TestURL'), 'https://intranet.example/health')
+        self.assertEqual(snapshot.get('TestParameters', 'PingCount'), 7)
+        self.assertEqual(snapshot.get('TestParameters', 'TimeBudget'), 12.5)
+        self.assertIs(snapshot.get('TestParameters', 'AdaptivePing'), False)
+        self.assertIs(snapshot.get('TestParameters', 'DualStack'), True)
+        self.assertEqual(snapshot.get('Custom', 'anything'), 'kept as text')
+
+    def test_missing_values_get_schema_defaults(self):
+        snapshot = build_snapshot(parse(""))
+        for section, keys in SCHEMA.items():
+            for key, (_, default) in keys.items():
+                self.assertEqual(snapshot.get(section, key), default, f"[{section}] {key}")
+
+    def test_every_bad_value_is_reported(self):
+        bad_values = [
+            ("TestParameters", "PingCount", "abc", "必須是整數"),
+            ("TestParameters", "PingCount", "0", "必須介於 1 與 100 之間"),
+            ("TestParameters", "TimeBudget", "-1", "不可小於 0"),
+            ("TestParameters", "TimeBudget", "soon", "必須是數字"),
+            ("TestParameters", "AdaptivePing", "maybe", "必須是 true 或 false"),
+            ("NetworkSettings", "GatewayIP", "  ", "不可為空白"),
+            ("Throughput", "Duration", "31", "必須介於 0.1 與 30 之間"),
+        ]
+        for section, key, raw, message in bad_values:
+            with self.subTest(key=key, raw=raw):
+                with self.assertRaises(ConfigError) as caught:
+                    build_snapshot(parse(f"[{section}]\n{key} = {raw}\n"))
+                self.assertIn(f"[{section}] {key}: {message}", str(caught.exception))
+        with self.assertRaises(ConfigError) as caught:
+            build_snapshot(parse("[TestParameters]\nPingCount = abc\nPingTimeout = 0\n"))
+        self.assertIn("PingCount", str(caught.exception))
+        self.assertIn("PingTimeout", str(caught.exception))
+
+    def test_snapshot_is_immutable(self):
+        snapshot = build_snapshot(parse(""))
+        with self.assertRaises(AttributeError):
+            snapshot.path = "elsewhere"
+        with self.assertRaises(TypeError):
+            snapshot._values['TestParameters']['PingCount'] = 1
+
+
+class SiteProfileTests(unittest.TestCase):
+    CONFIG = """
+[NetworkSettings]
+GatewayIP = 10.0.0.1
+TestWebsite = www.example.com
+[TestParameters]
+PingCount = 4
+[Site 北棟]
+GatewayIP = 10.1.0.1
+PingCount = 2
+[Site 南棟]
+InternalServerIP = 10.2.0.9
+"""
+
+    def test_profiles_override_the_default_site(self):
+        snapshot = build_snapshot(parse(self.CONFIG))
+        self.assertEqual(snapshot.sites, ("北棟", "南棟"))
+        north = snapshot.for_site("北棟")
+        self.assertEqual((north.site, north.get('NetworkSettings', 'GatewayIP'), north.get('TestParameters', 'PingCount')),
+                         ("北棟", '10.1.0.1', 2))
+        self.assertEqual(north.get('NetworkSettings', 'TestWebsite'), 'www.example.com') # Inherited
+        south = snapshot.for_site("南棟")
+        self.assertEqual((south.get('NetworkSettings', 'GatewayIP'), south.get('NetworkSettings', 'InternalServerIP')),
+                         ('10.0.0.1', '10.2.0.9'))
+        self.assertIs(snapshot.for_site(None), snapshot)
+        self.assertEqual(snapshot.get('NetworkSettings', 'GatewayIP'), '10.0.0.1') # Default site untouched
+
+    def test_unknown_site_and_unsupported_keys(self):
+        with self.assertRaises(ConfigError):
+            build_snapshot(parse(self.CONFIG)).for_site("西棟")
+        with self.assertRaises(ConfigError) as caught:
+            build_snapshot(parse("[Site 北棟]\nLanguage = en\nPingCount = many\n"))
+        self.assertIn("[Site 北棟] language: 站點設定不支援此項目", str(caught.exception))
+        self.assertIn("[Site 北棟] PingCount: 必須是整數", str(caught.exception))
+
+
+class ConfigurationManagerTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "config.ini")
+        with open(self.path, "w", encoding="utf-8") as config_file:
+            config_file.write("[NetworkSettings]\nGatewayIP = 10.0.0.1\n[TestParameters]\nPingCount = 4\n")
+        self.manager = ConfigurationManager(self.path)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, text):
+        with open(self.path, "w", encoding="utf-8") as config_file:
+            config_file.write(text)
+        # Make sure the change is seen even on file systems with coarse timestamps
+        stat = os.stat(self.path)
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10_000_000))
+
+    def test_snapshot_is_shared_until_settings_change(self):
+        snapshot = self.manager.snapshot()
+        self.assertIs(self.manager.snapshot(), snapshot)
+        self.manager.set_setting('TestParameters', 'PingCount', 9)
+        self.assertEqual(self.manager.snapshot().get('TestParameters', 'PingCount'), 9)
+
+    def test_invalid_update_changes_nothing(self):
+        with open(self.path, encoding="utf-8") as config_file:
+            before = config_file.read()
+        with self.assertRaises(ConfigError):
+            self.manager.update_settings({'TestParameters': {'PingCount': 'abc'}, 'NetworkSettings': {'GatewayIP': '10.9.9.9'}})
+        with open(self.path, encoding="utf-8") as config_file:
+            self.assertEqual(config_file.read(), before)
+        self.assertEqual(self.manager.get_setting('NetworkSettings', 'GatewayIP'), '10.0.0.1')
+        self.assertEqual(self.manager.snapshot().get('TestParameters', 'PingCount'), 4)
+
+    def test_valid_update_is_saved_and_applied(self):
+        snapshot = self.manager.update_settings({'TestParameters': {'PingCount': 6}, 'Traceroute': {'ResolveHopNames': 'true'}})
+        self.assertIs(self.manager.snapshot(), snapshot)
+        self.assertEqual(snapshot.get('TestParameters', 'PingCount'), 6)
+        reloaded = ConfigurationManager(self.path).snapshot()
+        self.assertEqual((reloaded.get('TestParameters', 'PingCount'), reloaded.get('Traceroute', 'ResolveHopNames')),
+                         (6, True))
+
+    def test_watcher_reloads_valid_edits(self):
+        reloaded = []
+        watcher = ConfigWatcher(self.manager, on_reload=reloaded.append)
+        old_snapshot = self.manager.snapshot()
+        self.assertFalse(watcher.check()) # Unchanged file
+        self.write("[NetworkSettings]\nGatewayIP = 10.0.0.2\n[TestParameters]\nPingCount = 5\n")
+        self.assertTrue(watcher.check())
+        self.assertEqual(self.manager.snapshot().get('TestParameters', 'PingCount'), 5)
+        self.assertEqual(reloaded, [self.manager.snapshot()])
+        self.assertEqual(old_snapshot.get('TestParameters', 'PingCount'), 4) # A running diagnosis keeps its snapshot
+        self.assertFalse(watcher.check())
+
+    def test_watcher_keeps_the_previous_snapshot_on_errors(self):
+        errors = []
+        watcher = ConfigWatcher(self.manager, on_reload=self.fail, on_error=errors.append)
+        snapshot = self.manager.snapshot()
+        for text in ("[TestParameters]\nPingCount = lots\n", "not an ini file\n"):
+            with self.subTest(text=text):
+                self.write(text)
+                self.assertFalse(watcher.check())
+                self.assertIs(self.manager.snapshot(), snapshot)
+        self.assertIsInstance(errors[0], ConfigError)
+        self.assertIsInstance(errors[1], configparser.Error)
+        os.remove(self.path)
+        self.assertFalse(watcher.check()) # A deleted file is not an edit
+
+    def test_watcher_thread_picks_up_edits(self):
+        reloaded = []
+        watcher = ConfigWatcher(self.manager, interval=0.02, on_reload=reloaded.append).start()
+        self.addCleanup(watcher.stop)
+        self.write("[TestParameters]\nPingCount = 8\n")
+        for _ in range(100):
+            if reloaded:
+                break
+            time.sleep(0.02)
+        self.assertEqual(reloaded[0].get('TestParameters', 'PingCount'), 8)
+
+
+if __name__ == "__main__":
+    unittest.main()
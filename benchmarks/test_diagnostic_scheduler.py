@@ -0,0 +1,166 @@
+"""DiagnosticScheduler dependencies, time budget and cancellation, with stub tasks in place of probes.
+
+Run with ``python -m pytest benchmarks`` or ``python -m unittest discover benchmarks``.
+"""
+import threading
+import time
+import unittest
+import corpus_cases # noqa: F401  (puts src/ on sys.path)
+from cancellation import current_token
+from diagnostic_scheduler import (DiagnosticScheduler, Task, STATUS_CANCELLED, STATUS_COMPLETED, STATUS_SKIPPED,
+                                  STATUS_TIMED_OUT)
+
+
+def succeeded(key, result):
+    return result["success"]
+
+
+def failed_result(key, message):
+    return {"success": False, "error": message}
+
+
+def passes(delay=0.0):
+    time.sleep(delay)
+    return {"success": True, "error": ""}
+
+
+def fails():
+    return {"success": False, "error": "down"}
+
+
+def after(delay, func):
+    time.sleep(delay)
+    return func()
+
+
+def waits_for_cancel(aborted, limit=5):
+    """Blocks like a probe until its task is cancelled; records whether the cancellation reached it."""
+    aborted.append(current_token().wait(limit))
+    return {"success": True, "error": ""}
+
+
+class SchedulerTests(unittest.TestCase):
+    def run_tasks(self, tasks, **options):
+        completed = []
+        scheduler = DiagnosticScheduler(succeeded, failed_result, **options)
+        results = list(scheduler.run(tasks, on_complete=lambda key, result, status: completed.append(key)))
+        return results, completed
+
+    def test_results_are_yielded_in_task_order(self):
+        tasks = [Task("slow", passes, (0.15,)), Task("medium", passes, (0.05,)), Task("fast", passes)]
+        results, completed = self.run_tasks(tasks)
+        self.assertEqual([key for key, _, _ in results], ["slow", "medium", "fast"])
+        self.assertEqual(completed, ["fast", "medium", "slow"]) # on_complete fires as each finishes
+        self.assertEqual({status for _, _, status in results}, {STATUS_COMPLETED})
+
+    def test_failed_prerequisite_skips_its_dependents(self):
+        for speculative in (True, False):
+            with self.subTest(speculative=speculative):
+                tasks = [Task("gateway", fails), Task("dns", passes, depends_on=["gateway"]),
+                         Task("website", passes, depends_on=["dns"]), Task("other", passes)]
+                results, _ = self.run_tasks(tasks, speculative=speculative)
+                statuses = {key: status for key, _, status in results}
+                self.assertEqual(statuses, {"gateway": STATUS_COMPLETED, "dns": STATUS_SKIPPED,
+                                            "website": STATUS_SKIPPED, "other": STATUS_COMPLETED})
+                errors = {key: result["error"] for key, result, _ in results}
+                self.assertIn("gateway", errors["dns"])
+                self.assertIn("dns", errors["website"])
+
+    def test_speculative_dependents_are_cancelled_when_a_prerequisite_fails(self):
+        aborted = []
+        tasks = [Task("gateway", after, (0.1, fails)),
+                 Task("website", waits_for_cancel, (aborted,), depends_on=["gateway"])]
+        started = time.monotonic()
+        results, _ = self.run_tasks(tasks)
+        self.assertEqual([status for _, _, status in results], [STATUS_COMPLETED, STATUS_SKIPPED])
+        self.assertLess(time.monotonic() - started, 1)
+        for _ in range(50):
+            if aborted:
+                break
+            time.sleep(0.01)
+        self.assertEqual(aborted, [True])
+
+    def test_speculative_results_wait_for_their_prerequisites(self):
+        for prerequisite, expected in ((passes, STATUS_COMPLETED), (fails, STATUS_SKIPPED)):
+            with self.subTest(prerequisite=prerequisite.__name__):
+                completed = []
+                tasks = [Task("gateway", after, (0.1, prerequisite)),
+                         Task("dns", passes, depends_on=["gateway"])]
+                scheduler = DiagnosticScheduler(succeeded, failed_result)
+                results = list(scheduler.run(tasks, on_complete=lambda key, result, status: completed.append(key)))
+                # dns finished first but is only reported once gateway is known
+                self.assertEqual(completed, ["gateway", "dns"])
+                self.assertEqual(results[1][2], expected)
+
+    def test_non_speculative_dependents_never_start(self):
+        calls = []
+
+        def record(key, result):
+            calls.append(key)
+            return result
+
+        tasks = [Task("gateway", record, ("gateway", {"success": False})),
+                 Task("dns", record, ("dns", {"success": True}), depends_on=["gateway"]),
+                 Task("internal", record, ("internal", {"success": True}))]
+        results, _ = self.run_tasks(tasks, speculative=False)
+        self.assertEqual(sorted(calls), ["gateway", "internal"])
+        self.assertEqual([status for _, _, status in results], [STATUS_COMPLETED, STATUS_SKIPPED, STATUS_COMPLETED])
+
+    def test_non_speculative_dependents_start_after_their_prerequisite(self):
+        order = []
+
+        def record(key, delay):
+            time.sleep(delay)
+            order.append(key)
+            return {"success": True}
+
+        tasks = [Task("gateway", record, ("gateway", 0.05)), Task("dns", record, ("dns", 0.0), depends_on=["gateway"])]
+        results, _ = self.run_tasks(tasks, speculative=False)
+        self.assertEqual(order, ["gateway", "dns"])
+        self.assertEqual([status for _, _, status in results], [STATUS_COMPLETED, STATUS_COMPLETED])
+
+    def test_time_budget_times_out_slow_tasks(self):
+        aborted = []
+        tasks = [Task("fast", passes), Task("slow", waits_for_cancel, (aborted,)),
+                 Task("after_slow", passes, depends_on=["slow"])]
+        started = time.monotonic()
+        results, _ = self.run_tasks(tasks, time_budget=0.2, speculative=False)
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual([status for _, _, status in results], [STATUS_COMPLETED, STATUS_TIMED_OUT, STATUS_TIMED_OUT])
+        self.assertEqual(results[1][1]["error"], "超過時間預算")
+        for _ in range(50):
+            if aborted:
+                break
+            time.sleep(0.01)
+        self.assertEqual(aborted, [True])
+
+    def test_cancel_aborts_tasks_in_flight(self):
+        aborted = []
+        scheduler = DiagnosticScheduler(succeeded, failed_result)
+        tasks = [Task("fast", passes), Task("hang1", waits_for_cancel, (aborted,)),
+                 Task("hang2", waits_for_cancel, (aborted,))]
+        threading.Timer(0.1, scheduler.cancel).start()
+        started = time.monotonic()
+        results = list(scheduler.run(tasks))
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertTrue(scheduler.cancelled)
+        self.assertEqual([status for _, _, status in results], [STATUS_COMPLETED, STATUS_CANCELLED, STATUS_CANCELLED])
+        self.assertEqual(results[1][1]["error"], "已取消")
+        for _ in range(50):
+            if len(aborted) == 2:
+                break
+            time.sleep(0.01)
+        self.assertEqual(aborted, [True, True])
+
+    def test_exceptions_are_reported_as_failures(self):
+        def broken():
+            raise RuntimeError("boom")
+
+        tasks = [Task("broken", broken), Task("dependent", passes, depends_on=["broken"])]
+        results, _ = self.run_tasks(tasks)
+        self.assertEqual(results[0][1]["error"], "發生未知錯誤: boom")
+        self.assertEqual([status for _, _, status in results], [STATUS_COMPLETED, STATUS_SKIPPED])
+
+
+if __name__ == "__main__":
+    unittest.main()
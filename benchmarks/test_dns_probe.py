@@ -0,0 +1,143 @@
+"""DNS resolver benchmark against local stub resolvers.
+
+Run with ``python -m pytest benchmarks`` or ``python -m unittest discover benchmarks``.
+"""
+import socket
+import struct
+import threading
+import time
+import unittest
+from local_stubs import StubResolver
+from dns_probe import QTYPE_A, QTYPE_CNAME, DnsFormatError, build_query, dns_benchmark, parse_resolver, parse_response, query_resolvers
+
+RECORDS = {
+    ("www.example.com", QTYPE_A): [(300, "192.0.2.10"), (60, "192.0.2.11")],
+    ("campus.example.edu", QTYPE_A): [(600, "198.51.100.5")],
+}
+
+
+def closed_udp_port():
+    """A 127.0.0.1 UDP port nothing listens on, so queries to it draw ICMP port unreachable."""
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return f"127.0.0.1:{sock.getsockname()[1]}"
+
+
+class DnsPacketTests(unittest.TestCase):
+    def test_query_round_trips_through_the_stub(self):
+        query_id, packet = build_query("www.example.com")
+        with StubResolver(RECORDS) as stub, socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.settimeout(2)
+            sock.sendto(packet, parse_resolver(stub.address))
+            reply = sock.recv(4096)
+        self.assertEqual(parse_response(reply), (query_id, 0, [(QTYPE_A, 300, "192.0.2.10"), (QTYPE_A, 60, "192.0.2.11")]))
+
+    def test_parse_resolver(self):
+        self.assertEqual(parse_resolver("8.8.8.8"), ("8.8.8.8", 53))
+        self.assertEqual(parse_resolver("127.0.0.1:5353"), ("127.0.0.1", 5353))
+        self.assertEqual(parse_resolver("[::1]:5353"), ("::1", 5353))
+        self.assertEqual(parse_resolver("2001:db8::1"), ("2001:db8::1", 53))
+
+    def test_malformed_replies_raise_format_errors(self):
+        header = struct.pack("!HHHHHH", 1, 0x8180, 1, 0, 0, 0)
+        answer_header = struct.pack("!HHHHHH", 1, 0x8180, 0, 1, 0, 0)
+        for reply in (header + b"\xc0", header + b"\x03ab", header[:6],
+                      answer_header + b"\x00" + struct.pack("!HHIH", QTYPE_A, 1, 60, 4) + b"\x01\x02"):
+            with self.subTest(reply=reply):
+                with self.assertRaises(DnsFormatError):
+                    parse_response(reply)
+
+    def test_cname_answers_are_read(self):
+        records = {("alias.example.com", QTYPE_CNAME): [(30, "www.example.com")]}
+        with StubResolver(records) as stub:
+            result = query_resolvers([stub.address], ["alias.example.com"], qtype=QTYPE_CNAME)[stub.address]
+        self.assertEqual(result["answers"], {"alias.example.com": ["www.example.com"]})
+
+
+class DnsBenchmarkTests(unittest.TestCase):
+    def test_answers_ttls_and_latencies_per_resolver(self):
+        with StubResolver(RECORDS) as fast, StubResolver(RECORDS, delay=0.05) as slow:
+            result = dns_benchmark([fast.address, slow.address], ["www.example.com", "campus.example.edu"], repeats=3)
+        self.assertTrue(result["success"])
+        for resolver, details in result["resolvers"].items():
+            self.assertEqual(details["sent"], 6)
+            self.assertEqual(len(details["latencies"]), 6)
+            self.assertEqual(details["timeouts"], 0)
+            self.assertEqual(details["answers"], {"www.example.com": ["192.0.2.10", "192.0.2.11"],
+                                                  "campus.example.edu": ["198.51.100.5"]})
+            self.assertEqual(details["ttls"], {"www.example.com": 60, "campus.example.edu": 600})
+        self.assertGreaterEqual(result["resolvers"][slow.address]["min"], 50)
+        self.assertLess(result["resolvers"][fast.address]["avg"], result["resolvers"][slow.address]["avg"])
+
+    def test_queries_are_sent_concurrently(self):
+        names = [f"host{index}.example.com" for index in range(20)]
+        started = time.perf_counter()
+        with StubResolver({}, delay=0.2) as stub:
+            result = dns_benchmark([stub.address], names, repeats=2, timeout=2000)
+            self.assertEqual(len(stub.queries), 40)
+        # 40 queries each answered after 200 ms take about 200 ms together, not 8 s one after another
+        self.assertLess(time.perf_counter() - started, 1.5)
+        self.assertEqual(set(result["resolvers"][stub.address]["errors"].values()), {"NXDOMAIN"})
+        self.assertFalse(result["success"])
+
+    def test_timeouts_are_counted(self):
+        with StubResolver(RECORDS, drop=["campus.example.edu"]) as stub:
+            result = dns_benchmark([stub.address], ["www.example.com", "campus.example.edu"], repeats=2, timeout=200)
+        details = result["resolvers"][stub.address]
+        self.assertEqual((details["sent"], len(details["latencies"]), details["timeouts"]), (4, 2, 2))
+        self.assertFalse(result["success"])
+        self.assertEqual(result["error"], "所有 DNS 伺服器皆無法解析測試網域")
+
+    def test_one_working_resolver_is_enough(self):
+        dead = closed_udp_port()
+        with StubResolver(RECORDS) as stub:
+            result = dns_benchmark([dead, stub.address, ""], ["www.example.com"], timeout=500)
+        self.assertTrue(result["success"])
+        self.assertEqual(set(result["resolvers"]), {dead, stub.address})
+        self.assertEqual(result["resolvers"][dead]["latencies"], [])
+        self.assertIn("www.example.com", result["resolvers"][dead]["errors"])
+
+    def test_bad_resolvers_only_fail_themselves(self):
+        bad = ["127.0.0.1:abc", "no-such-host.invalid", "[::1]:99999"]
+        with StubResolver(RECORDS) as stub:
+            result = dns_benchmark(bad + [stub.address], ["www.example.com"], timeout=500)
+        self.assertTrue(result["success"], result)
+        for resolver in bad:
+            with self.subTest(resolver=resolver):
+                self.assertEqual(result["resolvers"][resolver]["sent"], 0)
+                self.assertIn("www.example.com", result["resolvers"][resolver]["errors"])
+
+    def test_invalid_names_are_per_name_errors(self):
+        names = ["www.example.com", "a" * 64 + ".example.com", "bad..example.com"]
+        with StubResolver(RECORDS) as stub:
+            result = dns_benchmark([stub.address], names, repeats=1, timeout=500)
+            self.assertEqual(stub.queries, [("www.example.com", QTYPE_A)])
+        details = result["resolvers"][stub.address]
+        self.assertEqual(details["answers"], {"www.example.com": ["192.0.2.10", "192.0.2.11"]})
+        self.assertEqual(set(details["errors"]), set(names[1:]))
+        self.assertFalse(result["success"])
+
+    def test_malformed_reply_does_not_abort_the_benchmark(self):
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as bogus, StubResolver(RECORDS) as stub:
+            bogus.bind(("127.0.0.1", 0))
+            bogus.settimeout(2)
+
+            def answer_garbage():
+                data, peer = bogus.recvfrom(4096)
+                bogus.sendto(data[:12] + b"\xc0", peer)
+
+            thread = threading.Thread(target=answer_garbage)
+            thread.start()
+            address = f"127.0.0.1:{bogus.getsockname()[1]}"
+            result = dns_benchmark([address, stub.address], ["www.example.com"], repeats=1, timeout=300)
+            thread.join()
+        self.assertTrue(result["success"])
+        self.assertEqual(result["resolvers"][address]["timeouts"], 1)
+
+    def test_no_resolvers_configured(self):
+        self.assertEqual(dns_benchmark(["", None], ["www.example.com"]),
+                         {"success": False, "error": "未設定 DNS 伺服器", "resolvers": {}})
+
+
+if __name__ == "__main__":
+    unittest.main()
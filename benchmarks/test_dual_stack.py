@@ -0,0 +1,119 @@
+"""Happy-eyeballs racing and the dual-stack probe, with ::1 and 127.0.0.1 standing in for a host's AAAA and A addresses.
+
+Run with ``python -m pytest benchmarks`` or ``python -m unittest discover benchmarks``.
+"""
+import errno
+import socket
+import unittest
+from unittest import mock
+import corpus_cases # noqa: F401  (puts src/ on sys.path)
+from dual_stack import dual_stack_probe, interleave, race_connect
+
+
+def ipv6_available():
+    try:
+        with socket.socket(socket.AF_INET6, socket.SOCK_STREAM) as sock:
+            sock.bind(("::1", 0))
+        return True
+    except OSError:
+        return False
+
+
+class InterleaveTests(unittest.TestCase):
+    def test_ipv6_first_then_alternating(self):
+        addresses = ["192.0.2.1", "192.0.2.2", "192.0.2.3", "2001:db8::1", "2001:db8::2"]
+        self.assertEqual(interleave(addresses),
+                         ["2001:db8::1", "192.0.2.1", "2001:db8::2", "192.0.2.2", "192.0.2.3"])
+
+    def test_single_family(self):
+        self.assertEqual(interleave(["192.0.2.1", "192.0.2.2"]), ["192.0.2.1", "192.0.2.2"])
+        self.assertEqual(interleave([]), [])
+
+
+class NoIpv6StackTests(unittest.TestCase):
+    def test_missing_ipv6_stack_falls_back_to_ipv4(self):
+        real_socket = socket.socket
+
+        def ipv4_only_socket(family=socket.AF_INET, *args, **kwargs):
+            if family == socket.AF_INET6:
+                raise OSError(errno.EAFNOSUPPORT, "Address family not supported by protocol")
+            return real_socket(family, *args, **kwargs)
+
+        with socket.create_server(("127.0.0.1", 0)) as listener, \
+                mock.patch.object(socket, "socket", ipv4_only_socket):
+            race = race_connect(["2001:db8::1", "127.0.0.1"], listener.getsockname()[1])
+        self.assertEqual((race["winner"], race["family"]), ("127.0.0.1", "IPv4"))
+        self.assertLess(race["fallback_ms"], 100) # Does not wait out the attempt delay
+        self.assertEqual([attempt["outcome"] for attempt in race["attempts"]], ["failed", "connected"])
+        self.assertTrue(race["attempts"][0]["error"])
+
+
+@unittest.skipUnless(ipv6_available(), "no IPv6 loopback")
+class RaceTests(unittest.TestCase):
+    def setUp(self):
+        # One port on both loopbacks, each family with its own listener so either can be broken alone
+        self.ipv4 = socket.create_server(("127.0.0.1", 0))
+        self.port = self.ipv4.getsockname()[1]
+        self.ipv6 = socket.socket(socket.AF_INET6, socket.SOCK_STREAM)
+        self.ipv6.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_V6ONLY, 1)
+        self.ipv6.bind(("::1", self.port))
+        self.clients = []
+
+    def tearDown(self):
+        for sock in self.clients + [self.ipv4, self.ipv6]:
+            sock.close()
+
+    def stall_ipv6(self):
+        """Leaves IPv6 SYNs unanswered, like a black-holed AAAA path: the listener's accept queue is kept full."""
+        self.ipv6.listen(0)
+        self.clients.append(socket.create_connection(("::1", self.port)))
+
+    def test_healthy_ipv6_wins(self):
+        self.ipv6.listen()
+        race = race_connect(["127.0.0.1", "::1"], self.port)
+        self.assertEqual((race["winner"], race["family"]), ("::1", "IPv6"))
+        self.assertLess(race["fallback_ms"], 50)
+        self.assertEqual(len(race["attempts"]), 1)
+
+    def test_refused_ipv6_falls_back_at_once(self):
+        race = race_connect(["::1", "127.0.0.1"], self.port) # IPv6 socket bound but not listening: refused
+        self.assertEqual(race["family"], "IPv4")
+        self.assertLess(race["fallback_ms"], 100) # A failed attempt does not wait out the attempt delay
+        self.assertEqual([attempt["outcome"] for attempt in race["attempts"]], ["failed", "connected"])
+        self.assertTrue(race["attempts"][0]["error"])
+
+    def test_stalled_ipv6_costs_the_attempt_delay(self):
+        self.stall_ipv6()
+        race = race_connect(["::1", "127.0.0.1"], self.port, attempt_delay=0.1)
+        self.assertEqual(race["family"], "IPv4")
+        self.assertGreaterEqual(race["fallback_ms"], 100)
+        self.assertLess(race["fallback_ms"], 200)
+        self.assertEqual([attempt["outcome"] for attempt in race["attempts"]], ["abandoned", "connected"])
+
+    def test_nothing_answers(self):
+        self.stall_ipv6()
+        self.ipv4.close()
+        race = race_connect(["::1", "127.0.0.1"], self.port, attempt_delay=0.05, timeout=300)
+        self.assertIsNone(race["winner"])
+        self.assertEqual(race["error"], "連線逾時") # The stalled IPv6 attempt never failed outright
+
+    def test_probe_reports_both_families(self):
+        self.ipv6.listen()
+        result = dual_stack_probe("localhost", self.port, count=1, timeout=300, addresses=["::1", "127.0.0.1"])
+        self.assertTrue(result["success"], result)
+        self.assertEqual(result["race"]["family"], "IPv6")
+        for family, address in (("IPv6", "::1"), ("IPv4", "127.0.0.1")):
+            details = result["families"][family]
+            self.assertEqual(details["addresses"], [address])
+            self.assertTrue(details["tcp"]["success"], details)
+            self.assertIsNotNone(details["ping"]) # Ping needs ICMP, so only its presence is checked
+
+    def test_probe_with_one_family(self):
+        result = dual_stack_probe("localhost", self.port, count=1, timeout=300, addresses=["127.0.0.1"])
+        self.assertTrue(result["success"])
+        self.assertEqual(result["families"]["IPv6"]["error"], "沒有此類型的位址")
+        self.assertIsNone(result["families"]["IPv6"]["tcp"])
+
+
+if __name__ == "__main__":
+    unittest.main()
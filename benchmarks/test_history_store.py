@@ -0,0 +1,96 @@
+"""HistoryStore.latency_summary: raw-row answers against a plain Python computation, rollup answers against raw ones.
+
+Run with ``python -m pytest benchmarks`` or ``python -m unittest discover benchmarks``.
+"""
+import math
+import os
+import random
+import tempfile
+import unittest
+import corpus_cases # noqa: F401  (puts src/ on sys.path)
+from history_store import DAY, HISTOGRAM_RATIO, HistoryStore
+
+NOW = 1_699_999_200.0 # On an hour boundary, so whole-day windows cover whole rollup buckets
+HOUR = 3600
+
+
+def expected_summary(samples):
+    """latency_summary's result for (success, latency) pairs, computed directly."""
+    latencies = sorted(latency for success, latency in samples if success)
+    return {
+        "samples": len(samples),
+        "successes": sum(success for success, _ in samples),
+        "min": latencies[0],
+        "avg": sum(latencies) / len(latencies),
+        "max": latencies[-1],
+        "p95": latencies[math.ceil(0.95 * len(latencies)) - 1],
+    }
+
+
+class LatencySummaryTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = HistoryStore(os.path.join(self.directory.name, "history.db"), flush_interval=60)
+        self.samples = []
+        generator = random.Random(11)
+        # Three days of gateway pings every 30 s, plus another target that must not leak into the results
+        for index in range(3 * DAY // 30):
+            ts = NOW - 3 * DAY + index * 30
+            success, latency = generator.random() > 0.05, generator.expovariate(1 / 20)
+            self.store.record("ping_gateway", "192.168.1.1", success, latency_ms=latency, ts=ts)
+            self.store.record("ping_gateway", "10.0.0.1", True, latency_ms=500.0, ts=ts)
+            self.samples.append((ts, success, latency))
+
+    def tearDown(self):
+        self.store.close()
+        self.directory.cleanup()
+
+    def window(self, since, until):
+        return [(success, latency) for ts, success, latency in self.samples if since <= ts < until]
+
+    def assert_close_to(self, summary, expected):
+        for key in ("samples", "successes", "min", "max"):
+            self.assertEqual(summary[key], expected[key], key)
+        self.assertAlmostEqual(summary["avg"], expected["avg"], places=9)
+
+    def test_raw_rows_give_exact_results(self):
+        since, until = NOW - 2 * DAY - 1234, NOW - 5 * HOUR
+        summary = self.store.latency_summary("192.168.1.1", since, until)
+        self.assertEqual(summary, {**expected_summary(self.window(since, until)), "avg": summary["avg"]})
+        self.assertAlmostEqual(summary["avg"], expected_summary(self.window(since, until))["avg"], places=9)
+
+    def test_rollups_agree_with_raw_rows(self):
+        since, until = NOW - 2 * DAY - 1234, NOW - 5 * HOUR - 600
+        raw = self.store.latency_summary("192.168.1.1", since, until)
+        self.store.compact(now=NOW)
+        rolled = self.store.latency_summary("192.168.1.1", since, until)
+        self.assert_close_to(rolled, raw)
+        # Rollup percentiles come from 5%-wide histogram bins and never read low
+        self.assertGreaterEqual(rolled["p95"], raw["p95"])
+        self.assertLessEqual(rolled["p95"], raw["p95"] * HISTOGRAM_RATIO)
+
+    def test_rollups_answer_after_raw_rows_expire(self):
+        since, until = NOW - 3 * DAY, NOW
+        expected = expected_summary(self.window(since, until))
+        self.store.compact(now=NOW)
+        self.store.compact(now=NOW + 10) # Nothing new to roll up: must not count a bucket twice
+        self.assertGreater(self.store.compact(raw_retention_days=1, now=NOW + HOUR), 0)
+        self.assert_close_to(self.store.latency_summary("192.168.1.1", since, until), expected)
+
+    def test_rollup_percentiles_other_than_p95(self):
+        since, until = NOW - 10 * HOUR, NOW - 9 * HOUR
+        raw = self.store.latency_summary("192.168.1.1", since, until, percentile=50)
+        self.store.compact(now=NOW)
+        rolled = self.store.latency_summary("192.168.1.1", since, until, percentile=50)
+        self.assert_close_to(rolled, raw)
+        self.assertLessEqual(raw["p50"], rolled["p50"])
+        self.assertLessEqual(rolled["p50"], raw["p50"] * HISTOGRAM_RATIO)
+
+    def test_test_filter_and_empty_window(self):
+        self.assertEqual(self.store.latency_summary("192.168.1.1", NOW - DAY, test="ping_website")["samples"], 0)
+        empty = self.store.latency_summary("192.168.1.1", NOW + DAY)
+        self.assertEqual(empty, {"samples": 0, "successes": 0, "min": None, "avg": None, "max": None, "p95": None})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+"""TCP connect and HTTP probes against local servers, including keep-alive connection reuse.
+
+Run with ``python -m pytest benchmarks`` or ``python -m unittest discover benchmarks``.
+"""
+import socket
+import unittest
+from local_stubs import StubHttpServer
+from http_probe import HttpConnectionPool, http_probe, tcp_connect_probe
+
+
+def closed_tcp_port():
+    """A 127.0.0.1 TCP port nothing listens on."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class TcpConnectProbeTests(unittest.TestCase):
+    def test_connects_to_a_listener(self):
+        with socket.create_server(("127.0.0.1", 0)) as listener:
+            result = tcp_connect_probe("127.0.0.1", listener.getsockname()[1], count=3)
+        self.assertTrue(result["success"], result)
+        self.assertEqual(len(result["connect_times"]), 3)
+        self.assertTrue(all(elapsed is not None for elapsed in result["connect_times"]))
+        self.assertTrue(result["latency"].endswith("ms"))
+        self.assertIsNotNone(result["dns_ms"])
+
+    def test_refused_port(self):
+        result = tcp_connect_probe("127.0.0.1", closed_tcp_port(), count=2)
+        self.assertFalse(result["success"])
+        self.assertEqual(result["connect_times"], [None, None])
+        self.assertIn("refused", result["error"])
+
+    def test_unresolvable_host(self):
+        result = tcp_connect_probe("nonexistent.invalid", 443, count=1)
+        self.assertEqual((result["success"], result["error"], result["connect_times"]), (False, "無法找到主機", []))
+
+
+class HttpProbeTests(unittest.TestCase):
+    def test_keep_alive_reuses_one_connection(self):
+        with StubHttpServer(delay=0.01) as server:
+            result = http_probe(f"{server.url}/health?full=1", samples=4)
+            self.assertEqual(server.accepted, 1)
+            self.assertEqual(server.requests, ["/health?full=1"] * 4)
+        self.assertTrue(result["success"], result)
+        self.assertEqual(result["status"], 200)
+        self.assertEqual([sample["reused"] for sample in result["samples"]], [False, True, True, True])
+        cold, warm = result["samples"][0], result["samples"][1]
+        self.assertIsNotNone(cold["dns"])
+        self.assertIsNotNone(cold["connect"])
+        self.assertIsNone(cold["tls"]) # Plain HTTP
+        self.assertEqual((warm["dns"], warm["connect"], warm["tls"]), (None, None, None))
+        for sample in result["samples"]:
+            self.assertGreaterEqual(sample["ttfb"], 10) # The server's delay is before the first byte
+            self.assertGreaterEqual(sample["total"], sample["ttfb"])
+
+    def test_without_reuse_every_sample_opens_a_connection(self):
+        with StubHttpServer() as server:
+            result = http_probe(server.url, samples=3, reuse=False)
+            self.assertEqual(server.accepted, 3)
+        self.assertEqual([sample["reused"] for sample in result["samples"]], [False, False, False])
+
+    def test_server_closing_connections_is_not_reused(self):
+        with StubHttpServer(close_connections=True) as server:
+            result = http_probe(server.url, samples=3)
+            self.assertEqual(server.accepted, 3)
+        self.assertTrue(result["success"])
+
+    def test_shared_pool_keeps_connections_between_probes(self):
+        pool = HttpConnectionPool()
+        with StubHttpServer() as server:
+            for _ in range(3):
+                http_probe(server.url, samples=2, pool=pool)
+            pool.close()
+            # Each probe's first sample is cold by design; its second reuses that connection
+            self.assertEqual(server.accepted, 3)
+
+    def test_server_error_fails_the_probe(self):
+        with StubHttpServer(status=503) as server:
+            result = http_probe(server.url, samples=2)
+        self.assertEqual((result["success"], result["status"], result["error"]), (False, 503, "HTTP 503"))
+
+    def test_client_error_still_shows_the_site_is_up(self):
+        with StubHttpServer(status=404) as server:
+            self.assertTrue(http_probe(server.url, samples=1)["success"])
+
+    def test_refused_connection(self):
+        result = http_probe(f"http://127.0.0.1:{closed_tcp_port()}/", samples=2)
+        self.assertFalse(result["success"])
+        self.assertEqual(len(result["samples"]), 2)
+        self.assertIn("refused", result["error"])
+
+    def test_unsupported_url(self):
+        self.assertEqual(http_probe("ftp://example.com/")["error"], "不支援的網址: ftp://example.com/")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+"""Echo reply matching in the ICMP engine, fed hand-built replies instead of real ones.
+
+Run with ``python -m pytest benchmarks`` or ``python -m unittest discover benchmarks``.
+"""
+import socket
+import struct
+import time
+import unittest
+import corpus_cases # noqa: F401  (puts src/ on sys.path)
+from icmp_engine import ICMP_DEST_UNREACHABLE, ICMP_ECHO_REPLY, ICMP_ECHO_REQUEST, ICMPV6_ECHO_REPLY, IcmpEngine
+
+
+class SilentSocket(socket.socket):
+    """A UDP socket that drops what is sent and never receives, standing in for the ICMP socket."""
+
+    def sendto(self, data, address):
+        return len(data)
+
+
+class OfflineEngine(IcmpEngine):
+    def _open_socket(self):
+        return SilentSocket(socket.AF_INET, socket.SOCK_DGRAM), False
+
+
+def echo_reply(seq, identifier=0):
+    return struct.pack("!BBHHH", ICMP_ECHO_REPLY, 0, 0, identifier, seq)
+
+
+class ReplyMatchingTests(unittest.TestCase):
+    def setUp(self):
+        self.engine = OfflineEngine()
+
+    def tearDown(self):
+        self.engine.close()
+
+    def test_reply_from_another_host_does_not_answer(self):
+        request = self.engine.send_echo("192.0.2.1")
+        self.engine._handle_packet(echo_reply(request.seq), "192.0.2.2", time.perf_counter())
+        self.assertIsNone(request.rtt)
+        self.engine._handle_packet(echo_reply(request.seq), "192.0.2.1", time.perf_counter())
+        self.assertIsNotNone(request.rtt)
+
+    def test_wrapped_sequence_numbers_stay_apart(self):
+        self.engine._seq = 0xFFFF
+        first = self.engine.send_echo("192.0.2.1")
+        self.engine._seq = 0xFFFF # A sweep has sent 65536 more requests since
+        second = self.engine.send_echo("192.0.2.2")
+        self.assertEqual(first.seq, second.seq)
+        self.engine._handle_packet(echo_reply(first.seq), "192.0.2.1", time.perf_counter()) # A late reply
+        self.assertIsNotNone(first.rtt)
+        self.assertIsNone(second.rtt)
+
+    def test_ipv6_sender_with_scope_matches(self):
+        engine = OfflineEngine(socket.AF_INET6)
+        self.addCleanup(engine.close)
+        request = engine.send_echo("fe80::0001%eth0")
+        engine._handle_packet(struct.pack("!BBHHH", ICMPV6_ECHO_REPLY, 0, 0, 0, request.seq), "fe80::1%eth0", time.perf_counter())
+        self.assertIsNotNone(request.rtt)
+
+    def test_unreachable_is_matched_on_the_quoted_destination(self):
+        engine = OfflineEngine()
+        engine.raw = True # Only raw sockets see ICMP errors for echo requests
+        self.addCleanup(engine.close)
+        request = engine.send_echo("192.0.2.1")
+        other = engine.send_echo("192.0.2.2")
+
+        def unreachable(destination, seq):
+            quoted_ip = struct.pack("!BBHHHBBH4s4s", 0x45, 0, 84, 0, 0, 64, 1, 0, socket.inet_aton("198.51.100.9"),
+                                    socket.inet_aton(destination))
+            quoted_echo = struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, 0, engine.identifier, seq)
+            outer_ip = struct.pack("!BBHHHBBH4s4s", 0x45, 0, 0, 0, 0, 64, 1, 0, socket.inet_aton("203.0.113.1"),
+                                   socket.inet_aton("198.51.100.9"))
+            return outer_ip + struct.pack("!BBHI", ICMP_DEST_UNREACHABLE, 1, 0, 0) + quoted_ip + quoted_echo
+
+        engine._handle_packet(unreachable("192.0.2.2", request.seq), "203.0.113.1", time.perf_counter())
+        self.assertEqual((request.error, other.error), ("", ""))
+        engine._handle_packet(unreachable("192.0.2.1", request.seq), "203.0.113.1", time.perf_counter())
+        self.assertEqual(request.error, "目的地主機無法連線")
+        self.assertEqual(other.error, "")
+
+
+if __name__ == "__main__":
+    unittest.main()
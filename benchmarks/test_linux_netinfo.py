@@ -0,0 +1,243 @@
+"""Linux network information from recorded rtnetlink replies and fixture /proc and /etc files.
+
+Run with ``python -m pytest benchmarks`` or ``python -m unittest discover benchmarks``.
+"""
+import os
+import socket
+import struct
+import tempfile
+import unittest
+from unittest import mock
+import corpus_cases # noqa: F401  (puts src/ on sys.path)
+import linux_netinfo
+from linux_netinfo import (IFA_ADDRESS, IFA_LOCAL, IFF_LOOPBACK, IFF_RUNNING, IFF_UP, IFLA_IFNAME, NLMSG_DONE,
+                           NLMSG_ERROR, RTM_NEWADDR, RTM_NEWLINK, NetworkInfoCache, read_network_info)
+
+ROUTE_TABLE = (
+    "Iface\tDestination\tGateway \tFlags\tRefCnt\tUse\tMetric\tMask\t\tMTU\tWindow\tIRTT\n"
+    "wlan0\t00000000\t0100000A\t0003\t0\t0\t600\t00000000\t0\t0\t0\n" # default via 10.0.0.1, metric 600
+    "eth0\t00000000\t0101A8C0\t0003\t0\t0\t100\t00000000\t0\t0\t0\n" # default via 192.168.1.1, metric 100
+    "eth0\t0001A8C0\t00000000\t0001\t0\t0\t100\t00FFFFFF\t0\t0\t0\n" # on-link 192.168.1.0/24
+    "tun0\t00000000\t00000000\t0001\t0\t0\t50\t00000000\t0\t0\t0\n" # default without a gateway
+)
+RESOLV_CONF = "# generated\nsearch campus.example\nnameserver 192.168.1.53\nnameserver  2001:db8::53 \noptions edns0\nnameserver\n"
+
+
+def attribute(attr_type, data):
+    length = 4 + len(data)
+    return struct.pack("=HH", length, attr_type) + data + b"\x00" * (-length % 4)
+
+
+def message(msg_type, payload, seq=1):
+    return struct.pack("=IHHII", 16 + len(payload), msg_type, 2, seq, 0) + payload + b"\x00" * (-len(payload) % 4)
+
+
+def link(index, name, flags):
+    return message(RTM_NEWLINK, struct.pack("=BxHiII", socket.AF_UNSPEC, 1, index, flags, 0)
+                   + attribute(IFLA_IFNAME, name.encode() + b"\x00"))
+
+
+def address(index, ip, prefix_len):
+    return message(RTM_NEWADDR, struct.pack("=BBBBI", socket.AF_INET, prefix_len, 0, 0, index)
+                   + attribute(IFA_ADDRESS, socket.inet_aton(ip)) + attribute(IFA_LOCAL, socket.inet_aton(ip)))
+
+
+DONE = message(NLMSG_DONE, struct.pack("=i", 0))
+LINKS = [link(1, "lo", IFF_UP | IFF_RUNNING | IFF_LOOPBACK), link(2, "eth0", IFF_UP | IFF_RUNNING), link(3, "wlan0", IFF_UP)]
+ADDRESSES = [address(1, "127.0.0.1", 8), address(3, "10.0.0.7", 16), address(2, "192.168.1.20", 24),
+             address(2, "192.168.1.21", 24)] # A secondary address: the first one wins
+
+
+class RecordedNetlinkSocket:
+    """Stands in for the rtnetlink socket, replaying recorded reply datagrams."""
+
+    def __init__(self, datagrams):
+        self.datagrams = list(datagrams)
+        self.requests = []
+
+    def sendto(self, data, address):
+        self.requests.append(data)
+
+    def recv(self, size):
+        return self.datagrams.pop(0)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+class FixtureTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def fixture(self, name, content):
+        path = os.path.join(self.directory.name, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as fixture_file:
+            fixture_file.write(content)
+        return path
+
+
+@unittest.skipUnless(hasattr(socket, "AF_NETLINK"), "rtnetlink is Linux only")
+class NetlinkParsingTests(unittest.TestCase):
+    def dump(self, datagrams):
+        sock = RecordedNetlinkSocket(datagrams)
+        with mock.patch.object(linux_netinfo.socket, "socket", return_value=sock):
+            return linux_netinfo._netlink_dump(linux_netinfo.RTM_GETLINK, b"\x00" * 16), sock
+
+    def test_dump_spans_several_datagrams(self):
+        messages, sock = self.dump([b"".join(LINKS[:2]), LINKS[2] + DONE])
+        self.assertEqual([reply_type for reply_type, _ in messages], [RTM_NEWLINK] * 3)
+        length, msg_type, flags = struct.unpack_from("=IHH", sock.requests[0])
+        self.assertEqual((length, msg_type, flags), (32, linux_netinfo.RTM_GETLINK, 0x301))
+
+    def test_error_reply_raises(self):
+        with self.assertRaises(OSError):
+            self.dump([message(NLMSG_ERROR, struct.pack("=i", -1) + b"\x00" * 16)])
+
+    def test_attributes(self):
+        data = attribute(IFLA_IFNAME, b"eth0\x00") + attribute(IFA_ADDRESS, b"\x01\x02\x03\x04") \
+            + attribute(IFLA_IFNAME, b"dup\x00") + struct.pack("=HH", 2, 9) # A duplicate, then a bogus length
+        self.assertEqual(linux_netinfo._parse_attributes(data, 0), {IFLA_IFNAME: b"eth0\x00", IFA_ADDRESS: b"\x01\x02\x03\x04"})
+
+    def test_links_and_addresses(self):
+        sockets = [RecordedNetlinkSocket([b"".join(LINKS) + DONE]), RecordedNetlinkSocket([b"".join(ADDRESSES) + DONE])]
+        with mock.patch.object(linux_netinfo.socket, "socket", side_effect=sockets):
+            links = linux_netinfo._read_links()
+            addresses = linux_netinfo._read_ipv4_addresses()
+        self.assertEqual(links, {1: {"name": "lo", "flags": IFF_UP | IFF_RUNNING | IFF_LOOPBACK},
+                                 2: {"name": "eth0", "flags": IFF_UP | IFF_RUNNING}, 3: {"name": "wlan0", "flags": IFF_UP}})
+        self.assertEqual(addresses, {1: ("127.0.0.1", "255.0.0.0"), 2: ("192.168.1.20", "255.255.255.0"),
+                                     3: ("10.0.0.7", "255.255.0.0")})
+
+
+class ProcFileTests(FixtureTestCase):
+    def test_lowest_metric_default_route_with_a_gateway(self):
+        with mock.patch.object(linux_netinfo, "PROC_ROUTE_PATH", self.fixture("route", ROUTE_TABLE)):
+            self.assertEqual(linux_netinfo._read_default_route(), ("eth0", "192.168.1.1"))
+
+    def test_no_default_route(self):
+        lines = ROUTE_TABLE.splitlines(keepends=True)
+        with mock.patch.object(linux_netinfo, "PROC_ROUTE_PATH", self.fixture("route", lines[0] + lines[3] + lines[4])):
+            self.assertEqual(linux_netinfo._read_default_route(), (None, None))
+        with mock.patch.object(linux_netinfo, "PROC_ROUTE_PATH", os.path.join(self.directory.name, "missing")):
+            self.assertEqual(linux_netinfo._read_default_route(), (None, None))
+
+    def test_dns_servers(self):
+        with mock.patch.object(linux_netinfo, "RESOLV_CONF_PATH", self.fixture("resolv.conf", RESOLV_CONF)):
+            self.assertEqual(linux_netinfo._read_dns_servers(), ["192.168.1.53", "2001:db8::53"])
+        with mock.patch.object(linux_netinfo, "RESOLV_CONF_PATH", os.path.join(self.directory.name, "missing")):
+            self.assertEqual(linux_netinfo._read_dns_servers(), [])
+
+
+class ReadNetworkInfoTests(FixtureTestCase):
+    def read(self, route_table, links=LINKS):
+        replies = {linux_netinfo.RTM_GETLINK: links, linux_netinfo.RTM_GETADDR: ADDRESSES}
+        dump = lambda msg_type, body: [(struct.unpack_from("=IH", reply)[1], reply[16:]) for reply in replies[msg_type]]
+        self.fixture("net/wlan0/wireless/.keep", "")
+        with mock.patch.object(linux_netinfo, "_netlink_dump", dump), \
+                mock.patch.object(linux_netinfo, "PROC_ROUTE_PATH", self.fixture("route", route_table)), \
+                mock.patch.object(linux_netinfo, "RESOLV_CONF_PATH", self.fixture("resolv.conf", RESOLV_CONF)), \
+                mock.patch.object(linux_netinfo, "SYS_NET_PATH", os.path.join(self.directory.name, "net")):
+            return read_network_info()
+
+    def test_adapter_with_the_default_route(self):
+        self.assertEqual(self.read(ROUTE_TABLE), {
+            "ip_address": "192.168.1.20", "subnet_mask": "255.255.255.0", "default_gateway": "192.168.1.1",
+            "dns_servers": ["192.168.1.53", "2001:db8::53"], "adapter_name": "eth0", "connection_type": "有線",
+            "status": "已連線"})
+
+    def test_wireless_adapter_not_running(self):
+        route_table = ROUTE_TABLE.splitlines(keepends=True)
+        info = self.read(route_table[0] + route_table[1]) # Only wlan0 has a default route
+        self.assertEqual((info["adapter_name"], info["ip_address"], info["default_gateway"]), ("wlan0", "10.0.0.7", "10.0.0.1"))
+        self.assertEqual((info["connection_type"], info["status"]), ("無線", "Disconnected"))
+
+    def test_without_a_default_route(self):
+        info = self.read(ROUTE_TABLE.splitlines(keepends=True)[0])
+        self.assertEqual((info["adapter_name"], info["default_gateway"]), ("eth0", "N/A")) # Lowest index wins
+
+    def test_loopback_only(self):
+        info = self.read(ROUTE_TABLE, links=LINKS[:1])
+        self.assertEqual((info["adapter_name"], info["ip_address"], info["status"]), ("N/A", "N/A", "Disconnected"))
+        self.assertEqual(info["dns_servers"], ["192.168.1.53", "2001:db8::53"])
+
+
+class RecordedEvents:
+    """Stands in for the non-blocking event socket: each recv() returns the next recorded event or raises."""
+
+    def __init__(self):
+        self.pending = []
+
+    def recv(self, size):
+        if not self.pending:
+            raise BlockingIOError
+        event = self.pending.pop(0)
+        if isinstance(event, Exception):
+            raise event
+        return event
+
+
+@unittest.skipUnless(hasattr(socket, "AF_NETLINK"), "rtnetlink is Linux only")
+class NetworkInfoCacheTests(FixtureTestCase):
+    def setUp(self):
+        super().setUp()
+        self.resolv_conf = self.fixture("resolv.conf", RESOLV_CONF)
+        self.reads = 0
+
+        def read():
+            self.reads += 1
+            return {"ip_address": f"192.168.1.{self.reads}", "dns_servers": ["192.168.1.53"]}
+
+        for patcher in (mock.patch.object(linux_netinfo, "RESOLV_CONF_PATH", self.resolv_conf),
+                        mock.patch.object(linux_netinfo, "read_network_info", read)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.cache = NetworkInfoCache()
+        self.cache._events.close()
+        self.cache._events = self.events = RecordedEvents()
+
+    def test_cached_until_something_changes(self):
+        first = self.cache.get()
+        self.assertEqual(self.cache.get(), first)
+        self.assertEqual(self.reads, 1)
+
+    def test_copies_are_returned(self):
+        self.cache.get()["dns_servers"].append("203.0.113.1")
+        self.assertEqual(self.cache.get()["dns_servers"], ["192.168.1.53"])
+
+    def test_netlink_event_invalidates(self):
+        self.cache.get()
+        self.events.pending = [link(2, "eth0", IFF_UP), address(2, "192.168.1.99", 24)]
+        self.assertEqual(self.cache.get()["ip_address"], "192.168.1.2")
+        self.assertEqual((self.reads, self.events.pending), (2, []))
+        self.cache.get()
+        self.assertEqual(self.reads, 2)
+
+    def test_overrun_invalidates(self):
+        self.cache.get()
+        self.events.pending = [OSError(105, "No buffer space available")]
+        self.cache.get()
+        self.assertEqual(self.reads, 2)
+
+    def test_resolv_conf_change_invalidates(self):
+        self.cache.get()
+        mtime = os.stat(self.resolv_conf).st_mtime_ns
+        os.utime(self.resolv_conf, ns=(mtime + 10 ** 9, mtime + 10 ** 9))
+        self.cache.get()
+        os.remove(self.resolv_conf)
+        self.cache.get()
+        self.assertEqual(self.reads, 3)
+
+    def test_invalidate(self):
+        self.cache.get()
+        self.cache.invalidate()
+        self.cache.get()
+        self.assertEqual(self.reads, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
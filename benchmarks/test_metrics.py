@@ -0,0 +1,38 @@
+"""OpenMetrics rendering and the cap on per-target series.
+
+Run with ``python -m pytest benchmarks`` or ``python -m unittest discover benchmarks``.
+"""
+import unittest
+import corpus_cases # noqa: F401  (puts src/ on sys.path)
+from metrics import Histogram, OVERFLOW_TARGET, Registry, _format_bound
+
+
+class BucketBoundTests(unittest.TestCase):
+    def test_bounds_are_canonical_floats(self):
+        self.assertEqual([_format_bound(bound) for bound in (0.0005, 0.1, 1, 2.5, 10, 60.0, 1e-05, 1e22, float("inf"))],
+                         ["0.0005", "0.1", "1.0", "2.5", "10.0", "60.0", "1e-05", "1e+22", "+Inf"])
+
+    def test_histogram_exposition(self):
+        histogram = Histogram("netdiag_test_seconds", "Test.", ("target",), buckets=(0.5, 1, 10))
+        for value in (0.2, 0.7, 0.7, 20):
+            histogram.observe(("gw",), value)
+        self.assertEqual(histogram.render()[2:], [
+            'netdiag_test_seconds_bucket{target="gw",le="0.5"} 1',
+            'netdiag_test_seconds_bucket{target="gw",le="1.0"} 3',
+            'netdiag_test_seconds_bucket{target="gw",le="10.0"} 3',
+            'netdiag_test_seconds_bucket{target="gw",le="+Inf"} 4',
+            'netdiag_test_seconds_sum{target="gw"} 21.6',
+            'netdiag_test_seconds_count{target="gw"} 4',
+        ])
+
+
+class TargetLabelTests(unittest.TestCase):
+    def test_targets_beyond_the_cap_share_one_label(self):
+        registry = Registry(max_targets=3)
+        labels = [registry.target_label(f"10.0.0.{index}") for index in range(10)]
+        self.assertEqual(labels, ["10.0.0.0", "10.0.0.1", "10.0.0.2"] + [OVERFLOW_TARGET] * 7)
+        self.assertEqual(registry.target_label("10.0.0.1"), "10.0.0.1") # Targets seen before keep their label
+
+
+if __name__ == "__main__":
+    unittest.main()
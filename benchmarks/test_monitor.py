@@ -0,0 +1,60 @@
+"""Monitoring: the RTT ring buffer and the targets --monitor reads from a file.
+
+Run with ``python -m pytest benchmarks`` or ``python -m unittest discover benchmarks``.
+"""
+import io
+import math
+import os
+import tempfile
+import unittest
+from unittest import mock
+import corpus_cases # noqa: F401  (puts src/ on sys.path)
+import cli
+from monitor import RttRingBuffer
+
+
+class RttRingBufferTests(unittest.TestCase):
+    def test_window_keeps_the_newest_samples(self):
+        buffer = RttRingBuffer(3)
+        for rtt in (1.0, 2.0, None, 4.0):
+            buffer.add(rtt)
+        stats = buffer.stats()
+        values = buffer.values() # Oldest first; the lost packet is NaN
+        self.assertEqual((values[0], values[2]), (2.0, 4.0))
+        self.assertTrue(math.isnan(values[1]))
+        self.assertEqual((stats["samples"], stats["total"], stats["last"]), (3, 4, 4.0))
+        self.assertAlmostEqual(stats["loss_percent"], 100 / 3)
+        self.assertEqual((stats["min"], stats["avg"], stats["max"], stats["p95"]), (2.0, 3.0, 4.0, 4.0))
+
+    def test_empty_window(self):
+        self.assertEqual(RttRingBuffer(5).stats()["loss_percent"], None)
+
+    def test_window_must_hold_a_sample(self):
+        for size in (0, -1):
+            with self.assertRaises(ValueError):
+                RttRingBuffer(size)
+
+
+class RunMonitorTests(unittest.TestCase):
+    def monitored_targets(self, content):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "hosts.txt")
+            with open(path, "w", encoding="utf-8") as targets_file:
+                targets_file.write(content)
+            with mock.patch.object(cli, "Monitor") as monitor:
+                monitor.return_value.snapshot.return_value = {}
+                cli.run_monitor(None, path, cli.JsonLinesWriter(io.StringIO()), 1.0, 10, 1000, 0)
+        return monitor.call_args.args[0]
+
+    def test_targets_file_is_expanded_like_a_sweep(self):
+        targets = self.monitored_targets("# routers\n  # core\n192.0.2.1\n\n 198.51.100.0/30 \ngw.example\n")
+        self.assertEqual(targets, ["192.0.2.1", "198.51.100.1", "198.51.100.2", "gw.example"])
+
+    def test_zero_window_is_a_usage_error(self):
+        with mock.patch.object(cli, "Monitor") as monitor, mock.patch("sys.stderr"):
+            self.assertEqual(cli.main(["--monitor", "--window", "0"]), cli.EXIT_USAGE_ERROR)
+        monitor.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+"""Regression tests: every corpus file must parse to the result in corpus/expected.json.
+
+Run with ``python -m pytest benchmarks`` or ``python -m unittest discover benchmarks``.
+"""
+import unittest
+from corpus_cases import load_expected, parse
+
+EXPECTED = load_expected()
+
+
+class CorpusParserTests(unittest.TestCase):
+    def check(self, name):
+        case = EXPECTED[name]
+        result = parse(name, case.get("count", 4))
+        if isinstance(case["expected"], dict):
+            result = {key: result.get(key) for key in case["expected"]}
+        self.assertEqual(result, case["expected"])
+
+    def test_ping_windows_zh_tw(self):
+        self.check("ping_win_zh_tw_ok.txt")
+
+    def test_ping_windows_zh_tw_partial_loss(self):
+        self.check("ping_win_zh_tw_loss.txt")
+
+    def test_ping_windows_zh_tw_unreachable(self):
+        self.check("ping_win_zh_tw_down.txt")
+
+    def test_ping_windows_en(self):
+        self.check("ping_win_en_ok.txt")
+
+    def test_ping_linux(self):
+        self.check("ping_linux_ok.txt")
+
+    def test_ping_linux_partial_loss(self):
+        self.check("ping_linux_loss.txt")
+
+    def test_ping_linux_unreachable(self):
+        self.check("ping_linux_down.txt")
+
+    def test_tracert_windows_zh_tw(self):
+        self.check("tracert_win_zh_tw.txt")
+
+    def test_tracert_windows_en(self):
+        self.check("tracert_win_en.txt")
+
+    def test_traceroute_linux(self):
+        self.check("tracert_linux.txt")
+
+    def test_ipconfig_windows_zh_tw(self):
+        self.check("ipconfig_win_zh_tw.txt")
+
+    def test_ipconfig_windows_en(self):
+        self.check("ipconfig_win_en.txt")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+"""Path diffs and incremental traceroutes, with probe_ttls and trace_hops stubbed out.
+
+Run with ``python -m pytest benchmarks`` or ``python -m unittest discover benchmarks``.
+"""
+import os
+import tempfile
+import unittest
+from unittest import mock
+import corpus_cases # noqa: F401  (puts src/ on sys.path)
+import traceroute_engine
+from path_cache import PathCache, diff_paths
+from traceroute_engine import HOP_TIMED_OUT, trace_incremental
+
+TARGET = "192.0.2.99"
+
+
+def hop(num, ip, latency="1.000ms"):
+    return {"num": num, "ip": ip, "latency": latency}
+
+
+def path(*ips):
+    return [hop(num, ip) for num, ip in enumerate(ips, start=1)]
+
+
+class DiffPathsTests(unittest.TestCase):
+    def test_same_path(self):
+        diff = diff_paths(path("10.0.0.1", "10.0.1.1", TARGET), path("10.0.0.1", "10.0.1.1", TARGET))
+        self.assertEqual(diff, {"changed": False, "added": [], "removed": [], "changed_hops": []})
+
+    def test_changed_added_and_removed_hops(self):
+        diff = diff_paths(path("10.0.0.1", "10.0.1.1", TARGET), path("10.0.0.1", "10.0.2.1", "10.0.3.1", TARGET))
+        self.assertTrue(diff["changed"])
+        self.assertEqual(diff["changed_hops"], [{"num": 2, "old_ip": "10.0.1.1", "new_ip": "10.0.2.1"},
+                                                {"num": 3, "old_ip": TARGET, "new_ip": "10.0.3.1"}])
+        self.assertEqual(diff["added"], [hop(4, TARGET)])
+        self.assertEqual(diff_paths(path("10.0.0.1", "10.0.1.1", TARGET), path("10.0.0.1", TARGET))["removed"],
+                         [hop(3, TARGET)])
+
+    def test_silent_hops_and_errors_are_not_changes(self):
+        diff = diff_paths(path("10.0.0.1", HOP_TIMED_OUT, TARGET), path("10.0.0.1", "10.0.1.1", TARGET))
+        self.assertFalse(diff["changed"])
+        self.assertFalse(diff_paths(path("10.0.0.1"), [{"num": "Error", "ip": "無法找到主機", "latency": "N/A"}]
+                                    + path("10.0.0.1"))["changed"])
+
+
+class TraceIncrementalTests(unittest.TestCase):
+    def trace(self, cached, answers):
+        """Runs trace_incremental; ``answers`` are what probe_ttls sees now, as {ttl: ip}, TARGET reaching it."""
+        probed = []
+
+        def probe_ttls(address, ttls, timeout):
+            probed.append(list(ttls))
+            return {ttl: (hop(ttl, answers[ttl], "0.500ms"), answers[ttl] == TARGET) for ttl in ttls if ttl in answers}
+
+        def trace_hops(address, max_hops, timeout, probes, first_ttl=1):
+            self.traced_from.append(first_ttl)
+            yield hop(first_ttl, "203.0.113.1", "9.000ms")
+
+        self.traced_from = []
+        with mock.patch.object(traceroute_engine, "probe_ttls", probe_ttls), \
+                mock.patch.object(traceroute_engine, "trace_hops", trace_hops):
+            hops = list(trace_incremental(TARGET, cached, max_hops=30, timeout=500))
+        return hops, probed
+
+    def test_unchanged_path_is_verified_with_one_probe_per_hop(self):
+        cached = path("10.0.0.1", HOP_TIMED_OUT, "10.0.2.1", TARGET)
+        hops, probed = self.trace(cached, {1: "10.0.0.1", 3: "10.0.2.1", 4: TARGET})
+        self.assertEqual(probed, [[1, 3, 4]]) # The hop that was silent last time is not probed again
+        self.assertEqual([(hop["num"], hop["ip"]) for hop in hops], [(1, "10.0.0.1"), (2, HOP_TIMED_OUT),
+                                                                     (3, "10.0.2.1"), (4, TARGET)])
+        self.assertEqual(hops[0]["latency"], "0.500ms") # Fresh timing, not the cached one
+        self.assertEqual(self.traced_from, [])
+
+    def test_retrace_starts_at_the_first_changed_hop(self):
+        cached = path("10.0.0.1", "10.0.1.1", "10.0.2.1", TARGET)
+        hops, _ = self.trace(cached, {1: "10.0.0.1", 2: "10.9.9.9", 3: "10.0.2.1", 4: TARGET})
+        self.assertEqual(self.traced_from, [2])
+        self.assertEqual([hop["ip"] for hop in hops], ["10.0.0.1", "203.0.113.1"])
+
+    def test_retrace_starts_at_a_hop_that_went_silent(self):
+        cached = path("10.0.0.1", "10.0.1.1", TARGET)
+        self.trace(cached, {1: "10.0.0.1", 3: TARGET})
+        self.assertEqual(self.traced_from, [2])
+
+    def test_path_that_stops_short_of_the_target_continues_past_its_end(self):
+        cached = path("10.0.0.1", "10.0.1.1")
+        hops, _ = self.trace(cached, {1: "10.0.0.1", 2: "10.0.1.1"})
+        self.assertEqual(self.traced_from, [3])
+        self.assertEqual([hop["num"] for hop in hops], [1, 2, 3])
+
+    def test_path_ending_in_silence_is_traced_from_scratch(self):
+        hops, probed = self.trace(path("10.0.0.1", HOP_TIMED_OUT), {})
+        self.assertEqual((probed, self.traced_from), ([], [1]))
+        hops, probed = self.trace([], {})
+        self.assertEqual((probed, self.traced_from), ([], [1]))
+
+
+class PathCacheTests(unittest.TestCase):
+    def test_update_returns_the_diff_and_persists(self):
+        with tempfile.TemporaryDirectory() as directory:
+            file_path = os.path.join(directory, "trace_paths.json")
+            cache = PathCache(file_path)
+            self.assertIsNone(cache.update(TARGET, path("10.0.0.1", TARGET)))
+            diff = cache.update(TARGET, path("10.0.0.2", TARGET))
+            self.assertEqual(diff["changed_hops"], [{"num": 1, "old_ip": "10.0.0.1", "new_ip": "10.0.0.2"}])
+            self.assertEqual(cache.last_diff(TARGET), diff)
+            self.assertIsNone(cache.update(TARGET, [{"num": "Error", "ip": "無法找到主機", "latency": "N/A"}]))
+            self.assertEqual(PathCache(file_path).get(TARGET), path("10.0.0.2", TARGET))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,149 @@
+"""The PTR cache and hop naming by reverse DNS, against a local stub resolver.
+
+Run with ``python -m pytest benchmarks`` or ``python -m unittest discover benchmarks``.
+"""
+import json
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+from local_stubs import StubResolver
+from dns_probe import QTYPE_PTR
+from reverse_dns import HopNameResolver, PtrCache, lookup_ptr
+
+PTR_RECORDS = {
+    ("1.0.168.192.in-addr.arpa", QTYPE_PTR): [(300, "gateway.lan")],
+    ("1.113.0.203.in-addr.arpa", QTYPE_PTR): [(300, "core1.example.net")],
+}
+
+
+def trace(resolver, ips):
+    """Feeds hops to ``resolver`` the way tracert_host does while a trace runs, then annotates them."""
+    hops = [{"num": str(index), "ip": ip, "latency": "1ms"} for index, ip in enumerate(ips, start=1)]
+    for hop in hops:
+        resolver.prefetch([hop["ip"]])
+    return resolver.annotate(hops, "example.com")
+
+
+class PtrCacheTests(unittest.TestCase):
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = PtrCache(max_entries=2)
+        cache.put("192.0.2.1", "a.example")
+        cache.put("192.0.2.2", "b.example")
+        cache.get("192.0.2.1") # Now the most recently used
+        cache.put("192.0.2.3", "c.example")
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.get("192.0.2.2"), (False, None))
+        self.assertEqual(cache.get("192.0.2.1"), (True, "a.example"))
+        self.assertEqual(cache.get("192.0.2.3"), (True, "c.example"))
+
+    def test_entries_expire_after_their_ttl(self):
+        cache = PtrCache(max_ttl=600, negative_ttl=60)
+        with mock.patch("time.time", return_value=1000.0):
+            cache.put("192.0.2.1", "short.example", ttl=30)
+            cache.put("192.0.2.2", "long.example", ttl=86400) # Capped at max_ttl
+            cache.put("192.0.2.3", None) # No PTR record: negative_ttl
+        with mock.patch("time.time", return_value=1059.0):
+            self.assertEqual(cache.get("192.0.2.1"), (False, None))
+            self.assertEqual(cache.get("192.0.2.3"), (True, None))
+        with mock.patch("time.time", return_value=1061.0):
+            self.assertEqual(cache.get("192.0.2.3"), (False, None))
+            self.assertEqual(cache.get("192.0.2.2"), (True, "long.example"))
+        with mock.patch("time.time", return_value=1601.0):
+            self.assertEqual(cache.get("192.0.2.2"), (False, None))
+
+    def test_persists_across_instances(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "hop_names.json")
+            cache = PtrCache(path)
+            cache.put("192.0.2.1", "router.example")
+            cache.put("192.0.2.2", None)
+            cache.put("192.0.2.3", "gone.example", ttl=1)
+            with mock.patch("time.time", return_value=time.time() + 2):
+                cache.save()
+                reloaded = PtrCache(path) # Expired entries are not loaded back
+            self.assertEqual(len(reloaded), 2)
+            self.assertEqual(reloaded.get("192.0.2.1"), (True, "router.example"))
+            self.assertEqual(reloaded.get("192.0.2.2"), (True, None))
+            self.assertFalse(os.path.exists(f"{path}.tmp"))
+
+    def test_unreadable_file_starts_empty(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "hop_names.json")
+            with open(path, "w", encoding="utf-8") as cache_file:
+                cache_file.write("{not json")
+            with mock.patch("builtins.print"):
+                self.assertEqual(len(PtrCache(path)), 0)
+
+    def test_wrong_shapes_are_skipped(self):
+        future = time.time() + 600
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "hop_names.json")
+            for content in ({}, None, 42, "text", [["192.0.2.1"]], [[1, 2, 3]], [["192.0.2.1", 5, future]]):
+                with self.subTest(content=content):
+                    with open(path, "w", encoding="utf-8") as cache_file:
+                        json.dump(content, cache_file)
+                    with mock.patch("builtins.print"):
+                        self.assertEqual(len(PtrCache(path)), 0)
+            with open(path, "w", encoding="utf-8") as cache_file:
+                json.dump([["192.0.2.1", "a.example", future], ["192.0.2.2", "b.example"], None,
+                           ["192.0.2.3", None, "soon"], ["192.0.2.4", None, future]], cache_file)
+            cache = PtrCache(path)
+            self.assertEqual(len(cache), 2)
+            self.assertEqual(cache.get("192.0.2.1"), (True, "a.example"))
+            self.assertEqual(cache.get("192.0.2.4"), (True, None))
+
+
+class LookupPtrTests(unittest.TestCase):
+    def test_answers_and_nxdomain_are_cached_but_timeouts_are_not(self):
+        cache = PtrCache()
+        with StubResolver(PTR_RECORDS, drop=["9.2.0.192.in-addr.arpa"]) as stub:
+            names = lookup_ptr(["192.168.0.1", "198.51.100.7", "192.0.2.9", "要求等候逾時"], stub.address, cache,
+                               timeout=200)
+            self.assertEqual(names, {"192.168.0.1": "gateway.lan", "198.51.100.7": None})
+            self.assertEqual(cache.get("192.0.2.9"), (False, None)) # Retried next time
+            queries = len(stub.queries)
+            self.assertEqual(lookup_ptr(["192.168.0.1", "198.51.100.7"], stub.address, cache), names)
+            self.assertEqual(len(stub.queries), queries) # Both answered from the cache
+
+    def test_ipv6_hops(self):
+        records = {("1.0.0.0.0.0.0.0.0.0.0.0.0.0.0.0.0.0.0.0.0.0.0.0.8.b.d.0.1.0.0.2.ip6.arpa", QTYPE_PTR):
+                   [(300, "v6.example.net")]}
+        with StubResolver(records) as stub:
+            self.assertEqual(lookup_ptr(["2001:db8::1"], stub.address, PtrCache()), {"2001:db8::1": "v6.example.net"})
+
+
+class HopNameResolverTests(unittest.TestCase):
+    def test_annotate_never_waits_for_lookups(self):
+        named = []
+        with StubResolver(PTR_RECORDS, delay=0.3) as stub:
+            resolver = HopNameResolver(stub.address, PtrCache(), on_name=lambda host, hop: named.append((host, hop)))
+            started = time.perf_counter()
+            hops = trace(resolver, ["192.168.0.1", "203.0.113.1", "198.51.100.7", "要求等候逾時"])
+            self.assertLess(time.perf_counter() - started, 0.1)
+            self.assertEqual([hop.get("name") for hop in hops], [None] * 4)
+            self.assertTrue(resolver.wait(timeout=2))
+        # Late names are set on the trace's own hops and reported once each
+        self.assertEqual([hop.get("name") for hop in hops], ["gateway.lan", "core1.example.net", None, None])
+        self.assertEqual(sorted((host, hop["num"]) for host, hop in named), [("example.com", "1"), ("example.com", "2")])
+        self.assertTrue(all(hop is hops[int(hop["num"]) - 1] for _, hop in named))
+
+    def test_cached_names_are_added_at_once(self):
+        named = []
+        with StubResolver(PTR_RECORDS) as stub:
+            cache = PtrCache()
+            resolver = HopNameResolver(stub.address, cache, on_name=lambda host, hop: named.append(hop))
+            trace(resolver, ["192.168.0.1", "203.0.113.1"])
+            self.assertTrue(resolver.wait(timeout=2))
+            queries = len(stub.queries)
+            named.clear()
+            hops = trace(resolver, ["192.168.0.1", "203.0.113.1"])
+            self.assertTrue(resolver.wait(timeout=2))
+            self.assertEqual(len(stub.queries), queries)
+        self.assertEqual([hop.get("name") for hop in hops], ["gateway.lan", "core1.example.net"])
+        self.assertEqual(named, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
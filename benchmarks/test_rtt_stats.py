@@ -0,0 +1,93 @@
+"""Vectorized RTT statistics against plain reference computations.
+
+Run with ``python -m pytest benchmarks`` or ``python -m unittest discover benchmarks``.
+"""
+import math
+import random
+import unittest
+from unittest import mock
+import corpus_cases # noqa: F401  (puts src/ on sys.path)
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+import cli
+
+if np is not None:
+    from rtt_stats import JITTER_GAIN, jitter, loss_bursts, summarize, summarize_rtts, to_matrix
+
+NAN = float("nan")
+
+
+def reference_jitter(rtts):
+    """RFC 3550 section 6.4.1 jitter, one received sample at a time; lost samples are skipped."""
+    estimate, previous = 0.0, None
+    for rtt in rtts:
+        if rtt is None or math.isnan(rtt):
+            continue
+        if previous is not None:
+            estimate += (abs(rtt - previous) - estimate) * JITTER_GAIN
+        previous = rtt
+    return estimate
+
+
+def random_rows(generator, rows=20, width=40, loss=0.2):
+    return [[NAN if generator.random() < loss else generator.expovariate(1 / 20) for _ in range(width)]
+            for _ in range(rows)]
+
+
+@unittest.skipIf(np is None, "NumPy not installed")
+class RttStatsTests(unittest.TestCase):
+    def test_jitter_matches_the_rfc_3550_loop(self):
+        rows = random_rows(random.Random(3)) + [[10.0, NAN, NAN, 30.0, 20.0], [NAN, 5.0, NAN], [NAN, NAN]]
+        matrix, _ = to_matrix(rows)
+        for row, value in zip(rows, jitter(matrix)):
+            self.assertAlmostEqual(value, reference_jitter(row), places=9)
+
+    def test_percentiles_match_nanpercentile(self):
+        matrix, sent = to_matrix(random_rows(random.Random(5)))
+        stats = summarize(matrix, sent, percentiles=(0, 25, 50, 90, 95, 99, 100))
+        for percentile in (0, 25, 50, 90, 95, 99, 100):
+            np.testing.assert_allclose(stats[f"p{percentile}"], np.nanpercentile(matrix, percentile, axis=1))
+
+    def test_loss_bursts_of_hand_built_patterns(self):
+        patterns = [
+            ([1, 2, 3, 4], (0, 0)),
+            ([NAN, NAN, NAN], (1, 3)),
+            ([NAN, 1, NAN, NAN, 2, NAN], (3, 2)),
+            ([1, NAN, NAN, NAN, 2, NAN, 3], (2, 3)),
+            ([1, 2, NAN], (1, 1)),
+        ]
+        for row, expected in patterns:
+            with self.subTest(row=row):
+                counts, longest = loss_bursts(np.array([row], dtype=float))
+                self.assertEqual((int(counts[0]), int(longest[0])), expected)
+
+    def test_loss_bursts_stay_within_rows(self):
+        # Row 0 ends lost and row 1 starts lost; padding of the short row is not a loss
+        matrix, sent = to_matrix([[1.0, None, None], [None, 2.0], [3.0]])
+        counts, longest = loss_bursts(matrix, sent)
+        self.assertEqual(counts.tolist(), [1, 1, 0])
+        self.assertEqual(longest.tolist(), [2, 1, 0])
+
+    def test_single_target_summary(self):
+        stats = summarize_rtts([10.0, None, 30.0, 20.0])
+        self.assertEqual((stats["sent"], stats["received"], stats["loss_percent"]), (4, 3, 25.0))
+        self.assertEqual((stats["min"], stats["avg"], stats["max"], stats["p50"]), (10.0, 20.0, 30.0, 20.0))
+        self.assertAlmostEqual(stats["jitter"], reference_jitter([10.0, None, 30.0, 20.0]))
+        unanswered = summarize_rtts([None, None])
+        self.assertEqual((unanswered["avg"], unanswered["jitter"], unanswered["p95"]), (None, None, None))
+
+
+class StatsOptionTests(unittest.TestCase):
+    def test_missing_numpy_is_reported_before_sweeping(self):
+        with mock.patch("importlib.util.find_spec", return_value=None), \
+                mock.patch.object(cli, "run_targets") as run_targets, mock.patch("sys.stderr"):
+            self.assertEqual(cli.main(["--targets", "hosts.txt", "--stats"]), cli.EXIT_USAGE_ERROR)
+        run_targets.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+"""Host sweeps: target expansion, the packet-rate limiter and how much of it each host takes.
+
+Run with ``python -m pytest benchmarks`` or ``python -m unittest discover benchmarks``.
+"""
+import io
+import time
+import unittest
+from unittest import mock
+import corpus_cases # noqa: F401  (puts src/ on sys.path)
+import network_diagnostics
+from network_diagnostics import _iter_targets, _RateLimiter, sweep_hosts
+
+
+class IterTargetsTests(unittest.TestCase):
+    def test_single_host_and_cidr_strings(self):
+        self.assertEqual(list(_iter_targets("example.com")), ["example.com"])
+        self.assertEqual(list(_iter_targets("192.0.2.0/30")), ["192.0.2.1", "192.0.2.2"])
+        self.assertEqual(list(_iter_targets("192.0.2.5/31")), ["192.0.2.4", "192.0.2.5"]) # No network/broadcast to drop
+        self.assertEqual(list(_iter_targets("192.0.2.7/32")), ["192.0.2.7"])
+        self.assertEqual(list(_iter_targets("2001:db8::/126")), ["2001:db8::1", "2001:db8::2", "2001:db8::3"])
+
+    def test_file_lines_with_comments_and_blanks(self):
+        targets = io.StringIO("# campus routers\n192.0.2.1\n\n   \n  # indented comment\n  gw.example  \n10.0.0.0/30\n")
+        self.assertEqual(list(_iter_targets(targets)), ["192.0.2.1", "gw.example", "10.0.0.1", "10.0.0.2"])
+
+    def test_large_ranges_are_lazy(self):
+        hosts = _iter_targets("10.0.0.0/8")
+        self.assertEqual([next(hosts) for _ in range(3)], ["10.0.0.1", "10.0.0.2", "10.0.0.3"])
+
+    def test_invalid_cidr_raises(self):
+        with self.assertRaises(ValueError):
+            list(_iter_targets("10.0.0.0/33"))
+
+
+class RateLimiterTests(unittest.TestCase):
+    def test_full_bucket_is_free_then_rate_applies(self):
+        limiter = _RateLimiter(400)
+        started = time.monotonic()
+        for _ in range(40):
+            limiter.acquire(10) # The first 400 packets drain the full bucket at once
+        self.assertLess(time.monotonic() - started, 0.1)
+        for _ in range(20):
+            limiter.acquire(10) # 200 more at 400 per second
+        self.assertGreaterEqual(time.monotonic() - started, 0.45)
+        self.assertLess(time.monotonic() - started, 1.0)
+
+    def test_request_larger_than_the_bucket_does_not_stall(self):
+        limiter = _RateLimiter(50)
+        started = time.monotonic()
+        limiter.acquire(120) # Allowed once the bucket is full, leaving it in debt
+        self.assertLess(time.monotonic() - started, 0.1)
+        limiter.acquire(1) # Waits for the debt of 70 packets plus one at 50 per second
+        self.assertGreaterEqual(time.monotonic() - started, 1.3)
+
+
+class SweepRateTests(unittest.TestCase):
+    def sweep(self, **options):
+        acquired = []
+        def answered(host, **kwargs):
+            return {"success": True, "latency": "1ms", "error": "", "rtts": [1.0]}
+
+        with mock.patch.object(network_diagnostics, "ping_host", side_effect=answered) as ping_host, \
+                mock.patch.object(_RateLimiter, "acquire", lambda self, packets=1: acquired.append(packets)):
+            results = list(sweep_hosts("192.0.2.0/29", **options))
+        return results, acquired, ping_host
+
+    def test_plain_sweep_budgets_count(self):
+        results, acquired, ping_host = self.sweep(count=3)
+        self.assertEqual(sorted(result["host"] for result in results), [f"192.0.2.{index}" for index in range(1, 7)])
+        self.assertEqual(acquired, [3] * 6)
+
+    def test_adaptive_sweep_budgets_its_worst_case(self):
+        results, acquired, ping_host = self.sweep(count=3, adaptive=True)
+        self.assertEqual(acquired, [6] * 6)
+        for call in ping_host.call_args_list:
+            self.assertEqual((call.kwargs["adaptive"], call.kwargs["max_count"]), (True, 6))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+"""Throughput and path-MTU client against a ThroughputServer on localhost.
+
+Run with ``python -m pytest benchmarks`` or ``python -m unittest discover benchmarks``.
+"""
+import socket
+import sys
+import threading
+import unittest
+import corpus_cases # noqa: F401  (puts src/ on sys.path)
+from cancellation import CancelToken, cancel_scope
+from throughput import ThroughputServer, path_mtu_probe, tcp_download, tcp_upload, throughput_test, udp_test
+
+
+def closed_tcp_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def ipv6_available():
+    try:
+        with socket.socket(socket.AF_INET6, socket.SOCK_STREAM) as sock:
+            sock.bind(("::1", 0))
+        return True
+    except OSError:
+        return False
+
+
+class ThroughputTests(unittest.TestCase):
+    def setUp(self):
+        self.server = ThroughputServer(("127.0.0.1", 0)).start()
+        self.address = f"127.0.0.1:{self.server.server_address[1]}"
+
+    def tearDown(self):
+        self.server.close()
+
+    def test_full_test_over_loopback(self):
+        result = throughput_test(self.address, duration=0.3, udp_bitrate=20_000_000)
+        self.assertTrue(result["success"], result)
+        self.assertEqual(result["error"], "")
+        self.assertGreater(result["upload_mbps"], 0)
+        self.assertGreater(result["download_mbps"], 0)
+        udp = result["udp"]
+        self.assertLessEqual(udp["received"], udp["sent"])
+        self.assertLess(udp["loss_percent"], 5)
+        self.assertGreaterEqual(udp["jitter_ms"], 0)
+
+    def test_tcp_streams_move_data_both_ways(self):
+        # Loopback moves far more than 100 Mbit/s unless the client itself is the bottleneck
+        self.assertGreater(tcp_upload(self.address, duration=0.3), 100)
+        self.assertGreater(tcp_download(self.address, duration=0.3), 100)
+
+    def test_udp_is_paced_at_the_target_bitrate(self):
+        stats = udp_test(self.address, duration=0.5, bitrate=8_000_000, size=1000)
+        self.assertAlmostEqual(stats["bitrate_mbps"], 8, delta=2)
+        self.assertEqual(stats["sent"], stats["received"] + round(stats["sent"] * stats["loss_percent"] / 100))
+
+    def test_unreachable_server(self):
+        result = throughput_test(f"127.0.0.1:{closed_tcp_port()}", duration=0.1)
+        self.assertFalse(result["success"])
+        self.assertEqual((result["upload_mbps"], result["download_mbps"], result["udp"]), (None, None, None))
+        self.assertIn("refused", result["error"])
+
+    def test_cancelled_test_stops(self):
+        token = CancelToken()
+        threading.Timer(0.2, token.cancel).start()
+        with cancel_scope(token):
+            result = throughput_test(self.address, duration=10)
+        self.assertFalse(result["success"])
+        self.assertEqual(result["error"], "已取消")
+
+    @unittest.skipUnless(ipv6_available(), "no IPv6 loopback")
+    def test_ipv6_server(self):
+        server = ThroughputServer(("::1", 0)).start()
+        try:
+            self.assertGreater(tcp_download(f"[::1]:{server.server_address[1]}", duration=0.2), 0)
+        finally:
+            server.close()
+
+
+class PathMtuTests(unittest.TestCase):
+    def setUp(self):
+        self.server = ThroughputServer(("127.0.0.1", 0)).start()
+        self.address = f"127.0.0.1:{self.server.server_address[1]}"
+
+    def tearDown(self):
+        self.server.close()
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "loopback MTU and the kernel's path MTU are read on Linux")
+    def test_loopback_mtu(self):
+        result = path_mtu_probe(self.address)
+        self.assertTrue(result["success"], result)
+        # The largest IPv4 UDP datagram fits loopback's 64 KiB MTU
+        self.assertEqual(result["mtu"], 65535)
+        self.assertGreaterEqual(result["kernel_mtu"], result["mtu"])
+        self.assertLess(result["probes"], 40) # Binary search, not a linear scan
+
+    def test_no_server(self):
+        result = path_mtu_probe(f"127.0.0.1:{closed_tcp_port()}", timeout=100, retries=1)
+        self.assertFalse(result["success"])
+        self.assertIsNone(result["mtu"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,211 @@
+"""Probe agent: serves the network_diagnostics probes over a small HTTP/1.1 API.
+
+Endpoints:
+    GET  /info   {"agent": name, "probes": [...]}
+    POST /run    runs a plan and streams one JSON result record per line (chunked)
+                 as each test finishes. The body is {"tests": [{"key", "probe",
+                 "args", "kwargs", "label", "target"}, ...]} to run the given
+                 probes, or {} to run this machine's standard sequence from its
+                 config.ini ({"site": name} for one of its [Site <name>]
+                 profiles). Every record carries "agent".
+
+With a token, requests must send "Authorization: Bearer <token>". Without
+one the agent only listens on loopback addresses.
+"""
+import hmac
+import inspect
+import ipaddress
+import json
+import socket
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from config_manager import ConfigurationManager
+from diagnostic_plan import build_diagnostic_plan, create_scheduler, run_diagnostic_plan, result_record
+from dns_probe import dns_benchmark, resolve_host
+from dual_stack import dual_stack_probe
+from http_probe import tcp_connect_probe, http_probe
+from network_diagnostics import get_network_info, ping_host, tracert_host
+from throughput import throughput_test, path_mtu_probe
+
+DEFAULT_AGENT_PORT = 8765
+MAX_REQUEST_BYTES = 1 << 20
+
+# Probes a coordinator may ask for, by name; nothing else can be called remotely
+PROBES = {
+    "net_info": get_network_info,
+    "ping": ping_host,
+    "tracert": tracert_host,
+    "dns_benchmark": dns_benchmark,
+    "resolve": resolve_host,
+    "tcp_connect": tcp_connect_probe,
+    "http": http_probe,
+    "dual_stack": dual_stack_probe,
+    "throughput": throughput_test,
+    "path_mtu": path_mtu_probe,
+}
+# Keyword arguments that only make sense in-process (callbacks, caches)
+_LOCAL_ONLY_KWARGS = {"on_hop", "path_cache", "hop_names"}
+# (min, max) for numeric probe arguments, so one request cannot keep this machine probing for hours
+ARGUMENT_LIMITS = {
+    "count": (1, 100),
+    "max_count": (1, 100),
+    "samples": (1, 20),
+    "repeats": (1, 10),
+    "retries": (0, 5),
+    "max_hops": (1, 64),
+    "timeout": (1, 10000),
+    "duration": (1, 30),
+    "udp_bitrate": (1, 100_000_000),
+    "udp_size": (64, 65507),
+    "attempt_delay": (0, 5),
+}
+
+
+def plan_from_specs(specs):
+    """Builds a plan (see build_diagnostic_plan) from JSON test specs; raises ValueError on bad specs.
+
+    ``args`` must be a JSON array and ``kwargs`` an object, and together they
+    must bind to the probe's signature, so a bad request is rejected up front
+    instead of failing inside the probe. Numeric arguments are clamped to
+    ARGUMENT_LIMITS.
+    """
+    plan = []
+    for spec in specs:
+        probe = spec.get("probe")
+        if probe not in PROBES:
+            raise ValueError(f"unknown probe: {probe}")
+        key = spec.get("key") or probe
+        if any(existing_key == key for existing_key, *_ in plan):
+            raise ValueError(f"duplicate test key: {key}")
+        kwargs = spec.get("kwargs") or {}
+        if not isinstance(kwargs, dict) or _LOCAL_ONLY_KWARGS & kwargs.keys():
+            raise ValueError(f"invalid kwargs for {key}")
+        args = spec.get("args") or []
+        if not isinstance(args, list):
+            raise ValueError(f"args for {key} must be a list")
+        args = tuple(args)
+        try:
+            bound = inspect.signature(PROBES[probe]).bind(*args, **kwargs)
+        except TypeError as e:
+            raise ValueError(f"invalid arguments for {key}: {e}") from None
+        for name, value in bound.arguments.items():
+            if name not in ARGUMENT_LIMITS or value is None:
+                continue
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ValueError(f"{name} for {key} must be a number")
+            low, high = ARGUMENT_LIMITS[name]
+            bound.arguments[name] = min(max(value, low), high)
+        args, kwargs = bound.args, bound.kwargs
+        target = spec.get("target", args[0] if args else None)
+        plan.append((key, spec.get("label") or key, target, PROBES[probe], args, kwargs))
+    return plan
+
+
+class _ChunkedWriter:
+    """Text stream that writes each write() as one HTTP/1.1 chunk."""
+
+    def __init__(self, wfile):
+        self.wfile = wfile
+
+    def write(self, text):
+        data = text.encode("utf-8")
+        if data:
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+
+    def flush(self):
+        self.wfile.flush()
+
+    def close(self):
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+class AgentRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # Keep-alive, so coordinators can reuse connections
+    server_version = "NetworkDiagnosticAgent/1.0"
+
+    def log_message(self, format, *args):
+        pass # Results are the output; per-request logging would only add noise
+
+    def _authorized(self):
+        token = self.server.token
+        if not token:
+            return True
+        return hmac.compare_digest(self.headers.get("Authorization", ""), f"Bearer {token}")
+
+    def _send_json(self, status, body):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if not self._authorized():
+            self._send_json(401, {"error": "unauthorized"})
+        elif self.path == "/info":
+            self._send_json(200, {"agent": self.server.name, "probes": sorted(PROBES)})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        if not self._authorized():
+            self._send_json(401, {"error": "unauthorized"})
+            return
+        if self.path != "/run":
+            self._send_json(404, {"error": "not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            if length > MAX_REQUEST_BYTES:
+                raise ValueError("request too large")
+            body = json.loads(self.rfile.read(length) or b"{}")
+            config = self.server.config_manager.snapshot(body.get("site"))
+            if "tests" in body:
+                plan = plan_from_specs(body["tests"])
+            else:
+                plan = build_diagnostic_plan(config)
+        except (ValueError, TypeError, AttributeError) as e:
+            self._send_json(400, {"error": str(e)})
+            return
+        self._stream_plan(plan, config)
+
+    def _stream_plan(self, plan, config):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson; charset=utf-8")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        stream = _ChunkedWriter(self.wfile)
+        targets = {key: target for key, _, target, *_ in plan}
+        scheduler = create_scheduler(config)
+
+        def _on_complete(key, label, result, status):
+            record = result_record(key, label, targets[key], result, status)
+            record["agent"] = self.server.name
+            stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+            stream.flush()
+
+        try:
+            for _ in run_diagnostic_plan(plan, on_complete=_on_complete, scheduler=scheduler):
+                pass
+            stream.close()
+        except OSError:
+            # Coordinator went away: stop probing on its behalf
+            scheduler.cancel()
+            self.close_connection = True
+
+
+class AgentServer(ThreadingHTTPServer):
+    """HTTP probe agent; ``serve_forever()`` handles each connection on its own thread."""
+
+    daemon_threads = True
+
+    def __init__(self, address=("127.0.0.1", DEFAULT_AGENT_PORT), config_manager=None, token=None, name=None):
+        super().__init__(address, AgentRequestHandler)
+        if not token and not ipaddress.ip_address(self.server_address[0]).is_loopback:
+            # Anyone who can reach the port could make this machine probe arbitrary targets
+            self.server_close()
+            raise ValueError(f"an agent listening on {self.server_address[0]} needs --agent-token")
+        self.config_manager = config_manager or ConfigurationManager()
+        self.token = token
+        self.name = name or f"{socket.gethostname()}:{self.server_address[1]}"
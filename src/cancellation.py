@@ -0,0 +1,96 @@
+import threading
+from contextlib import contextmanager
+
+_local = threading.local()
+
+CANCEL_POLL_INTERVAL = 0.1 # Longest a select()-driven probe blocks before it checks for cancellation
+
+
+class Cancelled(Exception):
+    pass
+
+
+class CancelToken:
+    """Cancellation signal shared by a run; cancel() also runs every registered callback.
+
+    Probes register callbacks that abort their blocking work immediately, e.g.
+    killing a subprocess or closing a socket. A token may have a parent, in which
+    case cancelling the parent cancels it too.
+    """
+
+    def __init__(self, parent=None):
+        self._event = threading.Event()
+        self._callbacks = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.reason = ""
+        if parent is not None:
+            parent.register(lambda: self.cancel(parent.reason))
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def wait(self, timeout=None):
+        """Sleeps up to ``timeout`` seconds; returns True early if the token is cancelled."""
+        return self._event.wait(timeout)
+
+    def register(self, callback):
+        """Registers a callback to run on cancel (immediately if already cancelled); returns a handle."""
+        with self._lock:
+            if not self._event.is_set():
+                self._next_id += 1
+                self._callbacks[self._next_id] = callback
+                return self._next_id
+        callback()
+        return None
+
+    def unregister(self, handle):
+        with self._lock:
+            self._callbacks.pop(handle, None)
+
+    def cancel(self, reason="已取消"):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+            callbacks, self._callbacks = list(self._callbacks.values()), {}
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Error while cancelling: {e}")
+
+
+def current_token():
+    """The token of the task running on this thread, or None outside a scheduled task."""
+    return getattr(_local, "token", None)
+
+
+def is_cancelled():
+    token = current_token()
+    return token is not None and token.cancelled
+
+
+@contextmanager
+def cancel_scope(token):
+    """Makes ``token`` the current token of this thread for the duration of the block."""
+    previous = current_token()
+    _local.token = token
+    try:
+        yield token
+    finally:
+        _local.token = previous
+
+
+@contextmanager
+def on_cancel(callback):
+    """Runs ``callback`` if the current task is cancelled while the block executes."""
+    token = current_token()
+    handle = token.register(callback) if token is not None else None
+    try:
+        yield
+    finally:
+        if handle is not None:
+            token.unregister(handle)
@@ -0,0 +1,342 @@
+"""Headless command-line runner for the network diagnostics (no Qt import).
+
+Examples:
+    python src/cli.py                          # standard test sequence from config.ini
+    python src/cli.py --config site_a.ini --config site_b.ini
+    python src/cli.py --site 北棟 --site 南棟     # [Site <name>] profiles of config.ini, diagnosed concurrently
+    python src/cli.py --targets hosts.txt      # ping every host/CIDR listed in the file
+    python src/cli.py --monitor --interval 1   # mtr-like rolling statistics until Ctrl+C
+    python src/cli.py --serve-agent 0.0.0.0:8765 --agent-token SECRET   # probe agent for a coordinator
+    python src/cli.py --agents 10.1.0.5,10.2.0.5:8765 --agent-token SECRET   # run on every agent, merged
+    python src/cli.py --monitor --metrics 0.0.0.0:9464   # also serve OpenMetrics for Prometheus at /metrics
+    python src/cli.py --serve-throughput 0.0.0.0   # bundled server for the [Throughput] tests (port 5201)
+    python src/cli.py --trace run.json         # Chrome trace of where the time went, summary on stderr
+
+One JSON object is written to stdout per result as soon as it completes. Ctrl+C
+during the standard sequence cancels the outstanding tests, which are still
+reported with "status": "cancelled".
+Exit status: 0 when every test succeeded, 1 when any test failed, 2 on usage or
+configuration errors.
+"""
+import argparse
+import importlib.util
+import json
+import os
+import signal
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from config_manager import ConfigurationManager, ConfigWatcher
+from diagnostic_plan import (build_diagnostic_plan, create_scheduler, create_hop_name_resolver, run_diagnostic_plan,
+                             result_record, result_succeeded, monitor_targets)
+from history_store import HistoryStore
+from metrics import serve_metrics
+from monitor import Monitor
+from path_cache import PathCache
+from reverse_dns import PtrCache
+import tracing
+from network_diagnostics import sweep_hosts, _iter_targets
+
+EXIT_OK = 0
+EXIT_TEST_FAILED = 1
+EXIT_USAGE_ERROR = 2
+
+
+class JsonLinesWriter:
+    """Writes one JSON object per line, flushing immediately; safe to call from worker threads."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.lock = threading.Lock()
+
+    def write(self, record):
+        line = json.dumps(record, ensure_ascii=False)
+        with self.lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+
+def run_config(config_path, writer, history=None, path_cache=None, ptr_cache=None, sites=None):
+    """Runs the standard test sequence for one config file; returns True if every test succeeded.
+
+    With a ``path_cache`` the traceroute is incremental and a "route_change"
+    record is written when the path differs from the cached one. With a
+    ``ptr_cache`` hops are named by reverse DNS, and names that arrive after
+    the traceroute record was written follow as "hop_name" records. ``sites`` names [Site <name>]
+    profiles (or "all") to diagnose concurrently instead of the default site;
+    their records carry a "site" field.
+    """
+    config_manager = ConfigurationManager(config_path) if config_path else ConfigurationManager()
+    config = config_manager.snapshot()
+    if sites and "all" in sites:
+        sites = config.sites
+    configs = [config.for_site(site) for site in sites] if sites else [config]
+    schedulers = [create_scheduler(site_config) for site_config in configs]
+
+    def _cancel_all(*_):
+        for scheduler in schedulers:
+            scheduler.cancel()
+
+    # Ctrl+C cancels the run instead of aborting it, so every test is still reported
+    previous_handler = signal.signal(signal.SIGINT, _cancel_all)
+    try:
+        with ThreadPoolExecutor(max_workers=len(configs)) as executor:
+            outcomes = list(executor.map(lambda site_config, scheduler: _run_site(
+                site_config, scheduler, writer, history, path_cache, ptr_cache), configs, schedulers))
+    finally:
+        signal.signal(signal.SIGINT, previous_handler)
+    return all(outcomes)
+
+
+def _run_site(config, scheduler, writer, history, path_cache, ptr_cache):
+    def _on_hop_named(host, hop):
+        # The trace's record is already written; late names follow as records of their own
+        record = {"timestamp": time.time(), "config": config.path, "test": "hop_name", "target": host,
+                  "hop": hop["num"], "ip": hop["ip"], "name": hop["name"]}
+        if config.site:
+            record["site"] = config.site
+        writer.write(record)
+
+    hop_names = create_hop_name_resolver(config, ptr_cache, on_name=_on_hop_named) if ptr_cache is not None else None
+    plan = build_diagnostic_plan(config, path_cache=path_cache, hop_names=hop_names)
+    targets = {key: target for key, _, target, *_ in plan}
+
+    def _on_complete(key, label, result, status):
+        record = result_record(key, label, targets[key], result, status)
+        record["config"] = config.path
+        if config.site:
+            record["site"] = config.site
+        writer.write(record)
+        if history:
+            history.record_result(key, targets[key], result, record["success"], ts=record["timestamp"])
+        diff = path_cache.last_diff(targets[key]) if path_cache and key.startswith("tracert") else None
+        if diff and diff["changed"]:
+            writer.write({"timestamp": record["timestamp"], "config": record["config"], "test": "route_change",
+                          "target": targets[key], "diff": diff})
+
+    outcomes = [result_succeeded(key, result)
+                for key, _, result, _ in run_diagnostic_plan(plan, on_complete=_on_complete, scheduler=scheduler)]
+    if hop_names:
+        hop_names.wait(timeout=2) # Let late names be written and land in the cache
+    return all(outcomes)
+
+
+def run_targets(targets_path, writer, count, timeout, max_in_flight, packets_per_second, with_stats=False, history=None,
+                adaptive=False):
+    """Pings every host/CIDR listed in ``targets_path``; returns True if all of them answered.
+
+    With ``with_stats`` the per-packet RTTs are kept and, once the sweep is done,
+    one "ping_stats" record per target is written from a single batch computation.
+    """
+    all_succeeded = True
+    hosts, rtt_lists = [], []
+    with open(targets_path, encoding="utf-8") as targets_file:
+        for result in sweep_hosts(targets_file, count=count, timeout=timeout,
+                                  max_in_flight=max_in_flight, packets_per_second=packets_per_second, adaptive=adaptive):
+            all_succeeded = all_succeeded and result["success"]
+            host = result.pop("host")
+            now = time.time()
+            writer.write({"timestamp": now, "test": "ping", "target": host,
+                          "success": result["success"], "result": result})
+            if history:
+                history.record_result("ping", host, result, result["success"], ts=now)
+            if with_stats:
+                hosts.append(host)
+                rtt_lists.append(result["rtts"])
+    if with_stats and hosts:
+        # Imported only here so plain runs don't pay for loading NumPy
+        from rtt_stats import to_matrix, summarize, rows_to_dicts
+        matrix, sent = to_matrix(rtt_lists)
+        now = time.time()
+        for host, stats in zip(hosts, rows_to_dicts(summarize(matrix, sent))):
+            writer.write({"timestamp": now, "test": "ping_stats", "target": host, **stats})
+    return all_succeeded
+
+
+def run_monitor(config_path, targets_path, writer, interval, window, timeout, duration):
+    """Monitors the config's hosts (or the hosts/CIDRs in ``targets_path``) and prints rolling stats each round."""
+    if window < 1:
+        raise ValueError(f"--window must be at least 1, got {window}")
+    if targets_path:
+        with open(targets_path, encoding="utf-8") as targets_file:
+            targets = list(_iter_targets(targets_file)) # Same expansion as --targets sweeps
+    else:
+        config_manager = ConfigurationManager(config_path) if config_path else ConfigurationManager()
+        targets = monitor_targets(config_manager.snapshot())
+
+    def _on_round(monitor):
+        now = time.time()
+        for target, stats in monitor.snapshot().items():
+            writer.write({"timestamp": now, "test": "monitor", "target": target, **stats})
+
+    monitor = Monitor(targets, interval=interval, window=window, timeout=timeout, on_round=_on_round)
+    try:
+        monitor.run(duration)
+    except KeyboardInterrupt:
+        pass
+    return all(stats["loss_percent"] == 0 for stats in monitor.snapshot().values())
+
+
+def run_agent(address, config_path, token):
+    """Serves this machine's probes to coordinators until Ctrl+C."""
+    from agent import AgentServer, DEFAULT_AGENT_PORT
+    from dns_probe import parse_resolver
+    config_manager = ConfigurationManager(config_path) if config_path else ConfigurationManager()
+    config_manager.snapshot() # Refuse to start on an invalid config
+    server = AgentServer(parse_resolver(address, DEFAULT_AGENT_PORT), config_manager=config_manager, token=token)
+    # Edits to the config file apply to the next run without restarting the agent
+    watcher = ConfigWatcher(config_manager).start()
+    print(f"Probe agent {server.name} listening on {address}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.stop()
+        server.server_close()
+    return True
+
+
+def run_throughput_server(address):
+    """Serves throughput and path-MTU tests until Ctrl+C."""
+    from throughput import ThroughputServer, DEFAULT_THROUGHPUT_PORT
+    from dns_probe import parse_resolver
+    server = ThroughputServer(parse_resolver(address, DEFAULT_THROUGHPUT_PORT)).start()
+    host, port = server.server_address[:2]
+    print(f"Throughput server listening on {host}:{port} (TCP and UDP)", file=sys.stderr)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+    return True
+
+
+def run_agents(agents, writer, token):
+    """Runs every agent's standard sequence in parallel, writing the merged records; True if all succeeded."""
+    from coordinator import Coordinator
+    all_succeeded = True
+    with Coordinator(agents, token=token) as coordinator:
+        for record in coordinator.run():
+            all_succeeded = all_succeeded and record.get("success", False)
+            writer.write(record)
+    return all_succeeded
+
+
+def start_metrics_server(address):
+    """Serves OpenMetrics at http://address/metrics from a background thread and starts recording."""
+    server = serve_metrics(address)
+    host, port = server.server_address[:2]
+    print(f"Metrics at http://{host}:{port}/metrics", file=sys.stderr)
+    return server
+
+
+def write_trace(path, events):
+    try:
+        tracing.write_chrome_trace(path, events)
+    except OSError as e:
+        print(f"Could not write trace file {path}: {e}", file=sys.stderr)
+    print(tracing.format_summary(events), file=sys.stderr)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="校園網路診斷工具 (命令列版)")
+    parser.add_argument("--config", action="append", metavar="PATH",
+                        help="config.ini to run the standard test sequence with (repeatable)")
+    parser.add_argument("--site", action="append", metavar="NAME",
+                        help="diagnose this [Site NAME] profile of the config, concurrently with other --site "
+                             "options (repeatable, \"all\" for every profile)")
+    parser.add_argument("--targets", metavar="FILE",
+                        help="file with one host or CIDR per line to ping instead of the standard sequence")
+    parser.add_argument("--count", type=int, default=4, help="echo requests per target with --targets")
+    parser.add_argument("--timeout", type=int, default=1000, help="ping timeout in ms with --targets")
+    parser.add_argument("--max-in-flight", type=int, default=64, help="concurrent pings with --targets")
+    parser.add_argument("--pps", type=int, default=200, help="packets per second cap with --targets")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="with --targets, use RTT-estimated timeouts and stop early once the latency is known")
+    parser.add_argument("--stats", action="store_true",
+                        help="with --targets, also write jitter/percentile/loss-burst statistics per target (needs NumPy)")
+    parser.add_argument("--history", metavar="DB",
+                        help="also append every result to this SQLite history database")
+    parser.add_argument("--path-cache", metavar="FILE",
+                        help="keep the last traceroute path per target in this file and only re-probe what changed")
+    parser.add_argument("--hop-names", metavar="FILE",
+                        help="name traceroute hops by reverse DNS, caching the names in this file")
+    parser.add_argument("--serve-agent", nargs="?", const="127.0.0.1", metavar="HOST[:PORT]",
+                        help="run as a probe agent serving coordinators over HTTP (default 127.0.0.1:8765; "
+                             "other addresses need --agent-token)")
+    parser.add_argument("--serve-throughput", nargs="?", const="127.0.0.1", metavar="HOST[:PORT]",
+                        help="run the bundled throughput/path-MTU test server (default 127.0.0.1:5201)")
+    parser.add_argument("--agents", metavar="LIST",
+                        help="comma-separated agent addresses to run the standard sequence on in parallel")
+    parser.add_argument("--agent-token", metavar="TOKEN", help="shared secret between agents and coordinator")
+    parser.add_argument("--metrics", nargs="?", const="127.0.0.1", metavar="HOST[:PORT]",
+                        help="serve probe latency/loss/hop metrics in OpenMetrics format (default 127.0.0.1:9464)")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="time spawn/network/decode/parse stages, write them as Chrome trace JSON and print a summary")
+    parser.add_argument("--monitor", action="store_true", help="probe the targets continuously and print rolling statistics")
+    parser.add_argument("--interval", type=float, default=1.0, help="seconds between monitoring rounds")
+    parser.add_argument("--window", type=int, default=600, help="samples kept per target for monitoring statistics")
+    parser.add_argument("--duration", type=float, help="stop monitoring after this many seconds")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    writer = JsonLinesWriter(sys.stdout)
+    history = None
+    metrics_server = None
+    path_cache = PathCache(args.path_cache) if args.path_cache else None
+    ptr_cache = PtrCache(args.hop_names) if args.hop_names else None
+    if args.trace:
+        tracing.start()
+    try:
+        history = HistoryStore(args.history) if args.history else None
+        if args.metrics:
+            metrics_server = start_metrics_server(args.metrics)
+        if args.serve_agent:
+            config_path = args.config[0] if args.config else None
+            succeeded = run_agent(args.serve_agent, config_path and os.path.abspath(config_path), args.agent_token)
+        elif args.serve_throughput:
+            succeeded = run_throughput_server(args.serve_throughput)
+        elif args.agents:
+            succeeded = run_agents([agent.strip() for agent in args.agents.split(",") if agent.strip()], writer,
+                                   args.agent_token)
+        elif args.monitor:
+            config_path = args.config[0] if args.config else None
+            succeeded = run_monitor(config_path and os.path.abspath(config_path), args.targets, writer,
+                                    args.interval, args.window, args.timeout, args.duration)
+        elif args.targets:
+            if args.stats and importlib.util.find_spec("numpy") is None:
+                # Fail before the sweep rather than after it has run
+                print("--stats needs NumPy: pip install numpy", file=sys.stderr)
+                return EXIT_USAGE_ERROR
+            succeeded = run_targets(args.targets, writer, args.count, args.timeout, args.max_in_flight, args.pps, args.stats, history,
+                                    args.adaptive)
+        else:
+            succeeded = True
+            for config_path in args.config or [None]:
+                if config_path and not os.path.exists(config_path):
+                    print(f"Config file not found: {config_path}", file=sys.stderr)
+                    return EXIT_USAGE_ERROR
+                succeeded = run_config(config_path and os.path.abspath(config_path), writer, history, path_cache,
+                                       ptr_cache, args.site) and succeeded
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return EXIT_USAGE_ERROR
+    finally:
+        if history:
+            history.close()
+        if metrics_server:
+            metrics_server.shutdown()
+            metrics_server.server_close()
+        if args.trace:
+            write_trace(args.trace, tracing.stop())
+    return EXIT_OK if succeeded else EXIT_TEST_FAILED
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,197 @@
 import configparser
 import os
 import sys
+import threading
+from types import MappingProxyType
+
+SITE_SECTION_PREFIX = "Site " # [Site <name>] sections override NetworkSettings/TestParameters for one site
+CONFIG_POLL_INTERVAL = 1.0 # Seconds between checks of config.ini for changes
+_TRUE_WORDS = ('true', 'yes', '1')
+_FALSE_WORDS = ('false', 'no', '0')
+
+
+class ConfigError(ValueError):
+    pass
+
+
+def _text(value):
+    return value.strip()
+
+
+def _required(value):
+    if not value.strip():
+        raise ValueError("不可為空白")
+    return value.strip()
+
+
+def _boolean(value):
+    if value.strip().lower() in _TRUE_WORDS:
+        return True
+    if value.strip().lower() in _FALSE_WORDS:
+        return False
+    raise ValueError("必須是 true 或 false")
+
+
+def _integer(minimum, maximum=None):
+    def parse(value):
+        try:
+            number = int(value)
+        except ValueError:
+            raise ValueError("必須是整數") from None
+        return _in_range(number, minimum, maximum)
+    return parse
+
+
+def _number(minimum, maximum=None):
+    def parse(value):
+        try:
+            number = float(value)
+        except ValueError:
+            raise ValueError("必須是數字") from None
+        return _in_range(number, minimum, maximum)
+    return parse
+
+
+def _in_range(number, minimum, maximum):
+    if number < minimum or (maximum is not None and number > maximum):
+        raise ValueError(f"必須介於 {minimum} 與 {maximum} 之間" if maximum is not None else f"不可小於 {minimum}")
+    return number
+
+
+# Every known setting: section -> key -> (parser, default). Defaults are already typed;
+# None means "not set" for optional settings. Sections not listed here are kept as raw strings.
+SCHEMA = {
+    'NetworkSettings': {
+        'GatewayIP': (_required, '192.168.1.1'),
+        'PrimaryDNS': (_text, '8.8.8.8'),
+        'SecondaryDNS': (_text, '8.8.4.4'),
+        'InternalServerIP': (_required, '192.168.1.254'),
+        'TestWebsite': (_required, 'www.google.com'),
+        'TestURL': (_text, None), # Defaults to https://<TestWebsite>/
+    },
+    'TestParameters': {
+        'PingCount': (_integer(1, 100), 4),
+        'PingTimeout': (_integer(1, 60000), 1000),
+        'TracertMaxHops': (_integer(1, 255), 30),
+        'TimeBudget': (_number(0), 120.0), # Seconds a whole run may take before outstanding tests time out
+        'AdaptivePing': (_boolean, True),
+        'DualStack': (_boolean, False),
+    },
+    'Throughput': {
+        'Server': (_text, None),
+        'Duration': (_number(0.1, 30), 3.0),
+        'UdpBitrate': (_number(0.001), 10.0),
+    },
+    'Traceroute': {
+        'ResolveHopNames': (_boolean, False),
+        'PathCache': (_text, None),
+        'HopNamesCache': (_text, None),
+    },
+    'History': {'Path': (_text, None)},
+    'Metrics': {'Listen': (_text, None)},
+    'Tracing': {'TraceFile': (_text, None)},
+    'DisplaySettings': {'Language': (_text, 'zh_TW')},
+}
+# Sections a [Site <name>] profile may override, key by key
+SITE_SECTIONS = ('NetworkSettings', 'TestParameters')
+
+
+class ConfigSnapshot:
+    """Immutable, validated view of config.ini with every value already converted to its type.
+
+    ``get(section, key)`` returns the typed value (or the schema default). A
+    snapshot is the default site; ``for_site(name)`` returns the one for a
+    [Site <name>] profile, whose settings override the default site's.
+    """
+
+    __slots__ = ("path", "site", "sites", "_values", "_site_snapshots")
+
+    def __init__(self, path, values, site=None, site_values=None):
+        set_attribute = super().__setattr__
+        set_attribute("path", path)
+        set_attribute("site", site)
+        set_attribute("_values", MappingProxyType({section: MappingProxyType(dict(keys)) for section, keys in values.items()}))
+        if site is None:
+            site_snapshots = {name: ConfigSnapshot(path, overridden, name) for name, overridden in (site_values or {}).items()}
+        else:
+            site_snapshots = {}
+        set_attribute("_site_snapshots", MappingProxyType(site_snapshots))
+        set_attribute("sites", tuple(site_snapshots))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ConfigSnapshot is immutable")
+
+    def get(self, section, key, default=None):
+        try:
+            return self._values[section][key]
+        except KeyError:
+            return default
+
+    def for_site(self, name):
+        """The snapshot of profile ``name`` (None for the default site); raises ConfigError if there is none."""
+        if name is None:
+            return self
+        try:
+            return self._site_snapshots[name]
+        except KeyError:
+            raise ConfigError(f"找不到站點設定: {name}") from None
+
+
+def build_snapshot(config, path=None):
+    """Validates a ConfigParser's contents into a ConfigSnapshot; raises ConfigError listing every bad value."""
+    errors = []
+
+    def _parse(section, keys, source):
+        values = {}
+        for key, raw in source.items():
+            parser_default = keys.get(key)
+            if parser_default is None:
+                values[key] = raw # Not in the schema: kept as a string
+                continue
+            try:
+                values[key] = parser_default[0](raw)
+            except ValueError as e:
+                errors.append(f"[{section}] {key}: {e}")
+        return values
+
+    values = {}
+    for section in config.sections():
+        if section.startswith(SITE_SECTION_PREFIX):
+            continue
+        # ConfigParser lowercases option names; map them back to the schema's spelling
+        source = {_schema_key(section, key): raw for key, raw in config.items(section, raw=True)}
+        values[section] = _parse(section, SCHEMA.get(section, {}), source)
+    for section, keys in SCHEMA.items():
+        section_values = values.setdefault(section, {})
+        for key, (_, default) in keys.items():
+            section_values.setdefault(key, default)
+
+    site_values = {}
+    for section in config.sections():
+        if not section.startswith(SITE_SECTION_PREFIX):
+            continue
+        name = section[len(SITE_SECTION_PREFIX):].strip()
+        overridden = {site_section: dict(values[site_section]) for site_section in values}
+        for key, raw in config.items(section, raw=True):
+            site_section = next((candidate for candidate in SITE_SECTIONS
+                                 if _schema_key(candidate, key) in SCHEMA[candidate]), None)
+            if site_section is None:
+                errors.append(f"[{section}] {key}: 站點設定不支援此項目")
+                continue
+            overridden[site_section].update(_parse(section, SCHEMA[site_section], {_schema_key(site_section, key): raw}))
+        site_values[name] = overridden
+
+    if errors:
+        raise ConfigError("設定檔有誤: " + "；".join(errors))
+    return ConfigSnapshot(path, values, site_values=site_values)
+
+
+def _schema_key(section, key):
+    for known in SCHEMA.get(section, ()):
+        if known.lower() == key.lower():
+            return known
+    return key
+
 
 class ConfigurationManager:
     def __init__(self, config_file_name="config.ini"):
@@ -15,6 +206,8 @@ class ConfigurationManager:
             base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
             
         self.config_file_path = os.path.join(base_path, config_file_name)
+        self._snapshot = None
+        self._lock = threading.Lock()
         self._load_config()
 
     def _load_config(self):
@@ -23,6 +216,29 @@ class ConfigurationManager:
             self._create_default_config()
         self.config.read(self.config_file_path, encoding='utf-8')
 
+    def snapshot(self, site=None):
+        """The current validated ConfigSnapshot (of profile ``site``); raises ConfigError if the file is invalid.
+
+        The snapshot is built once and shared until the file is reloaded or
+        saved, so callers should take it once per run rather than per setting.
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    self._snapshot = build_snapshot(self.config, self.config_file_path)
+                snapshot = self._snapshot
+        return snapshot.for_site(site)
+
+    def reload(self):
+        """Re-reads the config file and swaps in its snapshot; on ConfigError the current one stays in use."""
+        config = configparser.ConfigParser()
+        config.read(self.config_file_path, encoding='utf-8')
+        snapshot = build_snapshot(config, self.config_file_path)
+        with self._lock:
+            self.config, self._snapshot = config, snapshot
+        return snapshot
+
     def _create_default_config(self):
         # Default settings if config file doesn't exist
         self.config['NetworkSettings'] = {
@@ -35,7 +251,9 @@ class ConfigurationManager:
         self.config['TestParameters'] = {
             'PingCount': '4',
             'PingTimeout': '1000',
-            'TracertMaxHops': '30'
+            'TracertMaxHops': '30',
+            'TimeBudget': '120',
+            'AdaptivePing': 'true'
         }
         self.config['DisplaySettings'] = {
             'Language': 'zh_TW'
@@ -52,10 +270,88 @@ class ConfigurationManager:
         if not self.config.has_section(section):
             self.config.add_section(section)
         self.config.set(section, key, str(value))
+        self._snapshot = None # Rebuilt, and validated, on the next snapshot() call
+
+    def update_settings(self, settings):
+        """Applies {section: {key: value}} and saves, all or nothing.
+
+        The changes are validated on a copy of the config first; on ConfigError
+        neither the file nor the settings in memory are touched.
+        """
+        config = configparser.ConfigParser()
+        config.read_dict({section: dict(self.config.items(section, raw=True)) for section in self.config.sections()})
+        for section, values in settings.items():
+            if not config.has_section(section):
+                config.add_section(section)
+            for key, value in values.items():
+                config.set(section, key, str(value))
+        snapshot = build_snapshot(config, self.config_file_path)
+        self._write(config)
+        with self._lock:
+            self.config, self._snapshot = config, snapshot
+        return snapshot
 
     def save_config(self):
+        """Validates the settings and writes them; raises ConfigError (writing nothing) if any is invalid."""
+        snapshot = build_snapshot(self.config, self.config_file_path)
+        self._write(self.config)
+        with self._lock:
+            self._snapshot = snapshot
+
+    def _write(self, config):
         with open(self.config_file_path, 'w', encoding='utf-8') as configfile:
-            self.config.write(configfile)
+            config.write(configfile)
+
+
+class ConfigWatcher:
+    """Reloads a ConfigurationManager whenever its file changes, from a background thread.
+
+    The file's modification time and size are polled every ``interval``
+    seconds. A valid new file replaces the manager's snapshot in one step,
+    and ``on_reload(snapshot)`` is called; an invalid one is reported through
+    ``on_error(error)`` and the previous snapshot stays in use.
+    """
+
+    def __init__(self, config_manager, interval=CONFIG_POLL_INTERVAL, on_reload=None, on_error=None):
+        self.config_manager = config_manager
+        self.interval = interval
+        self.on_reload = on_reload
+        self.on_error = on_error or (lambda error: print(f"Config not reloaded: {error}"))
+        self._stopped = threading.Event()
+        self._signature = self._file_signature()
+
+    def _file_signature(self):
+        try:
+            stat = os.stat(self.config_manager.config_file_path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def start(self):
+        threading.Thread(target=self._watch, name="config-watcher", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+
+    def check(self):
+        """Reloads the file if it changed since the last check; returns True if a new snapshot was swapped in."""
+        signature = self._file_signature()
+        if signature is None or signature == self._signature:
+            return False
+        self._signature = signature
+        try:
+            snapshot = self.config_manager.reload()
+        except (ConfigError, configparser.Error) as e:
+            self.on_error(e)
+            return False
+        if self.on_reload:
+            self.on_reload(snapshot)
+        return True
+
+    def _watch(self):
+        while not self._stopped.wait(self.interval):
+            self.check()
 
 # Example usage (for testing purposes, will be removed later)
 if __name__ == "__main__":
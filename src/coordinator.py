@@ -0,0 +1,112 @@
+import http.client
+import json
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from agent import DEFAULT_AGENT_PORT
+from dns_probe import parse_resolver
+from http_probe import HttpConnectionPool
+
+_DONE = object()
+
+
+class Coordinator:
+    """Fans a diagnostic plan out to many probe agents at once and merges their result streams.
+
+    Each agent gets its own HTTP/1.1 request on a keep-alive connection taken
+    from a shared pool, so repeated runs reuse the same TCP connections. Records
+    are yielded in the order they arrive from any agent, each tagged with
+    "agent" (the name the agent reports) and "agent_address" (as given here).
+    """
+
+    def __init__(self, agents, token=None, timeout=300, max_workers=32):
+        self.agents = list(agents)
+        self.token = token
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self._pool = HttpConnectionPool(max_idle_per_host=2)
+
+    def _headers(self):
+        headers = {"Content-Type": "application/json"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        return headers
+
+    def _stream_agent(self, agent, body, results, stop):
+        host, port = parse_resolver(agent, DEFAULT_AGENT_PORT)
+        key = ("http", host, port)
+        connection = self._pool.acquire(key)
+        while True:
+            reused = connection is not None
+            if not reused:
+                connection = http.client.HTTPConnection(host, port, timeout=self.timeout)
+            try:
+                connection.request("POST", "/run", body=body, headers=self._headers())
+                response = connection.getresponse()
+                break
+            except (OSError, http.client.HTTPException) as e:
+                connection.close()
+                connection = None
+                if not reused:
+                    results.put({"agent_address": agent, "test": "agent", "success": False, "error": str(e)})
+                    return
+                # The agent closed this idle pooled connection meanwhile: retry on a new one
+        try:
+            if response.status != 200:
+                error = json.loads(response.read() or b"{}").get("error", response.reason)
+                results.put({"agent_address": agent, "test": "agent", "success": False,
+                             "error": f"HTTP {response.status}: {error}"})
+            else:
+                for line in response:
+                    if stop.is_set():
+                        connection.close()
+                        return
+                    if line.strip():
+                        results.put({"agent_address": agent, **json.loads(line)})
+            if response.will_close:
+                connection.close()
+            else:
+                self._pool.release(key, connection)
+        except (OSError, http.client.HTTPException, ValueError) as e:
+            connection.close()
+            results.put({"agent_address": agent, "test": "agent", "success": False, "error": str(e)})
+
+    def run(self, tests=None):
+        """Runs ``tests`` (agent test specs, see agent.plan_from_specs) on every agent, yielding records.
+
+        Without ``tests`` every agent runs its own standard sequence. A failed
+        agent yields one {"test": "agent", "success": False, "error"} record.
+        """
+        body = json.dumps({"tests": tests} if tests is not None else {}).encode("utf-8")
+        results = queue.Queue()
+        stop = threading.Event() # Set when the consumer stops early; agent streams are then dropped
+
+        def _run(agent):
+            try:
+                self._stream_agent(agent, body, results, stop)
+            finally:
+                results.put(_DONE)
+
+        pool = ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(self.agents))))
+        try:
+            for agent in self.agents:
+                pool.submit(_run, agent)
+            remaining = len(self.agents)
+            while remaining:
+                record = results.get()
+                if record is _DONE:
+                    remaining -= 1
+                else:
+                    yield record
+        finally:
+            stop.set()
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def close(self):
+        self._pool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,182 @@
+import time
+from dns_probe import dns_benchmark, resolve_host
+from dual_stack import dual_stack_probe
+from http_probe import tcp_connect_probe, http_probe
+from network_diagnostics import get_network_info, ping_host, tracert_host
+from diagnostic_scheduler import DiagnosticScheduler, Task
+from reverse_dns import HopNameResolver
+from throughput import throughput_test, path_mtu_probe
+
+# (success hint, failure hint) shown after each ping test
+PING_HINTS = {
+    "ping_gateway": ("連接對外出口正常。", "可能無法連接到路由器或內部網路。"),
+    "ping_internal": ("校內網路連線正常。", "可能無法連接到校內伺服器，請檢查校內網路。"),
+    "ping_external_ip": ("可連線到網際網路。", "可能無法連線到網際網路，請檢查網路連線。"),
+    "ping_website": ("DNS 解析及網站連線正常。", "可能無法解析網域名稱或網站無法連線。"),
+    "tcp_website": ("可建立 TCP 連線到網站 (不受 ICMP 過濾影響)。", "無法建立 TCP 連線，網站可能無法連線或連接埠被封鎖。"),
+}
+
+# Tests whose result is meaningless once a prerequisite failed: nothing past the
+# gateway answers if the gateway does not, and the website tests need the test
+# website's name to resolve. They resolve it through the system resolver, not
+# the configured DNS servers dns_benchmark queries, so they wait on resolve_website
+DEPENDENCIES = {
+    "ping_internal": ("ping_gateway",),
+    "ping_external_ip": ("ping_gateway",),
+    "ping_website": ("resolve_website",),
+    "tcp_website": ("resolve_website",),
+    "http_website": ("resolve_website",),
+    "tracert_website": ("resolve_website",),
+    "dual_stack_website": ("resolve_website",),
+}
+
+
+def build_diagnostic_plan(config, on_hop=None, path_cache=None, hop_names=None):
+    """Builds the standard diagnostic test sequence from ``config``, a ConfigSnapshot of one site.
+
+    With a ``path_cache`` the traceroute is incremental, and with ``hop_names``
+    its hops are named by reverse DNS (see tracert_host). Throughput and path-MTU
+    tests are added when [Throughput] Server names a ThroughputServer, and an
+    IPv4/IPv6 comparison of the test website with [TestParameters] DualStack.
+
+    Returns a list of (key, label, target, func, args, kwargs) tuples in report order.
+    """
+    gateway_ip = config.get('NetworkSettings', 'GatewayIP')
+    internal_server_ip = config.get('NetworkSettings', 'InternalServerIP')
+    test_website = config.get('NetworkSettings', 'TestWebsite')
+    primary_dns = config.get('NetworkSettings', 'PrimaryDNS')
+    secondary_dns = config.get('NetworkSettings', 'SecondaryDNS')
+    test_url = config.get('NetworkSettings', 'TestURL') or f"https://{test_website}/"
+    ping_count = config.get('TestParameters', 'PingCount')
+    ping_timeout = config.get('TestParameters', 'PingTimeout')
+    tracert_max_hops = config.get('TestParameters', 'TracertMaxHops')
+    adaptive_ping = config.get('TestParameters', 'AdaptivePing')
+    dual_stack = config.get('TestParameters', 'DualStack')
+
+    ping_kwargs = {"count": ping_count, "timeout": ping_timeout, "adaptive": adaptive_ping}
+    plan = [
+        ("net_info", "網路資訊", None, get_network_info, (), {}),
+        ("ping_gateway", f"Ping 預設閘道 ({gateway_ip})", gateway_ip, ping_host, (gateway_ip,), ping_kwargs),
+        ("ping_internal", f"Ping 校內測試伺服器 ({internal_server_ip})", internal_server_ip, ping_host, (internal_server_ip,), ping_kwargs),
+        ("ping_external_ip", "Ping 外部 IP (8.8.8.8)", "8.8.8.8", ping_host, ("8.8.8.8",), ping_kwargs),
+        ("resolve_website", f"解析外部網站 ({test_website})", test_website, resolve_host, (test_website,), {}),
+        ("ping_website", f"Ping 外部網站 ({test_website})", test_website, ping_host, (test_website,), ping_kwargs),
+        ("dns_benchmark", f"DNS 伺服器查詢 ({test_website})", test_website, dns_benchmark,
+         ([primary_dns, secondary_dns], [test_website]), {"repeats": ping_count, "timeout": ping_timeout}),
+        ("tcp_website", f"TCP 連線 ({test_website}:443)", test_website, tcp_connect_probe, (test_website, 443),
+         {"count": ping_count, "timeout": ping_timeout}),
+        ("http_website", f"HTTP 請求 ({test_url})", test_url, http_probe, (test_url,), {"samples": ping_count}),
+        ("tracert_website", f"追蹤到外部網站 ({test_website}) 的路徑", test_website, tracert_host, (test_website,),
+         {"max_hops": tracert_max_hops, "on_hop": on_hop, "path_cache": path_cache, "hop_names": hop_names}),
+    ]
+    if dual_stack:
+        plan.append(("dual_stack_website", f"IPv4/IPv6 雙協定連線 ({test_website}:443)", test_website, dual_stack_probe,
+                     (test_website, 443), {"count": ping_count, "timeout": ping_timeout}))
+    throughput_server = config.get('Throughput', 'Server')
+    if throughput_server:
+        duration = config.get('Throughput', 'Duration')
+        udp_bitrate = config.get('Throughput', 'UdpBitrate') * 1e6
+        plan += [
+            ("throughput", f"頻寬測試 ({throughput_server})", throughput_server, throughput_test, (throughput_server,),
+             {"duration": duration, "udp_bitrate": udp_bitrate}),
+            ("path_mtu", f"路徑 MTU ({throughput_server})", throughput_server, path_mtu_probe, (throughput_server,), {}),
+        ]
+    return plan
+
+
+def hop_names_enabled(config):
+    return config.get('Traceroute', 'ResolveHopNames')
+
+
+def create_hop_name_resolver(config, ptr_cache, on_name=None):
+    """A HopNameResolver asking the primary DNS server, with lookups cached in ``ptr_cache``."""
+    return HopNameResolver(config.get('NetworkSettings', 'PrimaryDNS'), ptr_cache, on_name=on_name)
+
+
+def monitor_targets(config):
+    """Returns the hosts the standard sequence pings, for continuous monitoring."""
+    return [
+        config.get('NetworkSettings', 'GatewayIP'),
+        config.get('NetworkSettings', 'InternalServerIP'),
+        "8.8.8.8",
+        config.get('NetworkSettings', 'TestWebsite'),
+    ]
+
+
+def failed_result(key, message):
+    """Builds a failed result with ``message`` in the shape the probe behind ``key`` normally returns."""
+    if key == "net_info":
+        return {"adapter_name": "N/A", "status": message, "dns_servers": []}
+    if key.startswith("tracert"):
+        return [{"num": "Error", "ip": message, "latency": "N/A"}]
+    if key.startswith("resolve"):
+        return {"success": False, "latency": "N/A", "error": message, "addresses": []}
+    if key.startswith("dns"):
+        return {"success": False, "error": message, "resolvers": {}}
+    if key.startswith("http"):
+        return {"success": False, "latency": "N/A", "error": message, "status": None, "samples": []}
+    if key.startswith("dual_stack"):
+        return {"success": False, "error": message, "families": {}, "race": None}
+    if key == "throughput":
+        return {"success": False, "error": message, "upload_mbps": None, "download_mbps": None, "udp": None}
+    if key == "path_mtu":
+        return {"success": False, "error": message, "mtu": None, "kernel_mtu": None, "probes": 0}
+    return {"success": False, "latency": "N/A", "error": message, "rtts": []}
+
+
+def failure_message(key, result):
+    """The message a failed result carries, wherever the probe's result shape keeps it."""
+    if key == "net_info":
+        return result.get("status")
+    if key.startswith("tracert"):
+        return result[0].get("ip") if result else ""
+    return result.get("error")
+
+
+def result_succeeded(key, result):
+    if key == "net_info":
+        return result.get("status") == "已連線"
+    if key.startswith("tracert"):
+        return bool(result) and result[0].get("num") != "Error"
+    return bool(result.get("success"))
+
+
+def result_record(key, label, target, result, status):
+    """The JSON-ready record reported for one finished test (CLI output and agent streams)."""
+    record = {"timestamp": time.time(), "test": key, "label": label, "target": target, "status": status,
+              "success": result_succeeded(key, result)}
+    record["hops" if key.startswith("tracert") else "result"] = result
+    return record
+
+
+def create_scheduler(config, max_workers=8):
+    """A scheduler for the standard sequence, with the [TestParameters] TimeBudget (seconds, 0 = none).
+
+    It is not speculative: dependents wait for their prerequisites, so a dead
+    gateway or an unresolvable website saves the probes that would only time out.
+    """
+    time_budget = config.get('TestParameters', 'TimeBudget')
+    return DiagnosticScheduler(result_succeeded, failed_result, max_workers=max_workers, time_budget=time_budget,
+                               speculative=False)
+
+
+def run_diagnostic_plan(plan, on_complete=None, scheduler=None):
+    """Runs ``plan`` concurrently, yielding (key, label, result, status) in plan order.
+
+    Tests run under ``scheduler`` (see create_scheduler) using DEPENDENCIES: when
+    a prerequisite fails, its dependents are skipped, or cancelled if already
+    running. Keep a reference to the scheduler to cancel() the run from another
+    thread. ``on_complete(key, label, result, status)`` is called as soon as each
+    test becomes final.
+    """
+    labels = {key: label for key, label, *_ in plan}
+    scheduler = scheduler or DiagnosticScheduler(result_succeeded, failed_result, speculative=False)
+
+    def _on_complete(key, result, status):
+        if on_complete:
+            on_complete(key, labels[key], result, status)
+
+    tasks = [Task(key, func, args, kwargs, [dependency for dependency in DEPENDENCIES.get(key, ()) if dependency in labels])
+             for key, _, _, func, args, kwargs in plan]
+    for key, result, status in scheduler.run(tasks, on_complete=_on_complete):
+        yield key, labels[key], result, status
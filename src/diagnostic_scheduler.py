@@ -0,0 +1,172 @@
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from cancellation import CancelToken, cancel_scope
+
+STATUS_COMPLETED = "completed"
+STATUS_SKIPPED = "skipped"
+STATUS_CANCELLED = "cancelled"
+STATUS_TIMED_OUT = "timed_out"
+
+REASON_TIME_BUDGET = "超過時間預算"
+
+
+class Task:
+    """A schedulable test: ``func(*args, **kwargs)`` that may only be trusted once ``depends_on`` succeeded."""
+
+    __slots__ = ("key", "func", "args", "kwargs", "depends_on")
+
+    def __init__(self, key, func, args=(), kwargs=None, depends_on=()):
+        self.key = key
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs or {}
+        self.depends_on = tuple(depends_on)
+
+
+class DiagnosticScheduler:
+    """Runs a dependency graph of tests concurrently with a time budget and cancellation.
+
+    With ``speculative`` (the default) every task starts at once, so a healthy
+    run takes as long as its slowest test; a result is only reported once its
+    prerequisites succeeded, and when one fails, dependents still running are
+    cancelled, dependents not yet started never run and results already in are
+    dropped. Without it, a task starts only after all of its prerequisites
+    succeeded.
+
+    ``succeeded(key, result)`` decides whether a result satisfies dependents and
+    ``failed_result(key, message)`` builds the result reported for a task that
+    was skipped, cancelled, timed out or raised.
+    """
+
+    def __init__(self, succeeded, failed_result, max_workers=8, time_budget=None, cancel_token=None, speculative=True):
+        self.succeeded = succeeded
+        self.failed_result = failed_result
+        self.max_workers = max_workers
+        self.time_budget = time_budget
+        self.speculative = speculative
+        self.cancel_token = CancelToken(parent=cancel_token)
+        self.cancelled = False # Set by cancel(), not when the time budget runs out
+
+    def cancel(self):
+        """Cancels the run: in-flight probes are aborted and pending tasks are reported as cancelled."""
+        self.cancelled = True
+        self.cancel_token.cancel()
+
+    def run(self, tasks, on_complete=None):
+        """Yields (key, result, status) in task order, each as soon as it and all earlier tasks are final.
+
+        ``on_complete(key, result, status)`` fires the moment any task becomes final.
+        """
+        tasks = list(tasks)
+        index_of = {task.key: index for index, task in enumerate(tasks)}
+        task_by_key = {task.key: task for task in tasks}
+        dependents = {task.key: [] for task in tasks}
+        for task in tasks:
+            for dependency in task.depends_on:
+                dependents[dependency].append(task.key)
+        deadline = time.monotonic() + self.time_budget if self.time_budget else None
+
+        final = {} # index -> (result, status), until yielded
+        reported = set()
+        passed = set()
+        running = {} # future -> key
+        held = {} # key -> result of a speculative task whose prerequisites are still running
+        task_tokens = {}
+        started = set()
+
+        def _finish(key, result, status):
+            reported.add(key)
+            final[index_of[key]] = (result, status)
+            if on_complete:
+                on_complete(key, result, status)
+            if status == STATUS_COMPLETED and self.succeeded(key, result):
+                passed.add(key)
+                for dependent in dependents[key]:
+                    if dependent in held and _prerequisites_passed(dependent):
+                        _finish(dependent, held.pop(dependent), STATUS_COMPLETED)
+            elif status in (STATUS_COMPLETED, STATUS_SKIPPED):
+                _skip_dependents(key) # Cancelled and timed out runs report their dependents the same way
+
+        def _prerequisites_passed(key):
+            return all(dependency in passed for dependency in task_by_key[key].depends_on)
+
+        def _skip_dependents(failed_key):
+            for key in dependents[failed_key]:
+                if key in reported:
+                    continue
+                if key in task_tokens:
+                    task_tokens[key].cancel()
+                held.pop(key, None)
+                _finish(key, self.failed_result(key, f"已略過: 前置測試 {failed_key} 未通過"), STATUS_SKIPPED)
+
+        def _run_task(task, token):
+            with cancel_scope(token):
+                return task.func(*task.args, **task.kwargs)
+
+        def _start_ready(pool):
+            for task in tasks:
+                if task.key in started or task.key in reported:
+                    continue
+                if self.speculative or _prerequisites_passed(task.key):
+                    started.add(task.key)
+                    task_tokens[task.key] = CancelToken(parent=self.cancel_token)
+                    running[pool.submit(_run_task, task, task_tokens[task.key])] = task.key
+
+        # Completes as soon as the run is cancelled, so waiting below wakes up immediately
+        cancelled_future = Future()
+        self.cancel_token.register(lambda: cancelled_future.done() or cancelled_future.set_result(None))
+
+        next_index = 0
+        pool = ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(tasks))))
+        try:
+            _start_ready(pool)
+            while next_index < len(tasks):
+                while next_index in final:
+                    result, status = final.pop(next_index)
+                    yield tasks[next_index].key, result, status
+                    next_index += 1
+                if next_index >= len(tasks):
+                    break
+
+                if self.cancel_token.cancelled:
+                    # Report everything outstanding right away; aborted probes finish in the background
+                    reason = self.cancel_token.reason
+                    status = STATUS_TIMED_OUT if reason == REASON_TIME_BUDGET else STATUS_CANCELLED
+                    for task in tasks:
+                        if task.key not in reported:
+                            _finish(task.key, self.failed_result(task.key, reason), status)
+                    continue
+                if not running:
+                    # Nothing in flight can make progress (non-speculative run blocked on a prerequisite)
+                    for task in tasks:
+                        if task.key not in reported:
+                            _finish(task.key, self.failed_result(task.key, "已略過: 前置測試未通過"), STATUS_SKIPPED)
+                    continue
+
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                done, _ = wait([cancelled_future, *running], timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    self.cancel_token.cancel(REASON_TIME_BUDGET)
+                    continue
+                for future in done:
+                    if future is cancelled_future:
+                        continue
+                    key = running.pop(future)
+                    if key in reported:
+                        continue # Already reported as skipped while it was still running
+                    if task_tokens[key].cancelled:
+                        continue # Reported by the cancellation branch above
+                    if future.exception() is not None:
+                        result = self.failed_result(key, f"發生未知錯誤: {future.exception()}")
+                    else:
+                        result = future.result()
+                    if _prerequisites_passed(key):
+                        _finish(key, result, STATUS_COMPLETED)
+                    else:
+                        held[key] = result # Finished before a prerequisite; trusted only once it passes
+                _start_ready(pool)
+        finally:
+            # Leaving early (consumer stopped iterating) must not leave probes running
+            if next_index < len(tasks):
+                self.cancel_token.cancel()
+            pool.shutdown(wait=False, cancel_futures=True)
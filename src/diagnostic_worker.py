@@ -0,0 +1,226 @@
+import threading
+from PySide6.QtCore import QThread, Signal
+from config_manager import ConfigurationManager
+from diagnostic_plan import build_diagnostic_plan, create_scheduler, create_hop_name_resolver, hop_names_enabled, run_diagnostic_plan, result_succeeded, failure_message, PING_HINTS
+from diagnostic_scheduler import STATUS_COMPLETED, STATUS_SKIPPED
+from history_store import HistoryStore
+from path_cache import PathCache
+from reverse_dns import PtrCache
+from result_model import make_record, LEVEL_INFO, LEVEL_SUCCESS, LEVEL_FAILURE
+import tracing
+
+class DiagnosticWorker(QThread):
+    # Signals to communicate with the main thread
+    info_update = Signal(str)
+    record_update = Signal(object) # dict from make_record()
+    finished = Signal()
+
+    def __init__(self, config_manager: ConfigurationManager, history_store: HistoryStore = None,
+                 path_cache: PathCache = None, ptr_cache: PtrCache = None, parent=None):
+        super().__init__(parent)
+        self.config_manager = config_manager
+        self.history_store = history_store
+        self.path_cache = path_cache
+        self.ptr_cache = ptr_cache
+        # One snapshot for the whole run, even if config.ini is reloaded meanwhile
+        self.config = config_manager.snapshot()
+        self.scheduler = create_scheduler(self.config)
+        # Hop names that land after the traceroute was reported are added below it, once per hop
+        self._hop_names_lock = threading.Lock()
+        self._tracert_label = None
+        self._named_hops = set()
+
+    def cancel(self):
+        """Called from the GUI thread: aborts running tests and reports the rest as cancelled."""
+        self.scheduler.cancel()
+
+    def run(self):
+        with tracing.span("diagnosis", "run"):
+            self._run()
+
+    def _run(self):
+        self._emit("", "診斷開始...")
+        self.info_update.emit("正在獲取網路資訊並同時執行所有測試...")
+
+        # Tests run concurrently once their prerequisites passed and are reported in plan order; tests whose prerequisite failed are skipped
+        hop_names = None
+        if self.ptr_cache is not None and hop_names_enabled(self.config):
+            hop_names = create_hop_name_resolver(self.config, self.ptr_cache, on_name=self._on_hop_named)
+        plan = build_diagnostic_plan(self.config, on_hop=self._on_trace_hop, path_cache=self.path_cache,
+                                     hop_names=hop_names)
+
+        targets = {key: target for key, _, target, *_ in plan}
+
+        def _on_complete(key, label, result, status):
+            self.info_update.emit(f"已完成: {label}")
+            if self.history_store and status == STATUS_COMPLETED:
+                self.history_store.record_result(key, targets[key], result, result_succeeded(key, result))
+
+        for key, label, result, status in run_diagnostic_plan(plan, on_complete=_on_complete, scheduler=self.scheduler):
+            if status != STATUS_COMPLETED:
+                level = LEVEL_INFO if status == STATUS_SKIPPED else LEVEL_FAILURE
+                self._emit(label, f"未執行完成: {failure_message(key, result)}", level)
+            elif key == "net_info":
+                self._emit_network_info(label, result)
+            elif key in PING_HINTS:
+                self._emit_ping_result(label, result, *PING_HINTS[key])
+            elif key == "http_website":
+                self._emit_http_result(label, result)
+            elif key == "resolve_website":
+                self._emit_resolve_result(label, result)
+            elif key == "dns_benchmark":
+                self._emit_dns_result(label, result)
+            elif key == "dual_stack_website":
+                self._emit_dual_stack_result(label, result)
+            elif key == "throughput":
+                self._emit_throughput_result(label, result)
+            elif key == "path_mtu":
+                self._emit_mtu_result(label, result)
+            elif key == "tracert_website":
+                self._emit_tracert_result(label, result)
+                if self.path_cache:
+                    self._emit_path_diff(label, self.path_cache.last_diff(targets[key]))
+
+        if self.history_store and not self.scheduler.cancelled:
+            # Apply the retention policy while the worker thread is still off the GUI thread
+            self.history_store.compact()
+        self.info_update.emit("診斷已取消。" if self.scheduler.cancelled else "診斷完成！")
+        self.finished.emit()
+
+    def _on_trace_hop(self, hop):
+        self.info_update.emit(f"路徑追蹤: 第 {hop.get('num')} 跳 {hop.get('ip')} ({hop.get('latency')})")
+
+    def _on_hop_named(self, host, hop):
+        """Called from the lookup thread; before the traceroute is reported its hop lines carry the name."""
+        with self._hop_names_lock:
+            if self._tracert_label is None or hop["num"] in self._named_hops:
+                return
+            self._named_hops.add(hop["num"])
+            self._emit(self._tracert_label, f"  {hop['num']}. {hop['name']} [{hop['ip']}] (反向解析)")
+
+    def _emit(self, section, text, level=LEVEL_INFO):
+        record = make_record(section, text, level)
+        if tracing.enabled():
+            record["emitted_ns"] = tracing.now() # Popped by the GUI thread to time the queued signal
+        self.record_update.emit(record)
+
+    def _emit_network_info(self, label, net_info):
+        self._emit(label, f"介面卡名稱: {net_info.get('adapter_name')}")
+        self._emit(label, f"連線狀態: {net_info.get('status')}")
+        self._emit(label, f"連線類型: {net_info.get('connection_type')}")
+        self._emit(label, f"IP 位址: {net_info.get('ip_address')}")
+        self._emit(label, f"子網路遮罩: {net_info.get('subnet_mask')}")
+        self._emit(label, f"預設閘道: {net_info.get('default_gateway')}")
+        self._emit(label, f"DNS 伺服器: {', '.join(net_info.get('dns_servers'))}")
+
+    def _emit_ping_result(self, label, ping_result, success_hint, failure_hint):
+        if ping_result["success"]:
+            self._emit(label, f"成功！延遲: {ping_result['latency']}。{success_hint}", LEVEL_SUCCESS)
+        else:
+            self._emit(label, f"失敗！錯誤: {ping_result['error']}。{failure_hint}", LEVEL_FAILURE)
+
+    def _emit_http_result(self, label, http_result):
+        for index, sample in enumerate(http_result["samples"], start=1):
+            if "error" in sample:
+                self._emit(label, f"  第 {index} 次: 錯誤 {sample['error']}")
+            elif sample["reused"]:
+                self._emit(label, f"  第 {index} 次 (重用連線): 首位元組 {sample['ttfb']:.1f}ms，總計 {sample['total']:.1f}ms")
+            else:
+                tls = f"，TLS {sample['tls']:.1f}ms" if sample["tls"] is not None else ""
+                self._emit(label, f"  第 {index} 次 (新連線): DNS {sample['dns']:.1f}ms，連線 {sample['connect']:.1f}ms{tls}，"
+                                  f"首位元組 {sample['ttfb']:.1f}ms，總計 {sample['total']:.1f}ms")
+        if http_result["success"]:
+            self._emit(label, f"成功！HTTP {http_result['status']}，平均首位元組時間: {http_result['latency']}。網站服務正常。", LEVEL_SUCCESS)
+        else:
+            self._emit(label, f"失敗！錯誤: {http_result['error']}。網站可能無法連線或服務異常。", LEVEL_FAILURE)
+
+    def _emit_resolve_result(self, label, resolve_result):
+        if resolve_result["success"]:
+            self._emit(label, f"成功！耗時 {resolve_result['latency']}，位址: {', '.join(resolve_result['addresses'])}", LEVEL_SUCCESS)
+        else:
+            self._emit(label, f"失敗！錯誤: {resolve_result['error']}。系統無法解析網站名稱，網站相關測試將略過。", LEVEL_FAILURE)
+
+    def _emit_dns_result(self, label, dns_result):
+        for resolver, details in dns_result["resolvers"].items():
+            answered = len(details["latencies"])
+            if details["avg"] is not None:
+                summary = f"平均 {details['avg']:.1f}ms (最小 {details['min']:.1f}ms / 最大 {details['max']:.1f}ms)"
+            else:
+                summary = "無回應"
+            self._emit(label, f"  {resolver}: {summary}，回應 {answered}/{details['sent']}，逾時 {details['timeouts']}")
+            for name, error in details["errors"].items():
+                self._emit(label, f"    {name}: {error}")
+        if dns_result["success"]:
+            self._emit(label, "成功！DNS 伺服器可正常解析網域名稱。", LEVEL_SUCCESS)
+        else:
+            self._emit(label, f"失敗！錯誤: {dns_result['error']}。請檢查 DNS 伺服器設定。", LEVEL_FAILURE)
+
+    def _emit_dual_stack_result(self, label, dual_stack_result):
+        for family, details in dual_stack_result["families"].items():
+            if details["error"]:
+                self._emit(label, f"  {family}: {details['error']}")
+                continue
+            ping, tcp = details["ping"], details["tcp"]
+            ping_text = ping["latency"] if ping["success"] else f"失敗 ({ping['error']})"
+            tcp_text = tcp["latency"] if tcp["success"] else f"失敗 ({tcp['error']})"
+            self._emit(label, f"  {family} {details['addresses'][0]}: 解析 {details['resolve_ms']:.1f}ms，"
+                              f"Ping {ping_text}，TCP 連線 {tcp_text}")
+        race = dual_stack_result["race"]
+        if dual_stack_result["success"]:
+            if race["fallback_ms"] >= 1:
+                cost = f"，改用此協定多花了 {race['fallback_ms']:.0f}ms"
+            else:
+                cost = ""
+            self._emit(label, f"成功！瀏覽器實際會使用 {race['family']} ({race['winner']})，"
+                              f"連線耗時 {race['elapsed_ms']:.1f}ms{cost}。", LEVEL_SUCCESS)
+        else:
+            self._emit(label, f"失敗！錯誤: {dual_stack_result['error']}。IPv4 與 IPv6 皆無法連線到網站。", LEVEL_FAILURE)
+
+    def _emit_throughput_result(self, label, throughput_result):
+        if throughput_result["upload_mbps"] is not None:
+            self._emit(label, f"  TCP 上傳: {throughput_result['upload_mbps']:.1f} Mbit/s")
+        if throughput_result["download_mbps"] is not None:
+            self._emit(label, f"  TCP 下載: {throughput_result['download_mbps']:.1f} Mbit/s")
+        udp = throughput_result["udp"]
+        if udp:
+            self._emit(label, f"  UDP {udp['bitrate_mbps']:.1f} Mbit/s: 遺失 {udp['loss_percent']:.1f}% "
+                              f"({udp['received']}/{udp['sent']})，抖動 {udp['jitter_ms']:.2f}ms")
+        if throughput_result["success"]:
+            self._emit(label, "頻寬測試完成。", LEVEL_SUCCESS)
+        else:
+            self._emit(label, f"頻寬測試失敗！錯誤: {throughput_result['error']}", LEVEL_FAILURE)
+
+    def _emit_mtu_result(self, label, mtu_result):
+        if mtu_result["success"]:
+            self._emit(label, f"路徑 MTU: {mtu_result['mtu']} 位元組 (探測 {mtu_result['probes']} 次)。", LEVEL_SUCCESS)
+        else:
+            self._emit(label, f"路徑 MTU 探測失敗！錯誤: {mtu_result['error']}", LEVEL_FAILURE)
+
+    def _emit_tracert_result(self, label, tracert_result):
+        if tracert_result and not tracert_result[0].get("num") == "Error":
+            with self._hop_names_lock:
+                for hop in tracert_result:
+                    if hop.get("name"):
+                        self._named_hops.add(hop.get("num"))
+                        self._emit(label, f"  {hop.get('num')}. {hop['name']} [{hop.get('ip')}] ({hop.get('latency')})")
+                    else:
+                        self._emit(label, f"  {hop.get('num')}. {hop.get('ip')} ({hop.get('latency')})")
+                self._emit(label, "路徑追蹤完成，顯示網路封包經過的節點。")
+                self._tracert_label = label
+        else:
+            error = tracert_result[0].get('ip') if tracert_result else "沒有任何回應"
+            self._emit(label, f"追蹤路徑失敗！錯誤: {error}。可能無法到達目標網站。", LEVEL_FAILURE)
+
+    def _emit_path_diff(self, label, diff):
+        if not diff:
+            return
+        if not diff["changed"]:
+            self._emit(label, "路徑與上次相同。")
+            return
+        self._emit(label, "路徑已變更：", LEVEL_FAILURE)
+        for hop in diff["changed_hops"]:
+            self._emit(label, f"  第 {hop['num']} 跳: {hop['old_ip']} → {hop['new_ip']}")
+        for hop in diff["added"]:
+            self._emit(label, f"  新增第 {hop['num']} 跳: {hop['ip']}")
+        for hop in diff["removed"]:
+            self._emit(label, f"  移除第 {hop['num']} 跳: {hop['ip']}")
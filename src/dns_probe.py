@@ -0,0 +1,268 @@
+import math
+import random
+import select
+import socket
+import struct
+import threading
+import time
+from cancellation import is_cancelled, CANCEL_POLL_INTERVAL
+
+DNS_PORT = 53
+QTYPE_A = 1
+QTYPE_CNAME = 5
+QTYPE_PTR = 12
+QTYPE_AAAA = 28
+QCLASS_IN = 1
+RCODE_NAMES = {0: "NOERROR", 1: "FORMERR", 2: "SERVFAIL", 3: "NXDOMAIN", 4: "NOTIMP", 5: "REFUSED"}
+
+_HEADER = struct.Struct("!HHHHHH")
+
+
+class DnsFormatError(Exception):
+    pass
+
+
+def build_query(name, qtype=QTYPE_A, query_id=None):
+    """Builds a recursive DNS query packet; returns (query_id, packet).
+
+    Raises UnicodeError for names the idna codec rejects, such as empty or over-long labels.
+    """
+    if query_id is None:
+        query_id = random.getrandbits(16)
+    question = b"".join(struct.pack("!B", len(label)) + label
+                        for label in name.rstrip(".").encode("idna").split(b".") if label)
+    packet = _HEADER.pack(query_id, 0x0100, 1, 0, 0, 0) + question + b"\x00" + struct.pack("!HH", qtype, QCLASS_IN)
+    return query_id, packet
+
+
+def _read_name(data, offset):
+    """Decodes a possibly compressed domain name; returns (name, offset after the name)."""
+    labels = []
+    end = None
+    for _ in range(128): # Bound pointer chains
+        if offset >= len(data):
+            raise DnsFormatError("name runs past end of message")
+        length = data[offset]
+        if length & 0xC0 == 0xC0:
+            if offset + 1 >= len(data):
+                raise DnsFormatError("compression pointer runs past end of message")
+            if end is None:
+                end = offset + 2
+            offset = ((length & 0x3F) << 8) | data[offset + 1]
+        elif length == 0:
+            return ".".join(labels), end if end is not None else offset + 1
+        else:
+            labels.append(data[offset + 1:offset + 1 + length].decode("ascii", errors="replace"))
+            offset += 1 + length
+    raise DnsFormatError("name compression loop")
+
+
+def parse_response(data):
+    """Parses a DNS response into (query_id, rcode, answers) with answers as (type, ttl, value) tuples."""
+    if len(data) < _HEADER.size:
+        raise DnsFormatError("message shorter than the header")
+    query_id, flags, qdcount, ancount, _, _ = _HEADER.unpack_from(data)
+    offset = _HEADER.size
+    for _ in range(qdcount):
+        _, offset = _read_name(data, offset)
+        offset += 4
+    answers = []
+    for _ in range(ancount):
+        _, offset = _read_name(data, offset)
+        if offset + 10 > len(data):
+            raise DnsFormatError("truncated resource record")
+        rtype, _, ttl, rdlength = struct.unpack_from("!HHIH", data, offset)
+        offset += 10
+        if offset + rdlength > len(data):
+            raise DnsFormatError("truncated resource data")
+        rdata = data[offset:offset + rdlength]
+        if rtype == QTYPE_A and rdlength == 4:
+            answers.append((rtype, ttl, socket.inet_ntop(socket.AF_INET, rdata)))
+        elif rtype == QTYPE_AAAA and rdlength == 16:
+            answers.append((rtype, ttl, socket.inet_ntop(socket.AF_INET6, rdata)))
+        elif rtype in (QTYPE_CNAME, QTYPE_PTR):
+            answers.append((rtype, ttl, _read_name(data, offset)[0]))
+        offset += rdlength
+    return query_id, flags & 0x000F, answers
+
+
+def parse_resolver(resolver, default_port=DNS_PORT):
+    """Splits "host", "host:port" or "[v6]:port" into (host, port)."""
+    if resolver.startswith("["):
+        host, _, port = resolver[1:].partition("]:")
+        return host.rstrip("]"), int(port) if port else default_port
+    if resolver.count(":") == 1:
+        host, port = resolver.split(":")
+        return host, int(port)
+    return resolver, default_port
+
+
+def _latency_summary(latencies):
+    if not latencies:
+        return {"min": None, "avg": None, "max": None, "p95": None}
+    ordered = sorted(latencies)
+    return {"min": ordered[0], "avg": sum(ordered) / len(ordered), "max": ordered[-1],
+            "p95": ordered[max(0, math.ceil(0.95 * len(ordered)) - 1)]}
+
+
+def _fail_pending(pending, results, sock, error):
+    for key in [key for key in pending if key[0] is sock]:
+        resolver, name, _ = pending.pop(key)
+        results[resolver]["errors"][name] = str(error)
+
+
+def query_resolvers(resolvers, names, qtype=QTYPE_A, repeats=1, timeout=1000):
+    """Sends every (name x repeat) query to every resolver at once and collects the replies.
+
+    All queries share one select() loop with one UDP socket per resolver, so the
+    whole benchmark takes about one ``timeout`` (ms) at most. Returns
+    {resolver: {"latencies": [ms...], "sent", "timeouts", "answers": {name: [values]},
+    "ttls": {name: lowest answer TTL in seconds}, "errors": {name: rcode name or error},
+    "min", "avg", "max", "p95"}} where latencies are per answered query.
+    A resolver that cannot be reached or a name that cannot be encoded only
+    fails its own entries.
+    """
+    sockets = {}
+    pending = {} # (socket, query_id) -> (resolver, name, sent_at)
+    results = {}
+    invalid = {}
+    for name in names:
+        try:
+            build_query(name, qtype)
+        except UnicodeError:
+            invalid[name] = "無效的網域名稱"
+    try:
+        for resolver in resolvers:
+            results[resolver] = {"latencies": [], "sent": 0, "timeouts": 0, "answers": {}, "ttls": {},
+                                 "errors": dict(invalid)}
+            sock = None
+            try:
+                host, port = parse_resolver(resolver)
+                family = socket.AF_INET6 if ":" in host else socket.AF_INET
+                sock = socket.socket(family, socket.SOCK_DGRAM)
+                sock.setblocking(False)
+                sock.connect((host, port))
+            except (OSError, ValueError, OverflowError) as e:
+                # A malformed address, an unknown host or a family this host lacks: only this resolver fails
+                if sock is not None:
+                    sock.close()
+                results[resolver]["errors"].update((name, str(e)) for name in names if name not in invalid)
+                continue
+            sockets[sock] = resolver
+            used_ids = set()
+            try:
+                for name in names:
+                    if name in invalid:
+                        continue
+                    for _ in range(repeats):
+                        query_id, packet = build_query(name, qtype)
+                        while query_id in used_ids:
+                            query_id, packet = build_query(name, qtype)
+                        used_ids.add(query_id)
+                        pending[(sock, query_id)] = (resolver, name, time.perf_counter())
+                        results[resolver]["sent"] += 1
+                        sock.send(packet)
+            except OSError as e:
+                # An earlier query already drew ICMP port unreachable: give up on this resolver
+                _fail_pending(pending, results, sock, e)
+
+        deadline = time.perf_counter() + timeout / 1000
+        while pending and not is_cancelled():
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            readable, _, _ = select.select(list(sockets), [], [], min(remaining, CANCEL_POLL_INTERVAL))
+            for sock in readable:
+                try:
+                    data = sock.recv(4096)
+                except OSError as e:
+                    # ICMP port unreachable on a connected socket: resolver is not listening
+                    _fail_pending(pending, results, sock, e)
+                    continue
+                received_at = time.perf_counter()
+                try:
+                    query_id, rcode, answers = parse_response(data)
+                except DnsFormatError:
+                    continue
+                entry = pending.pop((sock, query_id), None)
+                if entry is None:
+                    continue
+                resolver, name, sent_at = entry
+                results[resolver]["latencies"].append((received_at - sent_at) * 1000)
+                if rcode:
+                    results[resolver]["errors"][name] = RCODE_NAMES.get(rcode, f"RCODE {rcode}")
+                else:
+                    results[resolver]["answers"][name] = [value for _, _, value in answers]
+                    if answers:
+                        results[resolver]["ttls"][name] = min(ttl for _, ttl, _ in answers)
+    finally:
+        for sock in sockets:
+            sock.close()
+
+    for resolver, _, _ in pending.values():
+        results[resolver]["timeouts"] += 1
+    for result in results.values():
+        result.update(_latency_summary(result["latencies"]))
+    return results
+
+
+def dns_benchmark(resolvers, names, repeats=3, timeout=1000):
+    """Benchmarks the configured resolvers; returns a ping_host-like result with per-resolver details.
+
+    ``success`` is True when at least one resolver answered every name.
+    """
+    resolvers = [resolver for resolver in resolvers if resolver]
+    result = {"success": False, "error": "", "resolvers": {}}
+    if not resolvers:
+        result["error"] = "未設定 DNS 伺服器"
+        return result
+    try:
+        result["resolvers"] = query_resolvers(resolvers, names, repeats=repeats, timeout=timeout)
+    except OSError as e:
+        result["error"] = f"發生未知錯誤: {e}"
+        return result
+    result["success"] = any(set(names) <= set(details["answers"]) for details in result["resolvers"].values())
+    if not result["success"]:
+        result["error"] = "所有 DNS 伺服器皆無法解析測試網域"
+    return result
+
+
+def resolve_host(host, timeout=5000):
+    """Resolves ``host`` through the system resolver, the way the website probes do; returns a ping_host-like result.
+
+    ``latency`` is the lookup time and ``addresses`` the distinct addresses
+    returned. getaddrinfo cannot be interrupted, so it runs on a daemon thread
+    that is abandoned on timeout or cancellation.
+    """
+    result = {"success": False, "latency": "N/A", "error": "", "addresses": []}
+    outcome = {}
+    done = threading.Event()
+
+    def lookup():
+        try:
+            outcome["infos"] = socket.getaddrinfo(host, None, type=socket.SOCK_STREAM)
+        except (socket.gaierror, UnicodeError):
+            outcome["error"] = "無法找到主機"
+        except OSError as e:
+            outcome["error"] = f"發生未知錯誤: {e}"
+        outcome["ms"] = (time.perf_counter() - started) * 1000
+        done.set()
+
+    started = time.perf_counter()
+    deadline = started + timeout / 1000
+    threading.Thread(target=lookup, daemon=True).start()
+    while not done.wait(min(CANCEL_POLL_INTERVAL, max(deadline - time.perf_counter(), 0))):
+        if is_cancelled():
+            result["error"] = "已取消"
+            return result
+        if time.perf_counter() >= deadline:
+            result["error"] = "解析逾時"
+            return result
+
+    if "error" in outcome:
+        result["error"] = outcome["error"]
+        return result
+    result["addresses"] = list(dict.fromkeys(address[0] for _, _, _, _, address in outcome["infos"]))
+    result["latency"] = f"{outcome['ms']:.3f}ms"
+    result["success"] = True
+    return result
@@ -0,0 +1,193 @@
+"""Dual-stack probing: IPv4 and IPv6 paths to one host side by side, plus a happy-eyeballs race.
+
+Both address families are resolved and probed (ping and TCP connect) in
+parallel, then the addresses are raced the way an RFC 8305 client connects:
+IPv6 first, families interleaved, and each further attempt started
+``attempt_delay`` seconds after the previous one (or as soon as it fails). The
+race shows which family a browser would end up using and what the fallback
+costs when the preferred family is slow or broken.
+"""
+import errno
+import os
+import select
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+from cancellation import cancel_scope, current_token, is_cancelled, CANCEL_POLL_INTERVAL
+from http_probe import tcp_connect_probe
+from network_diagnostics import ping_host
+
+ATTEMPT_DELAY = 0.25 # RFC 8305 "Connection Attempt Delay" recommended default, in seconds
+FAMILY_NAMES = {socket.AF_INET6: "IPv6", socket.AF_INET: "IPv4"}
+
+
+def _ms(start, end):
+    return (end - start) * 1000
+
+
+def _resolve_family(host, port, family):
+    """Resolves ``host`` for one family; returns (addresses, resolve ms, error)."""
+    started = time.perf_counter()
+    try:
+        infos = socket.getaddrinfo(host, port, family, socket.SOCK_STREAM)
+    except (socket.gaierror, UnicodeError):
+        return [], _ms(started, time.perf_counter()), "無法找到主機"
+    addresses = list(dict.fromkeys(address[0] for _, _, _, _, address in infos))
+    return addresses, _ms(started, time.perf_counter()), ""
+
+
+def interleave(addresses):
+    """Orders addresses for connection attempts: IPv6 first, then alternating families (RFC 8305 §4)."""
+    by_family = {socket.AF_INET6: [], socket.AF_INET: []}
+    for address in addresses:
+        by_family[socket.AF_INET6 if ":" in address else socket.AF_INET].append(address)
+    ordered = []
+    for pair in zip(by_family[socket.AF_INET6], by_family[socket.AF_INET]):
+        ordered += pair
+    shorter = min(len(by_family[socket.AF_INET6]), len(by_family[socket.AF_INET]))
+    return ordered + by_family[socket.AF_INET6][shorter:] + by_family[socket.AF_INET][shorter:]
+
+
+def race_connect(addresses, port, attempt_delay=ATTEMPT_DELAY, timeout=2000):
+    """Connects to the first of ``addresses`` (in interleave order) that accepts, staggering attempts.
+
+    Attempts run concurrently on non-blocking sockets; a new one starts every
+    ``attempt_delay`` seconds, or right away when an earlier one fails. Returns
+    {"winner": address or None, "family", "connect_ms" (handshake time of the
+    winner), "elapsed_ms" (race start to connected), "fallback_ms" (how late the
+    winning attempt started), "attempts": [{"address", "family", "started_ms",
+    "outcome": "connected"|"failed"|"abandoned", "error"}], "error"}.
+    """
+    result = {"winner": None, "family": None, "connect_ms": None, "elapsed_ms": None, "fallback_ms": None,
+              "attempts": [], "error": ""}
+    queue = interleave(addresses)
+    if not queue:
+        result["error"] = "無法找到主機"
+        return result
+
+    pending = {} # socket -> (attempt, started_at)
+    started = time.perf_counter()
+    deadline = started + timeout / 1000
+    next_attempt_at = started
+    try:
+        while not is_cancelled():
+            now = time.perf_counter()
+            if queue and (now >= next_attempt_at or not pending):
+                address = queue.pop(0)
+                family = socket.AF_INET6 if ":" in address else socket.AF_INET
+                attempt = {"address": address, "family": FAMILY_NAMES[family], "started_ms": _ms(started, now),
+                           "outcome": "failed", "error": ""}
+                result["attempts"].append(attempt)
+                try:
+                    sock = socket.socket(family, socket.SOCK_STREAM)
+                except OSError as e:
+                    # No stack for this family (EAFNOSUPPORT): fall back to the next address at once
+                    attempt["error"] = e.strerror or str(e)
+                    next_attempt_at = now
+                    continue
+                sock.setblocking(False)
+                try:
+                    code = sock.connect_ex((address, port))
+                except OSError as e:
+                    # A literal the family cannot use, e.g. a scoped address with an unknown interface
+                    code = e.errno or errno.EINVAL
+                if code in (0, errno.EINPROGRESS, errno.EWOULDBLOCK, getattr(errno, "WSAEWOULDBLOCK", -1)):
+                    pending[sock] = (attempt, now)
+                    next_attempt_at = now + attempt_delay
+                else:
+                    attempt["error"] = os.strerror(code)
+                    next_attempt_at = now
+                    sock.close()
+                continue
+            if not pending or now >= deadline:
+                break
+
+            wait = min(deadline - now, CANCEL_POLL_INTERVAL)
+            if queue:
+                wait = min(wait, max(next_attempt_at - now, 0))
+            # Windows reports a refused non-blocking connect in the exceptional set
+            _, writable, failed = select.select([], list(pending), list(pending), wait)
+            connected_at = time.perf_counter()
+            for sock in set(writable) | set(failed):
+                attempt, attempt_started = pending.pop(sock)
+                code = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                sock.close()
+                if code or sock in failed:
+                    attempt["error"] = os.strerror(code) if code else "連線被拒"
+                    next_attempt_at = connected_at # A failed attempt lets the next one start at once
+                elif result["winner"] is None:
+                    attempt["outcome"] = "connected"
+                    result.update(winner=attempt["address"], family=attempt["family"],
+                                  connect_ms=_ms(attempt_started, connected_at),
+                                  elapsed_ms=_ms(started, connected_at), fallback_ms=attempt["started_ms"])
+            if result["winner"] is not None:
+                break
+    finally:
+        for sock, (attempt, _) in pending.items():
+            attempt["outcome"] = "abandoned"
+            sock.close()
+
+    if result["winner"] is None:
+        failed = [attempt["error"] for attempt in result["attempts"] if attempt["error"]]
+        if is_cancelled():
+            result["error"] = "已取消"
+        else:
+            result["error"] = "連線逾時" if len(failed) < len(result["attempts"]) else failed[0]
+    return result
+
+
+def _family_probe(address, family, port, count, timeout):
+    """Pings and TCP-connects one address of one family."""
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        ping = executor.submit(_in_scope, current_token(), ping_host, address,
+                               count=count, timeout=timeout, family=family)
+        tcp = executor.submit(_in_scope, current_token(), tcp_connect_probe, address, port,
+                              count=count, timeout=timeout)
+        return ping.result(), tcp.result()
+
+
+def _in_scope(token, func, *args, **kwargs):
+    """Runs ``func`` on a helper thread under the calling task's cancel token."""
+    with cancel_scope(token):
+        return func(*args, **kwargs)
+
+
+def dual_stack_probe(host, port=443, count=3, timeout=1000, attempt_delay=ATTEMPT_DELAY, addresses=None):
+    """Probes ``host`` over IPv4 and IPv6 in parallel and races the two like a happy-eyeballs client.
+
+    ``addresses`` skips resolution and probes those literal addresses instead
+    (e.g. ["::1", "127.0.0.1"] as stand-ins). Returns {"success", "error",
+    "families": {"IPv6"|"IPv4": {"addresses", "resolve_ms", "error", "ping"
+    (ping_host result), "tcp" (tcp_connect_probe result)}}, "race" (see
+    race_connect)}; ``success`` is True when the race connected over either family.
+    """
+    result = {"success": False, "error": "", "families": {}, "race": None}
+    token = current_token()
+    families = (socket.AF_INET6, socket.AF_INET)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        if addresses is None:
+            lookups = [executor.submit(_resolve_family, host, port, family) for family in families]
+            resolved = dict(zip(families, (lookup.result() for lookup in lookups)))
+        else:
+            resolved = {family: ([address for address in addresses if (":" in address) == (family == socket.AF_INET6)],
+                                 0.0, "") for family in families}
+        for family, (family_addresses, resolve_ms, error) in resolved.items():
+            if not family_addresses and not error:
+                error = "沒有此類型的位址"
+            result["families"][FAMILY_NAMES[family]] = {"addresses": family_addresses, "resolve_ms": resolve_ms,
+                                                        "error": error, "ping": None, "tcp": None}
+        probes = {family: executor.submit(_in_scope, token, _family_probe, resolved[family][0][0], family,
+                                          port, count, timeout)
+                  for family in families if resolved[family][0]}
+        all_addresses = [address for family in families for address in resolved[family][0]]
+        result["race"] = race_connect(all_addresses, port, attempt_delay, timeout)
+        for family, probe in probes.items():
+            details = result["families"][FAMILY_NAMES[family]]
+            details["ping"], details["tcp"] = probe.result()
+
+    result["success"] = result["race"]["winner"] is not None
+    if not all_addresses:
+        result["error"] = "無法找到主機"
+    elif not result["success"]:
+        result["error"] = result["race"]["error"]
+    return result
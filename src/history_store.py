@@ -0,0 +1,367 @@
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS probes (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    target TEXT NOT NULL,
+    test TEXT NOT NULL,
+    success INTEGER NOT NULL,
+    latency_ms REAL,
+    rtts TEXT,
+    hops TEXT,
+    detail TEXT
+);
+-- Covering index: range scans for one target never touch the table itself
+CREATE INDEX IF NOT EXISTS idx_probes_target_ts ON probes (target, ts, test, success, latency_ms);
+CREATE INDEX IF NOT EXISTS idx_probes_ts ON probes (ts);
+CREATE TABLE IF NOT EXISTS rollups (
+    target TEXT NOT NULL,
+    test TEXT NOT NULL,
+    bucket_start REAL NOT NULL,
+    samples INTEGER NOT NULL,
+    successes INTEGER NOT NULL,
+    min_ms REAL,
+    avg_ms REAL,
+    max_ms REAL,
+    p95_ms REAL,
+    histogram TEXT, -- {bin: count} of the successful latencies, see _histogram_bin
+    PRIMARY KEY (target, test, bucket_start)
+);
+-- compact() has rolled every raw row with ts < rolled_until up into buckets of bucket_seconds
+CREATE TABLE IF NOT EXISTS rollup_state (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    rolled_until REAL NOT NULL,
+    bucket_seconds REAL NOT NULL
+);
+"""
+
+DAY = 86400
+HISTOGRAM_MIN_MS = 0.01
+HISTOGRAM_RATIO = 1.05 # Rollup histogram bins are 5% wide, which bounds the error of percentiles read from them
+DEFAULT_HISTORY_FILE_NAME = "diagnostic_history.db"
+
+
+def default_history_path(config_manager):
+    """History database path from [History] Path, defaulting to a file next to config.ini."""
+    path = config_manager.get_setting('History', 'Path')
+    if path:
+        return path
+    return os.path.join(os.path.dirname(config_manager.config_file_path), DEFAULT_HISTORY_FILE_NAME)
+
+
+def _latency_ms(result):
+    """Average RTT of a ping-like result in ms, from ``rtts`` or the "12ms" latency string."""
+    received = [rtt for rtt in result.get("rtts") or [] if rtt is not None]
+    if received:
+        return sum(received) / len(received)
+    try:
+        return float(str(result.get("latency", "")).rstrip("ms").lstrip("<"))
+    except ValueError:
+        return None
+
+
+def _percentile(ordered, percentile):
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return None
+    return ordered[max(0, math.ceil(percentile / 100 * len(ordered)) - 1)]
+
+
+def _histogram_bin(latency_ms):
+    """Log-scale bin of a latency: bin i holds (MIN * RATIO**(i-1), MIN * RATIO**i]."""
+    if latency_ms <= HISTOGRAM_MIN_MS:
+        return 0
+    return math.ceil(math.log(latency_ms / HISTOGRAM_MIN_MS) / math.log(HISTOGRAM_RATIO))
+
+
+def _histogram(latencies):
+    histogram = {}
+    for latency in latencies:
+        index = _histogram_bin(latency)
+        histogram[index] = histogram.get(index, 0) + 1
+    return histogram
+
+
+def _merge_histograms(histograms):
+    merged = {}
+    for histogram in histograms:
+        for index, count in histogram.items():
+            merged[index] = merged.get(index, 0) + count
+    return merged
+
+
+def _histogram_percentile(histogram, percentile, low, high):
+    """Nearest-rank percentile from a histogram: the upper edge of the bin holding that rank, clamped to [low, high]."""
+    rank = max(1, math.ceil(percentile / 100 * sum(histogram.values())))
+    seen = 0
+    for index in sorted(histogram):
+        seen += histogram[index]
+        if seen >= rank:
+            return min(max(HISTOGRAM_MIN_MS * HISTOGRAM_RATIO ** index, low), high)
+    return None
+
+
+def _load_histogram(text):
+    return {int(index): count for index, count in json.loads(text).items()} if text else None
+
+
+class HistoryStore:
+    """Local SQLite (WAL) history of every probe result, with batched writes.
+
+    ``record_result`` only appends to an in-memory batch; the batch is written in
+    a single transaction once it holds ``batch_size`` rows or ``flush_interval``
+    seconds have passed (checked by a background thread), and on close().
+    """
+
+    def __init__(self, path, batch_size=500, flush_interval=2.0):
+        self.path = path
+        self.batch_size = batch_size
+        self._pending = []
+        self._lock = threading.Lock()
+        self._connection = self._connect()
+        self._connection.executescript(SCHEMA)
+        if "histogram" not in {column[1] for column in self._connection.execute("PRAGMA table_info(rollups)")}:
+            self._connection.execute("ALTER TABLE rollups ADD COLUMN histogram TEXT") # Stores from before histograms
+        self._closed = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, args=(flush_interval,), name="history-flush", daemon=True)
+        self._flusher.start()
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, check_same_thread=False, timeout=10)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL") # Safe with WAL; fsync only at checkpoints
+        return connection
+
+    def record(self, test, target, success, latency_ms=None, rtts=None, hops=None, detail=None, ts=None):
+        row = (time.time() if ts is None else ts, target or "", test, int(bool(success)), latency_ms,
+               json.dumps(rtts) if rtts is not None else None,
+               json.dumps(hops, ensure_ascii=False) if hops is not None else None,
+               json.dumps(detail, ensure_ascii=False) if detail is not None else None)
+        with self._lock:
+            self._pending.append(row)
+            if len(self._pending) >= self.batch_size:
+                self._flush_locked()
+
+    def record_result(self, test, target, result, success, ts=None):
+        """Stores a probe result in whatever shape its probe returns (dict or tracert hop list)."""
+        if isinstance(result, list):
+            self.record(test, target, success, hops=result, ts=ts)
+        else:
+            detail = {key: value for key, value in result.items() if key != "rtts"}
+            self.record(test, target, success, latency_ms=_latency_ms(result), rtts=result.get("rtts"),
+                        detail=detail, ts=ts)
+
+    def _flush_locked(self):
+        if not self._pending:
+            return
+        rows, self._pending = self._pending, []
+        with self._connection:
+            self._connection.executemany(
+                "INSERT INTO probes (ts, target, test, success, latency_ms, rtts, hops, detail) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows)
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_loop(self, interval):
+        while not self._closed.wait(interval):
+            self.flush()
+
+    def close(self):
+        self._closed.set()
+        self._flusher.join()
+        with self._lock:
+            self._flush_locked()
+            self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def latency_summary(self, target, since, until=None, test=None, percentile=95):
+        """Latency statistics for ``target`` between two Unix timestamps.
+
+        Whole buckets compact() has already rolled up are answered from the
+        rollups, and only the partial buckets at either end of the window from raw
+        rows, so a week-long window reads a few hundred rollup rows however many
+        probes it holds. Counts, min, max and avg are exact; a percentile read from
+        rollup histograms may be up to 5% high. Windows without a whole rolled-up
+        bucket are computed exactly from raw rows, inside SQLite. A window edge
+        older than the raw retention only counts the whole buckets it covers.
+
+        Returns {"samples", "successes", "min", "avg", "max", "p<percentile>"} with
+        latencies in ms (None when no successful sample exists).
+        """
+        self.flush()
+        until = float("inf") if until is None else until
+        test_clause, test_params = (" AND test = ?", [test]) if test else ("", [])
+        with self._lock:
+            rolled_until, bucket_seconds = self._rollup_state()
+            first = math.ceil(since / bucket_seconds) * bucket_seconds
+            last = min(until, rolled_until)
+            last -= last % bucket_seconds
+            if last <= first:
+                return self._raw_summary(target, since, until, test_clause, test_params, percentile)
+            rollups = self._connection.execute(
+                "SELECT samples, successes, min_ms, avg_ms, max_ms, p95_ms, histogram FROM rollups "
+                f"WHERE target = ? AND bucket_start >= ? AND bucket_start < ?{test_clause}",
+                [target, first, last] + test_params).fetchall()
+            edges = []
+            for start, end in ((since, first), (last, until)):
+                edges += self._connection.execute(
+                    f"SELECT success, latency_ms FROM probes WHERE target = ? AND ts >= ? AND ts < ?{test_clause}",
+                    [target, start, end] + test_params).fetchall()
+
+        latencies = [latency for success, latency in edges if success and latency is not None]
+        histograms = [_histogram(latencies)]
+        minimums, maximums = latencies[:], latencies[:]
+        latency_count, latency_total = len(latencies), sum(latencies)
+        for _, successes, min_ms, avg_ms, max_ms, p95_ms, histogram in rollups:
+            if avg_ms is None:
+                continue
+            histogram = _load_histogram(histogram) or {_histogram_bin(p95_ms): successes} # Rolled up without a histogram
+            count = sum(histogram.values())
+            histograms.append(histogram)
+            minimums.append(min_ms)
+            maximums.append(max_ms)
+            latency_count += count
+            latency_total += avg_ms * count
+        low, high = (min(minimums), max(maximums)) if latency_count else (None, None)
+        return {
+            "samples": len(edges) + sum(row[0] for row in rollups),
+            "successes": sum(success for success, _ in edges) + sum(row[1] for row in rollups),
+            "min": low,
+            "avg": latency_total / latency_count if latency_count else None,
+            "max": high,
+            f"p{percentile}": _histogram_percentile(_merge_histograms(histograms), percentile, low, high)
+                              if latency_count else None,
+        }
+
+    def _raw_summary(self, target, since, until, test_clause, test_params, percentile):
+        """latency_summary over raw rows only: one aggregate scan of the covering index, then the percentile by rank."""
+        where = f"WHERE target = ? AND ts >= ? AND ts < ?{test_clause}"
+        params = [target, since, until] + test_params
+        samples, successes, latency_count, min_ms, avg_ms, max_ms = self._connection.execute(
+            "SELECT COUNT(*), COALESCE(SUM(success), 0), COUNT(CASE WHEN success THEN latency_ms END), "
+            "MIN(CASE WHEN success THEN latency_ms END), AVG(CASE WHEN success THEN latency_ms END), "
+            f"MAX(CASE WHEN success THEN latency_ms END) FROM probes {where}", params).fetchone()
+        percentile_ms = None
+        if latency_count:
+            rank = max(0, math.ceil(percentile / 100 * latency_count) - 1) # Nearest rank, as _percentile
+            # SQLite keeps only LIMIT + OFFSET rows while sorting, so count from whichever end is nearer
+            order, offset = ("DESC", latency_count - 1 - rank) if rank >= latency_count / 2 else ("ASC", rank)
+            percentile_ms = self._connection.execute(
+                f"SELECT latency_ms FROM probes {where} AND success = 1 AND latency_ms IS NOT NULL "
+                f"ORDER BY latency_ms {order} LIMIT 1 OFFSET ?", params + [offset]).fetchone()[0]
+        return {"samples": samples, "successes": successes, "min": min_ms, "avg": avg_ms, "max": max_ms,
+                f"p{percentile}": percentile_ms}
+
+    def _rollup_state(self):
+        """(rolled_until, bucket_seconds) of the last compact(), or (0, one hour) before the first."""
+        row = self._connection.execute("SELECT rolled_until, bucket_seconds FROM rollup_state").fetchone()
+        return row or (0.0, 3600.0)
+
+    def query(self, target, since, until=None, test=None, limit=1000):
+        """Returns raw probe rows for ``target`` in time order as dicts."""
+        self.flush()
+        query = "SELECT ts, test, success, latency_ms, rtts, hops, detail FROM probes WHERE target = ? AND ts >= ? AND ts < ?"
+        params = [target, since, until if until is not None else float("inf")]
+        if test:
+            query += " AND test = ?"
+            params.append(test)
+        query += " ORDER BY ts LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._connection.execute(query, params).fetchall()
+        return [{"ts": ts, "test": row_test, "success": bool(success), "latency_ms": latency_ms,
+                 "rtts": json.loads(rtts) if rtts else None, "hops": json.loads(hops) if hops else None,
+                 "detail": json.loads(detail) if detail else None}
+                for ts, row_test, success, latency_ms, rtts, hops, detail in rows]
+
+    def rollups(self, target, since, until=None, test=None):
+        """Returns downsampled buckets (from compact()) for ``target`` in time order."""
+        query = ("SELECT test, bucket_start, samples, successes, min_ms, avg_ms, max_ms, p95_ms FROM rollups "
+                 "WHERE target = ? AND bucket_start >= ? AND bucket_start < ?")
+        params = [target, since, until if until is not None else float("inf")]
+        if test:
+            query += " AND test = ?"
+            params.append(test)
+        with self._lock:
+            rows = self._connection.execute(query + " ORDER BY bucket_start", params).fetchall()
+        keys = ("test", "bucket_start", "samples", "successes", "min", "avg", "max", "p95")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def compact(self, raw_retention_days=7, bucket_seconds=3600, rollup_retention_days=365, now=None):
+        """Brings the rollups up to date and applies the retention policy.
+
+        Raw rows of every ``bucket_seconds`` bucket that ended since the last call
+        are downsampled into rollups (count, successes, min/avg/max/p95 and a
+        latency histogram), so the rollups cover all history but the current
+        bucket. Raw rows older than ``raw_retention_days`` are then deleted and
+        rollups older than ``rollup_retention_days`` dropped. Returns the number of
+        raw rows deleted.
+        """
+        now = time.time() if now is None else now
+        raw_cutoff = now - raw_retention_days * DAY
+        self.flush()
+        with self._lock, self._connection:
+            rolled_until, _ = self._rollup_state()
+            # Rows about to be deleted are rolled up even when their bucket has not ended yet
+            roll_until = max(now - now % bucket_seconds, raw_cutoff)
+            buckets = {}
+            cursor = self._connection.execute(
+                "SELECT target, test, ts, success, latency_ms FROM probes WHERE ts >= ? AND ts < ?",
+                (rolled_until, roll_until))
+            for target, test, ts, success, latency_ms in cursor:
+                bucket = buckets.setdefault((target, test, ts - ts % bucket_seconds), [0, 0, []])
+                bucket[0] += 1
+                bucket[1] += success
+                if success and latency_ms is not None:
+                    bucket[2].append(latency_ms)
+            for (target, test, bucket_start), (samples, successes, latencies) in buckets.items():
+                latencies.sort()
+                existing = self._connection.execute(
+                    "SELECT samples, successes, min_ms, avg_ms, max_ms, p95_ms, histogram FROM rollups "
+                    "WHERE target = ? AND test = ? AND bucket_start = ?", (target, test, bucket_start)).fetchone()
+                row = [samples, successes, latencies[0] if latencies else None,
+                       sum(latencies) / len(latencies) if latencies else None,
+                       latencies[-1] if latencies else None, _percentile(latencies, 95), _histogram(latencies)]
+                if existing:
+                    row = self._merge_rollup(list(existing[:-1]) + [_load_histogram(existing[-1])], row)
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO rollups VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (target, test, bucket_start, *row[:-1], json.dumps(row[-1]) if row[-1] is not None else None))
+            self._connection.execute("INSERT OR REPLACE INTO rollup_state VALUES (1, ?, ?)",
+                                     (max(rolled_until, roll_until), bucket_seconds))
+            deleted = self._connection.execute("DELETE FROM probes WHERE ts < ?", (raw_cutoff,)).rowcount
+            self._connection.execute("DELETE FROM rollups WHERE bucket_start < ?", (now - rollup_retention_days * DAY,))
+        return deleted
+
+    @staticmethod
+    def _merge_rollup(existing, new):
+        samples, successes, min_ms, avg_ms, max_ms, p95_ms, histogram = existing
+        _, _, new_min, new_avg, new_max, new_p95, new_histogram = new
+        counts = [samples + new[0], successes + new[1]]
+        if new_avg is None:
+            return counts + [min_ms, avg_ms, max_ms, p95_ms, histogram]
+        if avg_ms is None:
+            return counts + [new_min, new_avg, new_max, new_p95, new_histogram]
+        merged_min, merged_max = min(min_ms, new_min), max(max_ms, new_max)
+        new_count = sum(new_histogram.values())
+        if histogram is None:
+            # Rolled up before histograms were kept: the success count approximates its latency count, p95 keeps the worse one
+            merged_avg = (avg_ms * successes + new_avg * new_count) / (successes + new_count)
+            return counts + [merged_min, merged_avg, merged_max, max(p95_ms, new_p95), None]
+        count = sum(histogram.values())
+        merged = _merge_histograms((histogram, new_histogram))
+        return counts + [merged_min, (avg_ms * count + new_avg * new_count) / (count + new_count), merged_max,
+                         _histogram_percentile(merged, 95, merged_min, merged_max), merged]
@@ -0,0 +1,193 @@
+import http.client
+import socket
+import ssl
+import threading
+import time
+from urllib.parse import urlsplit
+from cancellation import is_cancelled, on_cancel
+
+
+def _ms(start, end):
+    return (end - start) * 1000
+
+
+def _resolve(host, port):
+    """Resolves host once; returns (address, family, dns_ms)."""
+    started = time.perf_counter()
+    family, _, _, _, address = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)[0]
+    return address, family, _ms(started, time.perf_counter())
+
+
+def tcp_connect_probe(host, port=443, count=3, timeout=1000):
+    """Measures TCP handshake time to host:port, for networks that filter ICMP.
+
+    Returns a ping_host-like dict with ``connect_times`` (ms per attempt, None if
+    it failed) and the one-off ``dns_ms`` spent resolving the host.
+    """
+    result = {"success": False, "latency": "N/A", "error": "", "dns_ms": None, "connect_times": []}
+    try:
+        address, family, result["dns_ms"] = _resolve(host, port)
+    except (socket.gaierror, UnicodeError):
+        result["error"] = "無法找到主機"
+        return result
+
+    errors = []
+    for _ in range(count):
+        if is_cancelled():
+            break
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.settimeout(timeout / 1000)
+        started = time.perf_counter()
+        try:
+            sock.connect(address)
+            result["connect_times"].append(_ms(started, time.perf_counter()))
+        except OSError as e:
+            result["connect_times"].append(None)
+            errors.append("連線逾時" if isinstance(e, socket.timeout) else str(e))
+        finally:
+            sock.close()
+
+    connected = [elapsed for elapsed in result["connect_times"] if elapsed is not None]
+    if connected:
+        result["success"] = True
+        result["latency"] = f"{sum(connected) / len(connected):.3f}ms"
+    else:
+        result["error"] = errors[0] if errors else "已取消"
+    return result
+
+
+class HttpConnectionPool:
+    """Keeps idle keep-alive connections per (scheme, host, port) for reuse across requests."""
+
+    def __init__(self, max_idle_per_host=4):
+        self.max_idle_per_host = max_idle_per_host
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, key):
+        with self._lock:
+            connections = self._idle.get(key)
+            return connections.pop() if connections else None
+
+    def release(self, key, connection):
+        with self._lock:
+            connections = self._idle.setdefault(key, [])
+            if len(connections) < self.max_idle_per_host:
+                connections.append(connection)
+                return
+        connection.close()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for connection in connections:
+                connection.close()
+
+
+def _shutdown(connection):
+    """Unblocks a request in progress on another thread (close() alone does not wake a blocked recv)."""
+    try:
+        connection.sock.shutdown(socket.SHUT_RDWR)
+    except (AttributeError, OSError):
+        pass
+
+
+def _open_connection(scheme, host, port, timeout, ssl_context):
+    """Opens a connection step by step so DNS, TCP connect and TLS handshake are timed separately."""
+    timings = {}
+    address, family, timings["dns"] = _resolve(host, port)
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    # Small request writes must not sit in Nagle's buffer waiting for a delayed ACK
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    started = time.perf_counter()
+    try:
+        sock.connect(address)
+        timings["connect"] = _ms(started, time.perf_counter())
+        if scheme == "https":
+            started = time.perf_counter()
+            sock = ssl_context.wrap_socket(sock, server_hostname=host)
+            timings["tls"] = _ms(started, time.perf_counter())
+        else:
+            timings["tls"] = None
+    except BaseException:
+        sock.close()
+        raise
+    connection_class = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+    connection = connection_class(host, port, timeout=timeout)
+    connection.sock = sock # Already connected, so http.client skips its own connect()
+    return connection, timings
+
+
+def http_probe(url, samples=3, reuse=True, timeout=5000, pool=None, ssl_context=None):
+    """Times HTTP(S) GET requests broken down into DNS, connect, TLS and time-to-first-byte.
+
+    The first sample always opens a new connection (cold cost). With ``reuse``,
+    later samples take keep-alive connections from ``pool`` so they measure
+    steady-state request latency; reused samples report dns/connect/tls as None.
+    Returns a ping_host-like dict whose ``latency`` is the average TTFB and whose
+    ``samples`` list holds per-request timings in ms.
+    """
+    result = {"success": False, "latency": "N/A", "error": "", "status": None, "samples": []}
+    parts = urlsplit(url if "://" in url else f"http://{url}")
+    scheme = parts.scheme.lower()
+    if scheme not in ("http", "https") or not parts.hostname:
+        result["error"] = f"不支援的網址: {url}"
+        return result
+    host = parts.hostname
+    port = parts.port or (443 if scheme == "https" else 80)
+    path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+    key = (scheme, host, port)
+    own_pool = pool is None
+    pool = pool or HttpConnectionPool()
+    ssl_context = ssl_context or ssl.create_default_context()
+
+    try:
+        for index in range(samples):
+            if is_cancelled():
+                break
+            connection = pool.acquire(key) if reuse and index else None
+            timing = {"dns": None, "connect": None, "tls": None, "reused": connection is not None}
+            request_started = time.perf_counter()
+            try:
+                if connection is None:
+                    connection, opened = _open_connection(scheme, host, port, timeout / 1000, ssl_context)
+                    timing.update(opened)
+                with on_cancel(lambda: _shutdown(connection)):
+                    started = time.perf_counter()
+                    connection.request("GET", path, headers={"User-Agent": "network-diagnostic-tool"})
+                    response = connection.getresponse() # Returns once the status line and headers arrived
+                    timing["ttfb"] = _ms(started, time.perf_counter())
+                    response.read()
+                    finished = time.perf_counter()
+                timing["transfer"] = _ms(started, finished)
+                timing["total"] = _ms(request_started, finished)
+                timing["status"] = response.status
+                result["status"] = response.status
+            except (OSError, http.client.HTTPException, ssl.SSLError) as e:
+                if connection:
+                    connection.close()
+                timing["error"] = "連線逾時" if isinstance(e, socket.timeout) else (str(e) or type(e).__name__)
+                if isinstance(e, socket.gaierror):
+                    timing["error"] = "無法找到主機"
+                result["samples"].append(timing)
+                continue
+            result["samples"].append(timing)
+            if reuse and not response.will_close:
+                pool.release(key, connection)
+            else:
+                connection.close()
+    finally:
+        if own_pool:
+            pool.close()
+
+    answered = [sample["ttfb"] for sample in result["samples"] if "ttfb" in sample]
+    if answered:
+        result["success"] = result["status"] < 500
+        result["latency"] = f"{sum(answered) / len(answered):.3f}ms"
+        if not result["success"]:
+            result["error"] = f"HTTP {result['status']}"
+    else:
+        result["error"] = next(sample["error"] for sample in result["samples"]) if result["samples"] else "沒有任何回應"
+    return result
@@ -0,0 +1,333 @@
+import ipaddress
+import math
+import os
+import select
+import socket
+import struct
+import threading
+import time
+from cancellation import current_token, on_cancel
+
+ICMP_ECHO_REPLY = 0
+ICMP_DEST_UNREACHABLE = 3
+ICMP_ECHO_REQUEST = 8
+ICMP_TIME_EXCEEDED = 11
+ICMPV6_DEST_UNREACHABLE = 1
+ICMPV6_TIME_EXCEEDED = 3
+ICMPV6_ECHO_REQUEST = 128
+ICMPV6_ECHO_REPLY = 129
+
+_PAYLOAD = bytes(range(56)) # Same payload size as the ping binary
+
+MIN_CONFIDENT_REPLIES = 3 # Adaptive ping never stops early on fewer replies than this
+CONFIDENCE_TOLERANCE = 0.1 # ...and only once the standard error of the mean RTT is within 10% of it
+
+
+def _address_key(address):
+    """Canonical form of an address, so a reply's sender compares equal to the address pinged."""
+    try:
+        return ipaddress.ip_address(address.partition("%")[0]).compressed
+    except ValueError:
+        return address
+
+
+def icmp_checksum(data):
+    """Standard Internet checksum (RFC 1071) over an ICMP message."""
+    if len(data) % 2:
+        data += b"\x00"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+class EchoRequest:
+    """One outstanding echo request; ``rtt`` is set in milliseconds once answered."""
+
+    __slots__ = ("seq", "address", "key", "sent_at", "rtt", "error", "_event")
+
+    def __init__(self, seq, address, event=None):
+        self.seq = seq
+        self.address = address
+        self.key = (_address_key(address), seq)
+        self.sent_at = None
+        self.rtt = None
+        self.error = ""
+        self._event = event or threading.Event()
+
+    def wait(self, timeout):
+        """Waits for the reply until ``timeout`` seconds after the request was sent."""
+        remaining = self.sent_at + timeout - time.perf_counter()
+        if remaining > 0:
+            self._event.wait(remaining)
+        return self.rtt
+
+
+class RttEstimator:
+    """Smoothed RTT and RTT variation of one target (Jacobson/Karels, as in RFC 6298), in ms.
+
+    ``timeout(limit)`` is SRTT + 4 * RTTVAR, doubled for every loss since the last
+    reply (Karn's backoff) and clamped between ``min_timeout`` and ``limit``.
+    Without any sample yet it is ``limit`` itself.
+    """
+
+    ALPHA = 1 / 8
+    BETA = 1 / 4
+    K = 4
+
+    def __init__(self, min_timeout=50.0):
+        self.min_timeout = min_timeout
+        self.srtt = None
+        self.rttvar = None
+        self._backoff = 1
+        self._lock = threading.Lock()
+
+    def update(self, rtt):
+        with self._lock:
+            if self.srtt is None:
+                self.srtt, self.rttvar = rtt, rtt / 2
+            else:
+                self.rttvar = (1 - self.BETA) * self.rttvar + self.BETA * abs(self.srtt - rtt)
+                self.srtt = (1 - self.ALPHA) * self.srtt + self.ALPHA * rtt
+            self._backoff = 1
+
+    def backoff(self):
+        with self._lock:
+            self._backoff = min(self._backoff * 2, 64)
+
+    def timeout(self, limit):
+        with self._lock:
+            if self.srtt is None:
+                return limit
+            return min(max((self.srtt + self.K * self.rttvar) * self._backoff, self.min_timeout), limit)
+
+
+def _rtt_confident(rtts):
+    """True once the mean of ``rtts`` is known to within CONFIDENCE_TOLERANCE (standard error)."""
+    if len(rtts) < MIN_CONFIDENT_REPLIES:
+        return False
+    mean = sum(rtts) / len(rtts)
+    variance = sum((rtt - mean) ** 2 for rtt in rtts) / (len(rtts) - 1)
+    return math.sqrt(variance / len(rtts)) <= max(CONFIDENCE_TOLERANCE * mean, 0.1)
+
+
+class IcmpEngine:
+    """In-process ICMP echo engine multiplexing many requests over a single socket.
+
+    On Linux an unprivileged ``SOCK_DGRAM/IPPROTO_ICMP`` socket is used (the kernel
+    assigns the echo identifier); otherwise a raw socket is opened, which needs
+    administrator/root rights. Replies are matched by sender address and
+    identifier/sequence on a background receiver thread, so a late reply from
+    one target cannot answer a request to another that reused its sequence
+    number, and timed with ``time.perf_counter``.
+    """
+
+    def __init__(self, family=socket.AF_INET):
+        self.family = family
+        self.proto = socket.IPPROTO_ICMP if family == socket.AF_INET else socket.IPPROTO_ICMPV6
+        self.echo_request = ICMP_ECHO_REQUEST if family == socket.AF_INET else ICMPV6_ECHO_REQUEST
+        self.echo_reply = ICMP_ECHO_REPLY if family == socket.AF_INET else ICMPV6_ECHO_REPLY
+        self.dest_unreachable = ICMP_DEST_UNREACHABLE if family == socket.AF_INET else ICMPV6_DEST_UNREACHABLE
+        self.sock, self.raw = self._open_socket()
+        self.identifier = os.getpid() & 0xFFFF
+        self._seq = 0
+        self._pending = {} # (address, seq) -> EchoRequest
+        self._lock = threading.Lock()
+        self._closed = False
+        self._receiver = threading.Thread(target=self._receive_loop, name="icmp-receiver", daemon=True)
+        self._receiver.start()
+
+    def _open_socket(self):
+        try:
+            return socket.socket(self.family, socket.SOCK_DGRAM, self.proto), False
+        except OSError:
+            # Unprivileged ICMP not allowed (or not Linux): fall back to a raw socket
+            return socket.socket(self.family, socket.SOCK_RAW, self.proto), True
+
+    def _next_seq(self):
+        with self._lock:
+            self._seq = (self._seq + 1) & 0xFFFF
+            return self._seq
+
+    def send_echo(self, address, event=None):
+        """Sends one echo request to an already resolved address and returns its EchoRequest.
+
+        ``event``, if given, is set when the request is answered or fails, so one
+        event can be shared by several requests.
+        """
+        seq = self._next_seq()
+        request = EchoRequest(seq, address, event)
+        header = struct.pack("!BBHHH", self.echo_request, 0, 0, self.identifier, seq)
+        checksum = icmp_checksum(header + _PAYLOAD) if self.family == socket.AF_INET else 0
+        packet = struct.pack("!BBHHH", self.echo_request, 0, checksum, self.identifier, seq) + _PAYLOAD
+        with self._lock:
+            self._pending[request.key] = request
+        request.sent_at = time.perf_counter()
+        try:
+            self.sock.sendto(packet, (address, 0))
+        except OSError as e:
+            request.error = str(e)
+            self._finish(request.key)
+        return request
+
+    def ping(self, address, count=4, timeout=1000, interval=0.2):
+        """Sends ``count`` echo requests and returns per-packet RTTs in ms (None for lost packets).
+
+        If the current task is cancelled, no further requests are sent and the
+        outstanding ones stop waiting at once.
+        """
+        token = current_token()
+        requests = []
+
+        def _abort():
+            for request in list(requests):
+                self._finish(request.key)
+
+        with on_cancel(_abort):
+            for i in range(count):
+                if token is not None and (token.cancelled or (i and interval and token.wait(interval))):
+                    break
+                if token is None and i and interval:
+                    time.sleep(interval)
+                requests.append(self.send_echo(address))
+            rtts = [request.wait(timeout / 1000) for request in requests]
+        for request in requests:
+            self._finish(request.key)
+        errors = [request.error for request in requests if request.error]
+        if token is not None and token.cancelled:
+            errors.insert(0, token.reason)
+        return rtts, (errors[0] if errors else "")
+
+    def ping_adaptive(self, address, count=4, max_count=8, timeout=1000, estimator=None, interval=0.05):
+        """Pings until ``count`` replies arrived or the RTT is already pinned down; returns (rtts, error) like ping().
+
+        A request counts as lost once ``estimator``'s timeout has passed rather
+        than the full ``timeout`` (ms), which stays the upper bound, and each lost
+        request is replaced by another one up to ``max_count`` in total, so only
+        lossy targets get extra probes. A target that answers none of the first
+        ``count`` requests is given up on. Sending stops early once
+        MIN_CONFIDENT_REPLIES replies agree within CONFIDENCE_TOLERANCE. Replies
+        that arrive after their request counted as lost still appear in ``rtts``.
+        """
+        estimator = estimator or RttEstimator()
+        token = current_token()
+        progress = threading.Event() # Set on every reply, failure or cancellation
+        requests = []
+        outstanding = {} # seq -> (request, time after which it counts as lost)
+        replies = []
+        next_send = time.perf_counter()
+
+        with on_cancel(progress.set):
+            while token is None or not token.cancelled:
+                progress.clear()
+                now = time.perf_counter()
+                for seq, (request, lost_at) in list(outstanding.items()):
+                    if request.rtt is not None:
+                        del outstanding[seq]
+                        replies.append(request.rtt)
+                        estimator.update(request.rtt)
+                    elif request.error or now >= lost_at:
+                        del outstanding[seq]
+                        estimator.backoff()
+                if len(replies) >= count or _rtt_confident(replies):
+                    break
+
+                # Lost requests are only replaced once the target has answered at all
+                can_send = (len(requests) < (max_count if replies else count)
+                            and len(replies) + len(outstanding) < count)
+                if can_send and now >= next_send:
+                    request = self.send_echo(address, progress)
+                    requests.append(request)
+                    outstanding[request.seq] = (request, request.sent_at + estimator.timeout(timeout) / 1000)
+                    next_send = request.sent_at + interval
+                    continue
+                if not outstanding and not can_send:
+                    break
+                wake_at = min([lost_at for _, lost_at in outstanding.values()] + ([next_send] if can_send else []))
+                progress.wait(max(0.0, wake_at - now))
+
+        for request in requests:
+            self._finish(request.key)
+        rtts = [request.rtt for request in requests]
+        errors = [request.error for request in requests if request.error]
+        if token is not None and token.cancelled:
+            errors.insert(0, token.reason)
+        return rtts, (errors[0] if errors else "")
+
+    def _finish(self, key):
+        with self._lock:
+            request = self._pending.pop(key, None)
+        if request:
+            request._event.set()
+        return request
+
+    def _receive_loop(self):
+        while not self._closed:
+            try:
+                readable, _, _ = select.select([self.sock], [], [], 0.5)
+                if not readable:
+                    continue
+                data, sender = self.sock.recvfrom(2048)
+                received_at = time.perf_counter()
+            except OSError:
+                if self._closed:
+                    return
+                continue
+            self._handle_packet(data, sender[0], received_at)
+
+    def _handle_packet(self, data, sender, received_at):
+        if self.raw and self.family == socket.AF_INET:
+            data = data[(data[0] & 0x0F) * 4:] # Strip the IPv4 header raw sockets deliver
+        if len(data) < 8:
+            return
+        icmp_type, _, _, identifier, seq = struct.unpack("!BBHHH", data[:8])
+        if icmp_type == self.echo_reply:
+            # Datagram sockets only see their own replies; the kernel rewrites the identifier
+            if self.raw and identifier != self.identifier:
+                return
+            with self._lock:
+                request = self._pending.get((_address_key(sender), seq))
+            if request and request.rtt is None:
+                request.rtt = (received_at - request.sent_at) * 1000
+                request._event.set()
+        elif self.raw and icmp_type == self.dest_unreachable:
+            # The quoted original datagram carries our echo header; it comes from a router, so match
+            # on the quoted destination rather than the sender
+            inner = data[8:]
+            if self.family == socket.AF_INET and len(inner) >= 20:
+                destination = socket.inet_ntop(socket.AF_INET, inner[16:20])
+                inner = inner[(inner[0] & 0x0F) * 4:]
+            elif self.family == socket.AF_INET6 and len(inner) >= 40:
+                destination = socket.inet_ntop(socket.AF_INET6, inner[24:40])
+                inner = inner[40:]
+            else:
+                return
+            if len(inner) >= 8:
+                _, _, _, identifier, seq = struct.unpack("!BBHHH", inner[:8])
+                if identifier == self.identifier:
+                    key = (_address_key(destination), seq)
+                    with self._lock:
+                        request = self._pending.get(key)
+                    if request:
+                        request.error = "目的地主機無法連線"
+                        self._finish(key)
+
+    def close(self):
+        self._closed = True
+        self.sock.close()
+
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def get_engine(family=socket.AF_INET):
+    """Returns the shared engine for ``family``, or None if ICMP sockets are not permitted."""
+    with _engines_lock:
+        if family not in _engines:
+            try:
+                _engines[family] = IcmpEngine(family)
+            except OSError as e:
+                print(f"ICMP socket unavailable, falling back to the ping command: {e}")
+                _engines[family] = None
+        return _engines[family]
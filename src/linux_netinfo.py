@@ -0,0 +1,215 @@
+import os
+import socket
+import struct
+import threading
+
+# rtnetlink constants (linux/rtnetlink.h, linux/if_addr.h, linux/if_link.h)
+NLMSG_ERROR = 2
+NLMSG_DONE = 3
+NLM_F_REQUEST = 0x01
+NLM_F_DUMP = 0x300
+RTM_NEWLINK = 16
+RTM_GETLINK = 18
+RTM_NEWADDR = 20
+RTM_GETADDR = 22
+IFA_ADDRESS = 1
+IFA_LOCAL = 2
+IFLA_IFNAME = 3
+IFF_UP = 0x1
+IFF_LOOPBACK = 0x8
+IFF_RUNNING = 0x40
+RTMGRP_LINK = 0x1
+RTMGRP_IPV4_IFADDR = 0x10
+RTMGRP_IPV4_ROUTE = 0x40
+
+_NLMSGHDR = struct.Struct("=IHHII")
+_RTATTR = struct.Struct("=HH")
+_IFINFOMSG = struct.Struct("=BxHiII")
+_IFADDRMSG = struct.Struct("=BBBBI")
+
+PROC_ROUTE_PATH = "/proc/net/route"
+RESOLV_CONF_PATH = "/etc/resolv.conf"
+SYS_NET_PATH = "/sys/class/net"
+
+
+def _align(length):
+    return (length + 3) & ~3
+
+
+def _parse_attributes(data, offset):
+    attributes = {}
+    while offset + _RTATTR.size <= len(data):
+        length, attr_type = _RTATTR.unpack_from(data, offset)
+        if length < _RTATTR.size:
+            break
+        attributes.setdefault(attr_type, data[offset + _RTATTR.size:offset + length])
+        offset += _align(length)
+    return attributes
+
+
+def _netlink_dump(msg_type, body):
+    """Sends an rtnetlink dump request and returns the (type, payload) of every reply message."""
+    messages = []
+    with socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE) as sock:
+        request = _NLMSGHDR.pack(_NLMSGHDR.size + len(body), msg_type, NLM_F_REQUEST | NLM_F_DUMP, 1, 0) + body
+        sock.sendto(request, (0, 0))
+        while True:
+            data = sock.recv(65536)
+            offset = 0
+            while offset + _NLMSGHDR.size <= len(data):
+                length, reply_type, _, _, _ = _NLMSGHDR.unpack_from(data, offset)
+                if reply_type == NLMSG_DONE:
+                    return messages
+                if reply_type == NLMSG_ERROR:
+                    raise OSError("netlink dump request failed")
+                messages.append((reply_type, data[offset + _NLMSGHDR.size:offset + length]))
+                offset += _align(length)
+
+
+def _read_links():
+    links = {}
+    for reply_type, payload in _netlink_dump(RTM_GETLINK, _IFINFOMSG.pack(socket.AF_UNSPEC, 0, 0, 0, 0)):
+        if reply_type != RTM_NEWLINK:
+            continue
+        _, _, index, flags, _ = _IFINFOMSG.unpack_from(payload)
+        attributes = _parse_attributes(payload, _IFINFOMSG.size)
+        name = attributes.get(IFLA_IFNAME, b"").rstrip(b"\x00").decode(errors="replace")
+        links[index] = {"name": name, "flags": flags}
+    return links
+
+
+def _read_ipv4_addresses():
+    addresses = {}
+    for reply_type, payload in _netlink_dump(RTM_GETADDR, _IFADDRMSG.pack(socket.AF_INET, 0, 0, 0, 0)):
+        if reply_type != RTM_NEWADDR:
+            continue
+        family, prefix_len, _, _, index = _IFADDRMSG.unpack_from(payload)
+        if family != socket.AF_INET:
+            continue
+        attributes = _parse_attributes(payload, _IFADDRMSG.size)
+        raw_address = attributes.get(IFA_LOCAL) or attributes.get(IFA_ADDRESS)
+        if raw_address and index not in addresses:
+            mask = (0xFFFFFFFF << (32 - prefix_len)) & 0xFFFFFFFF
+            addresses[index] = (socket.inet_ntoa(raw_address), socket.inet_ntoa(struct.pack("!I", mask)))
+    return addresses
+
+
+def _read_default_route():
+    """Returns (interface, gateway) of the lowest-metric default route from /proc/net/route."""
+    best = None
+    try:
+        with open(PROC_ROUTE_PATH, encoding="ascii") as route_file:
+            next(route_file, None) # Header line
+            for line in route_file:
+                fields = line.split()
+                if len(fields) < 8 or fields[1] != "00000000" or fields[7] != "00000000":
+                    continue
+                if not int(fields[3], 16) & 0x2: # RTF_GATEWAY
+                    continue
+                gateway = socket.inet_ntoa(struct.pack("<I", int(fields[2], 16)))
+                metric = int(fields[6])
+                if best is None or metric < best[0]:
+                    best = (metric, fields[0], gateway)
+    except OSError:
+        return None, None
+    return (best[1], best[2]) if best else (None, None)
+
+
+def _read_dns_servers():
+    servers = []
+    try:
+        with open(RESOLV_CONF_PATH, encoding="utf-8", errors="replace") as resolv_file:
+            for line in resolv_file:
+                fields = line.split()
+                if len(fields) >= 2 and fields[0] == "nameserver":
+                    servers.append(fields[1])
+    except OSError:
+        pass
+    return servers
+
+
+def read_network_info():
+    """Reads primary adapter info from netlink, /proc/net/route and /etc/resolv.conf without spawning processes."""
+    info = {
+        "ip_address": "N/A",
+        "subnet_mask": "N/A",
+        "default_gateway": "N/A",
+        "dns_servers": [],
+        "adapter_name": "N/A",
+        "connection_type": "N/A",
+        "status": "Disconnected"
+    }
+    links = _read_links()
+    addresses = _read_ipv4_addresses()
+    route_interface, gateway = _read_default_route()
+
+    # Prefer the adapter carrying the default route, then any non-loopback adapter with IPv4
+    candidates = sorted(
+        (index for index, link in links.items() if not link["flags"] & IFF_LOOPBACK and index in addresses),
+        key=lambda index: (links[index]["name"] != route_interface, index))
+    if candidates:
+        index = candidates[0]
+        link = links[index]
+        info["adapter_name"] = link["name"]
+        info["ip_address"], info["subnet_mask"] = addresses[index]
+        if link["name"] == route_interface:
+            info["default_gateway"] = gateway
+        wireless = os.path.exists(os.path.join(SYS_NET_PATH, link["name"], "wireless"))
+        info["connection_type"] = "無線" if wireless else "有線"
+        if link["flags"] & IFF_UP and link["flags"] & IFF_RUNNING:
+            info["status"] = "已連線"
+    info["dns_servers"] = _read_dns_servers()
+    return info
+
+
+class NetworkInfoCache:
+    """Caches read_network_info() until rtnetlink reports a link, address or route change.
+
+    A non-blocking netlink socket subscribed to the change groups is drained on
+    each get(); only when it holds an event (or /etc/resolv.conf's mtime moved)
+    is the information re-read, so repeated calls cost a syscall or two.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._info = None
+        self._resolv_mtime = None
+        self._events = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE)
+        self._events.bind((0, RTMGRP_LINK | RTMGRP_IPV4_IFADDR | RTMGRP_IPV4_ROUTE))
+        self._events.setblocking(False)
+
+    def _drain_events(self):
+        changed = False
+        while True:
+            try:
+                if not self._events.recv(65536):
+                    break
+                changed = True
+            except BlockingIOError:
+                break
+            except OSError:
+                # Receive buffer overran (ENOBUFS): events were lost, so treat it as a change
+                changed = True
+                break
+        return changed
+
+    def _resolv_conf_mtime(self):
+        try:
+            return os.stat(RESOLV_CONF_PATH).st_mtime_ns
+        except OSError:
+            return None
+
+    def invalidate(self):
+        with self._lock:
+            self._info = None
+
+    def get(self):
+        with self._lock:
+            changed = self._drain_events()
+            resolv_mtime = self._resolv_conf_mtime()
+            if self._info is None or changed or resolv_mtime != self._resolv_mtime:
+                self._info = read_network_info()
+                self._resolv_mtime = resolv_mtime
+            info = dict(self._info)
+        info["dns_servers"] = list(info["dns_servers"])
+        return info
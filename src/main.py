@@ -1,102 +1,128 @@
+"""GUI entry point.
+
+Startup is kept short: only the Qt widgets, config.ini and the results model
+are loaded before the window first paints. The history database, caches,
+metrics endpoint and config watcher are opened right after that paint. The
+diagnostics modules are imported and the network info is prefetched on a
+background thread meanwhile, so both are ready by the time "開始診斷" is
+clicked. The settings dialog is only imported when it is opened.
+``python src/main.py --profile-startup`` prints where startup time goes and exits.
+"""
 import sys
-from PySide6.QtWidgets import QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, QWidget, QLabel, QPushButton, QDialog, QScrollArea, QGroupBox, QFormLayout, QTextEdit
-from PySide6.QtCore import Qt, QThread, Signal
-from config_manager import ConfigurationManager
-from settings_window import SettingsWindow
-from network_diagnostics import get_network_info, ping_host, tracert_host
-
-class DiagnosticWorker(QThread):
-    # Signals to communicate with the main thread
-    info_update = Signal(str)
-    result_update = Signal(str)
-    finished = Signal()
-
-    def __init__(self, config_manager: ConfigurationManager, parent=None):
-        super().__init__(parent)
-        self.config_manager = config_manager
-
-    def run(self):
-        self.result_update.emit("診斷開始...<br>")
-        self.info_update.emit("正在獲取網路資訊...")
-        net_info = get_network_info()
-        self.result_update.emit(f"--- 網路資訊 ---<br>")
-        self.result_update.emit(f"介面卡名稱: {net_info.get('adapter_name')}<br>")
-        self.result_update.emit(f"連線狀態: {net_info.get('status')}<br>")
-        self.result_update.emit(f"連線類型: {net_info.get('connection_type')}<br>")
-        self.result_update.emit(f"IP 位址: {net_info.get('ip_address')}<br>")
-        self.result_update.emit(f"子網路遮罩: {net_info.get('subnet_mask')}<br>")
-        self.result_update.emit(f"預設閘道: {net_info.get('default_gateway')}<br>")
-        self.result_update.emit(f"DNS 伺服器: {', '.join(net_info.get('dns_servers'))}<br><br>")
-
-        # Get settings for tests
-        gateway_ip = self.config_manager.get_setting('NetworkSettings', 'GatewayIP')
-        internal_server_ip = self.config_manager.get_setting('NetworkSettings', 'InternalServerIP')
-        test_website = self.config_manager.get_setting('NetworkSettings', 'TestWebsite')
-        ping_count = int(self.config_manager.get_setting('TestParameters', 'PingCount'))
-        ping_timeout = int(self.config_manager.get_setting('TestParameters', 'PingTimeout'))
-        tracert_max_hops = int(self.config_manager.get_setting('TestParameters', 'TracertMaxHops'))
-
-        # --- Test 1: Ping Gateway ---
-        self.info_update.emit(f"正在 Ping 預設閘道 ({gateway_ip})...")
-        ping_gw_result = ping_host(gateway_ip, count=ping_count, timeout=ping_timeout)
-        self.result_update.emit(f"--- Ping 預設閘道 ({gateway_ip}) ---<br>")
-        if ping_gw_result["success"]:
-            self.result_update.emit(f"<font color=\"green\">成功！</font>延遲: {ping_gw_result['latency']}。連接對外出口正常。<br><br>")
-        else:
-            self.result_update.emit(f"<font color=\"red\">失敗！</font>錯誤: {ping_gw_result['error']}。可能無法連接到路由器或內部網路。<br><br>")
-
-        # --- Test 2: Ping Internal Server ---
-        self.info_update.emit(f"正在 Ping 校內測試伺服器 ({internal_server_ip})...")
-        ping_internal_result = ping_host(internal_server_ip, count=ping_count, timeout=ping_timeout)
-        self.result_update.emit(f"--- Ping 校內測試伺服器 ({internal_server_ip}) ---<br>")
-        if ping_internal_result["success"]:
-            self.result_update.emit(f"<font color=\"green\">成功！</font>延遲: {ping_internal_result['latency']}。校內網路連線正常。<br><br>")
-        else:
-            self.result_update.emit(f"<font color=\"red\">失敗！</font>錯誤: {ping_internal_result['error']}。可能無法連接到校內伺服器，請檢查校內網路。<br><br>")
-
-        # --- Test 3: Ping External IP (e.g., 8.8.8.8) ---
-        self.info_update.emit("正在 Ping 外部 IP (8.8.8.8)...")
-        ping_external_ip_result = ping_host("8.8.8.8", count=ping_count, timeout=ping_timeout)
-        self.result_update.emit(f"--- Ping 外部 IP (8.8.8.8) ---<br>")
-        if ping_external_ip_result["success"]:
-            self.result_update.emit(f"<font color=\"green\">成功！</font>延遲: {ping_external_ip_result['latency']}。可連線到網際網路。<br><br>")
-        else:
-            self.result_update.emit(f"<font color=\"red\">失敗！</font>錯誤: {ping_external_ip_result['error']}。可能無法連線到網際網路，請檢查網路連線。<br><br>")
-
-        # --- Test 4: Ping External Website (DNS Test) ---
-        self.info_update.emit(f"正在 Ping 外部網站 ({test_website})...")
-        ping_website_result = ping_host(test_website, count=ping_count, timeout=ping_timeout)
-        self.result_update.emit(f"--- Ping 外部網站 ({test_website}) ---<br>")
-        if ping_website_result["success"]:
-            self.result_update.emit(f"<font color=\"green\">成功！</font>延遲: {ping_website_result['latency']}。DNS 解析及網站連線正常。<br><br>")
-        else:
-            self.result_update.emit(f"<font color=\"red\">失敗！</font>錯誤: {ping_website_result['error']}。可能無法解析網域名稱或網站無法連線。<br><br>")
-
-        # --- Test 5: Tracert External Website ---
-        self.info_update.emit(f"正在追蹤到外部網站 ({test_website}) 的路徑...")
-        tracert_result = tracert_host(test_website, max_hops=tracert_max_hops)
-        self.result_update.emit(f"--- 追蹤到外部網站 ({test_website}) 的路徑 ---<br>")
-        if tracert_result and not tracert_result[0].get("ip") == "Error":
-            for hop in tracert_result:
-                self.result_update.emit(f"  {hop.get('num')}. {hop.get('ip')} ({hop.get('latency')})<br>")
-            self.result_update.emit("路徑追蹤完成，顯示網路封包經過的節點。<br><br>")
-        else:
-            self.result_update.emit(f"<font color=\"red\">追蹤路徑失敗！</font>錯誤: {tracert_result[0].get('ip')}。可能無法到達目標網站。<br><br>")
-
-        self.info_update.emit("診斷完成！")
-        self.finished.emit()
-
+import threading
+import tracing
+
+PROFILE_STARTUP = "--profile-startup" in sys.argv
+if PROFILE_STARTUP:
+    tracing.start() # Before the Qt imports, so they are timed too
+_started_ns = tracing.now()
+
+with tracing.span("import Qt widgets", "import"):
+    from PySide6.QtWidgets import QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, QWidget, QLabel, QPushButton, QDialog, QGroupBox, QFormLayout, QTableView, QHeaderView, QAbstractItemView
+    from PySide6.QtCore import QTimer, Signal
+with tracing.span("import config and results model", "import"):
+    from config_manager import ConfigurationManager, ConfigError, ConfigWatcher
+    from result_model import ResultTableModel
+
+RECORD_FLUSH_INTERVAL_MS = 50 # How often queued result records are pushed into the results view
+STARTUP_BUDGET_MS = 400 # Longest acceptable time from main.py starting to the window's first paint
+# Loaded only after the first paint; --profile-startup checks none of them slipped in before it
+DEFERRED_MODULES = ("settings_window", "diagnostic_worker", "diagnostic_plan", "network_diagnostics", "history_store",
+                    "metrics")
 
 class NetworkDiagnosticTool(QMainWindow):
+    # Emitted from the config watcher thread, delivered on the GUI thread
+    config_reloaded = Signal(object)
+    config_reload_failed = Signal(str)
+    # Emitted from the startup prefetch thread once the diagnostics are loaded and the network info is read
+    prefetch_finished = Signal()
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("校園網路診斷工具")
         self.setGeometry(100, 100, 750, 650) # Adjusted size for more content
 
-        self.config_manager = ConfigurationManager()
+        with tracing.span("read config", "startup"):
+            self.config_manager = ConfigurationManager()
+        # Opened by _finish_startup() once the window is on screen
+        self.history_store = None
+        self.path_cache = None
+        self.ptr_cache = None
+        self.metrics_server = None
+        self.config_watcher = None
+        self._startup_finished = False
         self.diagnostic_worker = None # Initialize worker as None
-        self._init_ui()
-        self._refresh_settings_display() # Initial display of settings
+        with tracing.span("build window", "startup"):
+            self._init_ui()
+            self._refresh_settings_display() # Initial display of settings
+        self.config_reloaded.connect(self._config_reloaded)
+        self.config_reload_failed.connect(self.status_label.setText)
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self._startup_finished:
+            self._startup_finished = True
+            tracing.record("start to first paint", "startup", _started_ns)
+            self._first_paint_ms = (tracing.now() - _started_ns) / 1e6
+            self._loaded_before_paint = [name for name in DEFERRED_MODULES if name in sys.modules]
+            # Let the paint reach the screen before loading anything else
+            QTimer.singleShot(0, self._finish_startup)
+
+    def _finish_startup(self):
+        """Opens what the window does not need to appear, and starts the background prefetch."""
+        with tracing.span("open stores and caches", "startup"):
+            from history_store import default_history_path
+            from path_cache import PathCache, default_path_cache_path
+            from reverse_dns import PtrCache, default_hop_names_path
+            self.history_store = self._open_history_store(default_history_path(self.config_manager))
+            self.path_cache = PathCache(default_path_cache_path(self.config_manager))
+            self.ptr_cache = PtrCache(default_hop_names_path(self.config_manager))
+            self.metrics_server = self._start_metrics_server()
+            self.config_watcher = ConfigWatcher(self.config_manager, on_reload=self.config_reloaded.emit,
+                                                on_error=lambda error: self.config_reload_failed.emit(f"設定檔未重新載入: {error}"))
+            self.config_watcher.start()
+        if PROFILE_STARTUP:
+            self.prefetch_finished.connect(self._report_startup)
+        threading.Thread(target=self._prefetch, name="startup-prefetch", daemon=True).start()
+
+    def _prefetch(self):
+        try:
+            with tracing.span("import diagnostics", "import"):
+                import diagnostic_worker # noqa: F401  (also loads every probe module)
+                from network_diagnostics import prefetch_network_info
+            with tracing.span("prefetch network info", "startup"):
+                prefetch_network_info()
+        except Exception as e:
+            print(f"Startup prefetch failed: {e}")
+        self.prefetch_finished.emit()
+
+    def _report_startup(self):
+        events = tracing.stop()
+        print(tracing.format_summary(events))
+        verdict = "within" if self._first_paint_ms <= STARTUP_BUDGET_MS else "OVER"
+        print(f"First window painted after {self._first_paint_ms:.1f} ms, {verdict} the {STARTUP_BUDGET_MS} ms budget")
+        print("Deferred modules loaded before the first paint: " + (", ".join(self._loaded_before_paint) or "none"))
+        QApplication.quit()
+
+    def _open_history_store(self, path):
+        from history_store import HistoryStore
+        import sqlite3
+        try:
+            return HistoryStore(path)
+        except (OSError, sqlite3.Error) as e:
+            print(f"Diagnostic history disabled: {e}")
+            return None
+
+    def _start_metrics_server(self):
+        address = self.config_manager.get_setting('Metrics', 'Listen')
+        if not address:
+            return None
+        from metrics import serve_metrics
+        try:
+            return serve_metrics(address)
+        except (OSError, ValueError) as e:
+            print(f"Metrics endpoint disabled: {e}")
+            return None
 
     def _init_ui(self):
         central_widget = QWidget()
@@ -133,19 +159,35 @@ class NetworkDiagnosticTool(QMainWindow):
         # --- Diagnostic Results Group ---
         results_group = QGroupBox("診斷結果")
         results_layout = QVBoxLayout()
-        self.results_text_area = QTextEdit("診斷結果將顯示在此...") # Changed to QTextEdit
-        self.results_text_area.setReadOnly(True) # Make it read-only
-        
-        # Increase font size for results_text_area
-        font = self.results_text_area.font()
+        self.results_model = ResultTableModel(self)
+        self.results_view = QTableView()
+        self.results_view.setModel(self.results_model)
+        self.results_view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.results_view.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.results_view.setWordWrap(False)
+        self.results_view.verticalHeader().setVisible(False)
+        # Fixed row heights let the view skip measuring rows that are not visible
+        self.results_view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.results_view.horizontalHeader().setSectionResizeMode(0, QHeaderView.Interactive)
+        self.results_view.horizontalHeader().setStretchLastSection(True)
+        self.results_view.setColumnWidth(0, 220)
+
+        # Increase font size for the results view
+        font = self.results_view.font()
         font.setPointSize(12) # Adjust font size as needed
-        self.results_text_area.setFont(font)
+        self.results_view.setFont(font)
+        self.results_view.verticalHeader().setDefaultSectionSize(self.results_view.fontMetrics().height() + 8)
 
-        # QTextEdit does not need QScrollArea directly, it's scrollable by default
-        results_layout.addWidget(self.results_text_area)
+        results_layout.addWidget(self.results_view)
         results_group.setLayout(results_layout)
         main_layout.addWidget(results_group)
 
+        # Records from the worker are buffered and added to the model in batches
+        self._pending_records = []
+        self._record_flush_timer = QTimer(self)
+        self._record_flush_timer.setInterval(RECORD_FLUSH_INTERVAL_MS)
+        self._record_flush_timer.timeout.connect(self._flush_pending_records)
+
         # --- Buttons ---
         button_layout = QHBoxLayout() # Use QHBoxLayout for buttons
         settings_button = QPushButton("設定")
@@ -156,6 +198,11 @@ class NetworkDiagnosticTool(QMainWindow):
         self.start_diagnosis_button.clicked.connect(self._start_diagnosis)
         button_layout.addWidget(self.start_diagnosis_button)
 
+        self.cancel_diagnosis_button = QPushButton("取消")
+        self.cancel_diagnosis_button.setEnabled(False)
+        self.cancel_diagnosis_button.clicked.connect(self._cancel_diagnosis)
+        button_layout.addWidget(self.cancel_diagnosis_button)
+
         copy_button = QPushButton("複製結果")
         copy_button.clicked.connect(self._copy_results_to_clipboard)
         button_layout.addWidget(copy_button)
@@ -177,34 +224,96 @@ class NetworkDiagnosticTool(QMainWindow):
             f"{self.config_manager.get_setting('NetworkSettings', 'InternalServerIP')}"
         )
 
+    def _config_reloaded(self, snapshot):
+        self._refresh_settings_display()
+        self.status_label.setText("設定檔已變更並重新載入，下次診斷將使用新設定。")
+
     def _open_settings(self):
+        from settings_window import SettingsWindow
         settings_dialog = SettingsWindow(self.config_manager, self)
         if settings_dialog.exec() == QDialog.Accepted:
             self._refresh_settings_display() # Refresh display if settings were saved
 
     def _start_diagnosis(self):
+        from diagnostic_worker import DiagnosticWorker # Normally already imported by the startup prefetch
+        try:
+            diagnostic_worker = DiagnosticWorker(self.config_manager, self.history_store, self.path_cache, self.ptr_cache)
+        except ConfigError as e:
+            self.status_label.setText(str(e))
+            return
         self.start_diagnosis_button.setEnabled(False) # Disable button during diagnosis
-        self.results_text_area.clear()
+        self._pending_records = []
+        self.results_model.clear()
         self.status_label.setText("正在啟動診斷...")
+        if self.config_manager.get_setting('Tracing', 'TraceFile'):
+            tracing.start()
 
-        self.diagnostic_worker = DiagnosticWorker(self.config_manager)
+        self.diagnostic_worker = diagnostic_worker
         self.diagnostic_worker.info_update.connect(self.status_label.setText)
-        self.diagnostic_worker.result_update.connect(self._append_result_text)
+        self.diagnostic_worker.record_update.connect(self._queue_record)
         self.diagnostic_worker.finished.connect(self._diagnosis_finished)
+        self._record_flush_timer.start()
+        self.cancel_diagnosis_button.setEnabled(True)
         self.diagnostic_worker.start()
 
-    def _append_result_text(self, text):
-        self.results_text_area.append(text) # Changed to append for QTextEdit
+    def _cancel_diagnosis(self):
+        if self.diagnostic_worker and self.diagnostic_worker.isRunning():
+            self.cancel_diagnosis_button.setEnabled(False)
+            self.status_label.setText("正在取消診斷...")
+            self.diagnostic_worker.cancel()
+
+    def _queue_record(self, record):
+        emitted_ns = record.pop("emitted_ns", None)
+        if emitted_ns:
+            tracing.record("qt signal delivery", "qt", emitted_ns)
+        self._pending_records.append(record)
+
+    def _flush_pending_records(self):
+        if not self._pending_records:
+            return
+        scrollbar = self.results_view.verticalScrollBar()
+        follow = scrollbar.value() == scrollbar.maximum()
+        records, self._pending_records = self._pending_records, []
+        with tracing.span("qt model update", "qt", records=len(records)):
+            self.results_model.append_records(records)
+        if follow:
+            self.results_view.scrollToBottom()
 
     def _diagnosis_finished(self):
+        self._record_flush_timer.stop()
+        self._flush_pending_records()
         self.start_diagnosis_button.setEnabled(True) # Re-enable button
-        self.status_label.setText("診斷完成！")
+        self.cancel_diagnosis_button.setEnabled(False)
+        self.status_label.setText("診斷已取消。" if self.diagnostic_worker.scheduler.cancelled else "診斷完成！")
+        if tracing.enabled():
+            self._write_trace(tracing.stop())
+
+    def _write_trace(self, events):
+        path = self.config_manager.get_setting('Tracing', 'TraceFile')
+        try:
+            tracing.write_chrome_trace(path, events)
+        except OSError as e:
+            print(f"Could not write trace file {path}: {e}")
+        print(tracing.format_summary(events))
 
     def _copy_results_to_clipboard(self):
         clipboard = QApplication.clipboard()
-        clipboard.setText(self.results_text_area.toPlainText())
+        clipboard.setText(self.results_model.to_plain_text())
         self.status_label.setText("診斷結果已複製到剪貼簿！")
 
+    def closeEvent(self, event):
+        if self.config_watcher:
+            self.config_watcher.stop()
+        if self.diagnostic_worker and self.diagnostic_worker.isRunning():
+            self.diagnostic_worker.cancel()
+            self.diagnostic_worker.wait()
+        if self.history_store:
+            self.history_store.close()
+        if self.metrics_server:
+            self.metrics_server.shutdown()
+            self.metrics_server.server_close()
+        super().closeEvent(event)
+
 if __name__ == "__main__":
     app = QApplication(sys.argv)
     window = NetworkDiagnosticTool()
@@ -0,0 +1,306 @@
+"""OpenMetrics exporter for probe results (ping, traceroute, network info).
+
+Recording is off until enable() is called, and then costs no shared lock:
+counters and histograms are kept in per-thread shards that only their own
+thread writes, and gauges are single dict assignments. A scrape sums the shards
+as they are at that moment, so it never waits for probes and probes never wait
+for it.
+"""
+import functools
+import threading
+import time
+import weakref
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from dns_probe import parse_resolver
+
+DEFAULT_METRICS_PORT = 9464
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+MAX_TARGET_LABELS = 500 # Distinct "target" label values kept; later targets share OVERFLOW_TARGET
+OVERFLOW_TARGET = "other"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _format_bound(bound):
+    """A bucket bound as an OpenMetrics canonical float: always with a fraction or exponent, "+Inf" for infinity."""
+    bound = float(bound)
+    if bound == float("inf"):
+        return "+Inf"
+    text = repr(bound)
+    dot = text.find(".")
+    if bound > 0 and dot > 6: # Go, whose formatting the canonical form follows, uses an exponent from 1e21 down to here
+        mantissa = f"{text[0]}.{text[1:dot]}{text[dot + 1:]}".rstrip("0").rstrip(".")
+        return f"{mantissa}e+0{dot - 1}"
+    return text
+
+
+class _ShardedValues:
+    """Per-thread {labels: [float, ...]} shards, summed element-wise on read.
+
+    Only the owning thread mutates a shard, so adds need no lock. Shards of
+    threads that have exited are folded into a base total on read, so thread
+    pools that come and go do not make the shard list grow.
+    """
+
+    def __init__(self, width):
+        self.width = width
+        self._local = threading.local()
+        self._shards = [] # (weakref to thread, shard)
+        self._base = {}
+        self._lock = threading.Lock() # Taken once per thread at shard creation, and by readers
+
+    def _shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append((weakref.ref(threading.current_thread()), shard))
+        return shard
+
+    def row(self, labels):
+        """The calling thread's row for ``labels``; callers add into it in place."""
+        shard = self._shard()
+        row = shard.get(labels)
+        if row is None:
+            row = shard[labels] = [0.0] * self.width
+        return row
+
+    def totals(self):
+        with self._lock:
+            live = []
+            for thread_ref, shard in self._shards:
+                thread = thread_ref()
+                if thread is None or not thread.is_alive():
+                    self._add(self._base, shard)
+                else:
+                    live.append((thread_ref, shard))
+            self._shards = live
+            totals = {labels: list(row) for labels, row in self._base.items()}
+            for _, shard in live:
+                self._add(totals, shard)
+        return totals
+
+    def _add(self, totals, shard):
+        for labels, row in list(shard.items()):
+            total = totals.setdefault(labels, [0.0] * self.width)
+            for index, value in enumerate(list(row)):
+                total[index] += value
+
+
+class Counter:
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self._values = _ShardedValues(1)
+
+    def inc(self, labels=(), amount=1):
+        self._values.row(labels)[0] += amount
+
+    def render(self):
+        lines = [f"# TYPE {self.name} counter", f"# HELP {self.name} {self.help}"]
+        for labels, (value,) in sorted(self._values.totals().items()):
+            lines.append(f"{self.name}_total{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Gauge:
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self._values = {}
+
+    def set(self, labels, value):
+        self._values[labels] = value # A single dict store: atomic, no lock needed
+
+    def render(self):
+        lines = [f"# TYPE {self.name} gauge", f"# HELP {self.name} {self.help}"]
+        for labels, value in sorted(self._values.copy().items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Fixed-bucket histogram; each row holds the per-bucket counts, then sum and count."""
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._values = _ShardedValues(len(self.buckets) + 2)
+
+    def observe(self, labels, value):
+        row = self._values.row(labels)
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                row[index] += 1
+                break
+        row[-2] += value
+        row[-1] += 1
+
+    def render(self):
+        lines = [f"# TYPE {self.name} histogram", f"# HELP {self.name} {self.help}"]
+        for labels, row in sorted(self._values.totals().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), row[:-2] + [row[-1] - sum(row[:-2])]):
+                cumulative += count
+                le = f'le="{_format_bound(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {int(cumulative)}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(row[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {int(row[-1])}")
+        return lines
+
+
+class Registry:
+    def __init__(self, max_targets=MAX_TARGET_LABELS):
+        self.enabled = False
+        self.metrics = []
+        self.max_targets = max_targets
+        self._targets = set()
+        self._lock = threading.Lock()
+
+    def target_label(self, target):
+        """``target`` for the first ``max_targets`` distinct targets, OVERFLOW_TARGET for the rest.
+
+        Caps the series a sweep over thousands of hosts creates; only a new
+        target takes the lock.
+        """
+        if target in self._targets:
+            return target
+        with self._lock:
+            if len(self._targets) < self.max_targets:
+                self._targets.add(target)
+                return target
+        return OVERFLOW_TARGET
+
+    def add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+PROBE_LATENCY = REGISTRY.add(Histogram(
+    "netdiag_probe_latency_seconds", "Round-trip time of each answered echo request.", ("target",)))
+PACKETS_SENT = REGISTRY.add(Counter("netdiag_probe_packets_sent", "Echo requests sent.", ("target",)))
+PACKETS_LOST = REGISTRY.add(Counter("netdiag_probe_packets_lost", "Echo requests that got no reply.", ("target",)))
+PROBE_DURATION = REGISTRY.add(Histogram(
+    "netdiag_probe_duration_seconds", "Wall time of a whole probe call.", ("probe", "target"), DURATION_BUCKETS))
+PROBE_SUCCESS = REGISTRY.add(Gauge("netdiag_probe_success", "1 if the last probe succeeded, else 0.", ("probe", "target")))
+TRACEROUTE_HOPS = REGISTRY.add(Gauge("netdiag_traceroute_hops", "Hop count of the last traceroute.", ("target",)))
+INTERFACE_UP = REGISTRY.add(Gauge("netdiag_interface_up", "1 if the active adapter reports connected.", ("adapter",)))
+
+
+def enable():
+    REGISTRY.enabled = True
+
+
+def record_ping(host, result, duration):
+    host = REGISTRY.target_label(host)
+    rtts = result.get("rtts") or []
+    PACKETS_SENT.inc((host,), len(rtts))
+    PACKETS_LOST.inc((host,), sum(1 for rtt in rtts if rtt is None))
+    for rtt in rtts:
+        if rtt is not None:
+            PROBE_LATENCY.observe((host,), rtt / 1000)
+    PROBE_DURATION.observe(("ping", host), duration)
+    PROBE_SUCCESS.set(("ping", host), 1 if result.get("success") else 0)
+
+
+def record_tracert(host, hops, duration):
+    host = REGISTRY.target_label(host)
+    nums = [hop["num"] for hop in hops if isinstance(hop.get("num"), int)]
+    succeeded = bool(nums) and len(nums) == len(hops)
+    if succeeded:
+        TRACEROUTE_HOPS.set((host,), max(nums))
+    PROBE_DURATION.observe(("tracert", host), duration)
+    PROBE_SUCCESS.set(("tracert", host), 1 if succeeded else 0)
+
+
+def record_net_info(info, duration):
+    INTERFACE_UP.set((info.get("adapter_name") or "N/A",), 1 if info.get("status") == "已連線" else 0)
+    PROBE_DURATION.observe(("net_info", ""), duration)
+
+
+def observed(recorder):
+    """Decorates a probe so that, while metrics are enabled, each call is passed to ``recorder``.
+
+    ``recorder`` gets the probe's first argument (the host) unless the probe
+    takes none, then the result and the call's wall time in seconds.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not REGISTRY.enabled:
+                return func(*args, **kwargs)
+            started = time.perf_counter()
+            result = func(*args, **kwargs)
+            try:
+                host = args[:1] or ((kwargs["host"],) if "host" in kwargs else ())
+                recorder(*host, result, time.perf_counter() - started)
+            except Exception as e:
+                print(f"Error recording metrics: {e}")
+            return result
+        return wrapper
+    return decorator
+
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        data = self.server.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class MetricsServer(ThreadingHTTPServer):
+    """Serves GET /metrics from a background thread; start() also enables recording."""
+
+    daemon_threads = True
+
+    def __init__(self, address, registry=REGISTRY):
+        super().__init__(address, _MetricsRequestHandler)
+        self.registry = registry
+
+    def start(self):
+        self.registry.enabled = True
+        threading.Thread(target=self.serve_forever, name="metrics-server", daemon=True).start()
+        return self
+
+
+def serve_metrics(address):
+    """Starts a MetricsServer on "host[:port]" (default port DEFAULT_METRICS_PORT)."""
+    return MetricsServer(parse_resolver(address, DEFAULT_METRICS_PORT)).start()
@@ -0,0 +1,108 @@
+import math
+import threading
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from network_diagnostics import ping_host
+
+_NAN = float("nan")
+
+
+class RttRingBuffer:
+    """Fixed-size ring of RTT samples in milliseconds; lost packets are stored as NaN.
+
+    Backed by a preallocated ``array('d')`` so memory stays constant no matter how
+    many samples are added.
+    """
+
+    def __init__(self, size=600):
+        if size < 1:
+            raise ValueError(f"window size must be at least 1, got {size}")
+        self.size = size
+        self.samples = array("d", [_NAN]) * size
+        self.index = 0
+        self.count = 0
+        self.total = 0 # Samples ever added, including overwritten ones
+        self.lock = threading.Lock()
+
+    def add(self, rtt):
+        with self.lock:
+            self.samples[self.index] = _NAN if rtt is None else rtt
+            self.index = (self.index + 1) % self.size
+            self.count = min(self.count + 1, self.size)
+            self.total += 1
+
+    def values(self):
+        """Returns the samples currently in the window, oldest first."""
+        with self.lock:
+            if self.count < self.size:
+                return self.samples[:self.count]
+            return self.samples[self.index:] + self.samples[:self.index]
+
+    def stats(self):
+        """Rolling loss %, min/avg/max/p95 and last RTT over the window (None when undefined)."""
+        window = self.values()
+        received = sorted(rtt for rtt in window if not math.isnan(rtt))
+        stats = {"samples": len(window), "total": self.total, "loss_percent": None,
+                 "min": None, "avg": None, "max": None, "p95": None, "last": None}
+        if not window:
+            return stats
+        stats["loss_percent"] = 100.0 * (len(window) - len(received)) / len(window)
+        stats["last"] = None if math.isnan(window[-1]) else window[-1]
+        if received:
+            stats["min"] = received[0]
+            stats["max"] = received[-1]
+            stats["avg"] = sum(received) / len(received)
+            # Nearest-rank percentile
+            stats["p95"] = received[max(0, math.ceil(0.95 * len(received)) - 1)]
+        return stats
+
+
+class Monitor:
+    """Probes a set of targets every ``interval`` seconds, mtr style, into per-target ring buffers.
+
+    ``on_round(monitor)`` is called after each round, e.g. to print ``snapshot()``.
+    """
+
+    def __init__(self, targets, interval=1.0, window=600, timeout=1000, on_round=None):
+        self.targets = list(dict.fromkeys(targets))
+        self.interval = interval
+        self.timeout = timeout
+        self.on_round = on_round
+        self.buffers = {target: RttRingBuffer(window) for target in self.targets}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _probe(self, target):
+        result = ping_host(target, count=1, timeout=self.timeout)
+        self.buffers[target].add(result["rtts"][0] if result["rtts"] else None)
+
+    def run(self, duration=None):
+        """Runs rounds until stop() is called or ``duration`` seconds have passed."""
+        started = time.monotonic()
+        next_round = started
+        with ThreadPoolExecutor(max_workers=max(1, min(32, len(self.targets)))) as pool:
+            while not self._stop.is_set():
+                list(pool.map(self._probe, self.targets))
+                if self.on_round:
+                    self.on_round(self)
+                next_round += self.interval
+                if duration is not None and next_round - started >= duration:
+                    break
+                # Fixed schedule: a slow round shortens the next wait instead of drifting
+                self._stop.wait(max(0.0, next_round - time.monotonic()))
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name="monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def snapshot(self):
+        """Returns {target: stats} for every monitored target."""
+        return {target: buffer.stats() for target, buffer in self.buffers.items()}
@@ -1,9 +1,44 @@
 import subprocess
 import platform
-import re
+import socket
+import ipaddress
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from cancellation import is_cancelled, on_cancel
+from icmp_engine import get_engine, RttEstimator
+from traceroute_engine import trace_hops, trace_incremental, TracerouteError
+from linux_netinfo import NetworkInfoCache
+from metrics import observed, record_ping, record_tracert, record_net_info
+from output_parsers import PingParser, TraceParser, IpconfigParser, MEDIA_DISCONNECTED, decode_line
+import tracing
+from tracing import span
 
+NETWORK_INFO_PREFETCH_MAX_AGE = 60 # Seconds a prefetched network info result may still be handed out
+
+_prefetched_network_info = None # (monotonic time, info) for the next get_network_info() call only
+_prefetched_network_info_lock = threading.Lock()
+
+def prefetch_network_info():
+    """Reads the network info ahead of time (e.g. on a background thread at startup).
+
+    The next get_network_info() call within NETWORK_INFO_PREFETCH_MAX_AGE
+    seconds returns this result instead of running ipconfig again.
+    """
+    global _prefetched_network_info
+    info = get_network_info()
+    with _prefetched_network_info_lock:
+        _prefetched_network_info = (time.monotonic(), info)
+
+@observed(record_net_info)
 def get_network_info():
     """Retrieves basic network information (IP, Gateway, DNS) for the primary adapter."""
+    global _prefetched_network_info
+    with _prefetched_network_info_lock:
+        prefetched, _prefetched_network_info = _prefetched_network_info, None
+    if prefetched and time.monotonic() - prefetched[0] < NETWORK_INFO_PREFETCH_MAX_AGE:
+        return prefetched[1]
+
     info = {
         "ip_address": "N/A",
         "subnet_mask": "N/A",
@@ -17,85 +52,16 @@ def get_network_info():
     if platform.system() == "Windows":
         try:
             # Get IP config details
-            result = subprocess.run(["ipconfig", "/all"], capture_output=True, text=True, encoding='cp950', check=True, creationflags=subprocess.CREATE_NO_WINDOW)
-            output = result.stdout
-
-            # Store all adapter info first
-            all_adapters_info = []
-            current_adapter_info = None
-
-            # Regex patterns to extract information
-            adapter_header_pattern = re.compile(r"^(乙太網路卡|無線區域網路介面卡|不明的介面卡) (.+?):$", re.MULTILINE)
-            ip_pattern = re.compile(r"IPv4 位址[ .]+: (\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})")
-            subnet_pattern = re.compile(r"子網路遮罩[ .]+: (\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})")
-            # Simplified gateway pattern to just find an IPv4 address on a line that might be a gateway
-            ipv4_pattern = re.compile(r"(\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})")
-            dns_line_pattern = re.compile(r"DNS 伺服器[ .]+: (\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})")
-            media_state_pattern = re.compile(r"媒體狀態[ .]+: (.+)")
-            description_pattern = re.compile(r"描述[ .]+: (.+)")
-
-            lines = output.splitlines()
-            expecting_ipv4_gateway = False
-            expecting_additional_dns = False # New flag for DNS
-            for i, line in enumerate(lines):
-                adapter_match = adapter_header_pattern.match(line)
-                if adapter_match:
-                    if current_adapter_info:
-                        all_adapters_info.append(current_adapter_info)
-                    
-                    current_adapter_info = {
-                        "adapter_name": f"{adapter_match.group(1)} {adapter_match.group(2)}",
-                        "ip_address": "N/A",
-                        "subnet_mask": "N/A",
-                        "default_gateway": "N/A",
-                        "dns_servers": [],
-                        "connection_type": "無線" if "無線區域網路" in adapter_match.group(1) else "有線",
-                        "status": "N/A"
-                    }
-                    expecting_ipv4_gateway = False # Reset for new adapter
-                    expecting_additional_dns = False # Reset for new adapter
-                    continue
-
-                if current_adapter_info:
-                    # Gateway parsing logic
-                    if "預設閘道" in line:
-                        gateway_match = ipv4_pattern.search(line)
-                        if gateway_match and not gateway_match.group(1).startswith("fe80::"):
-                            current_adapter_info["default_gateway"] = gateway_match.group(1)
-                        else:
-                            expecting_ipv4_gateway = True
-                    elif expecting_ipv4_gateway:
-                        gateway_match = ipv4_pattern.search(line)
-                        if gateway_match:
-                            current_adapter_info["default_gateway"] = gateway_match.group(1)
-                        expecting_ipv4_gateway = False
-
-                    # DNS parsing logic
-                    dns_match = dns_line_pattern.search(line)
-                    if dns_match:
-                        current_adapter_info["dns_servers"].append(dns_match.group(1))
-                        expecting_additional_dns = True # Expect more DNS on next lines
-                    elif expecting_additional_dns:
-                        ipv4_match = ipv4_pattern.search(line)
-                        if ipv4_match:
-                            current_adapter_info["dns_servers"].append(ipv4_match.group(1))
-                        else:
-                            expecting_additional_dns = False # Stop expecting if line doesn't contain IP
-
-                    ip_match = ip_pattern.search(line)
-                    if ip_match: current_adapter_info["ip_address"] = ip_match.group(1)
-                    subnet_match = subnet_pattern.search(line)
-                    if subnet_match: current_adapter_info["subnet_mask"] = subnet_match.group(1)
-                    media_state_match = media_state_pattern.search(line)
-                    if media_state_match: current_adapter_info["status"] = media_state_match.group(1).strip()
-            
-            if current_adapter_info:
-                all_adapters_info.append(current_adapter_info)
+            command = ["ipconfig", "/all"]
+            parser = IpconfigParser()
+            returncode = _stream_command(command, parser, "parse ipconfig")
+            if returncode:
+                raise subprocess.CalledProcessError(returncode, command)
 
             # Prioritize connected adapters with an IPv4 address
-            for adapter in all_adapters_info:
+            for adapter in parser.result():
                 # An adapter is considered active if it has an IPv4 address and is not explicitly marked as 'Media disconnected'
-                is_connected = adapter["ip_address"] != "N/A" and adapter["status"] != "媒體已中斷連線"
+                is_connected = adapter["ip_address"] != "N/A" and adapter["status"] != MEDIA_DISCONNECTED
                 if is_connected:
                     info.update(adapter)
                     info["status"] = "已連線"
@@ -105,77 +71,135 @@ def get_network_info():
             print(f"Error getting network info: {e}")
         except Exception as e:
             print(f"An unexpected error occurred during network info parsing: {e}")
+    elif platform.system() == "Linux":
+        try:
+            with span("read network info", "netinfo"):
+                info.update(_get_linux_network_info_cache().get())
+        except Exception as e:
+            print(f"An unexpected error occurred while reading network info: {e}")
     else:
-        # Placeholder for Linux/macOS (using ifconfig/ip addr)
+        # Placeholder for macOS
         info["adapter_name"] = "非 Windows 系統"
         info["status"] = "未支援"
 
     return info
 
-def ping_host(host, count=4, timeout=1000):
-    """Pings a host and returns success status and latency."""
-    result = {"success": False, "latency": "N/A", "error": ""}
+_linux_network_info_cache = None
+_linux_network_info_cache_lock = threading.Lock()
+
+def _get_linux_network_info_cache():
+    global _linux_network_info_cache
+    with _linux_network_info_cache_lock:
+        if _linux_network_info_cache is None:
+            _linux_network_info_cache = NetworkInfoCache()
+        return _linux_network_info_cache
+
+_rtt_estimators = {} # address -> RttEstimator, kept across runs so adaptive timeouts start tight
+_rtt_estimators_lock = threading.Lock()
+
+def _rtt_estimator(address):
+    with _rtt_estimators_lock:
+        return _rtt_estimators.setdefault(address, RttEstimator())
+
+@observed(record_ping)
+def ping_host(host, count=4, timeout=1000, adaptive=False, max_count=None, family=None):
+    """Pings a host and returns success status, average latency and per-packet RTTs.
+
+    ``rtts`` holds one entry per echo request: the RTT in ms, or None if lost.
+    Uses the in-process ICMP engine when ICMP sockets are permitted and falls back
+    to running the system ``ping`` command otherwise. With ``adaptive`` the
+    engine waits per request only as long as the target's smoothed RTT warrants,
+    stops once the RTT is known well enough and sends up to ``max_count``
+    (default twice ``count``) requests to lossy targets; ``rtts`` then has one
+    entry per request actually sent. ``family`` (socket.AF_INET6 or AF_INET)
+    selects the address family to ping over; by default IPv4 is used.
+    """
+    engine = get_engine(family or socket.AF_INET)
+    if engine is None:
+        return _ping_host_subprocess(host, count, timeout, family)
+
+    result = {"success": False, "latency": "N/A", "error": "", "rtts": []}
+    try:
+        address = socket.getaddrinfo(host, None, family or socket.AF_INET)[0][4][0]
+    except (socket.gaierror, UnicodeError):
+        result["error"] = "無法找到主機"
+        return result
+
+    try:
+        with span("echo", "network", host=host):
+            if adaptive:
+                rtts, error = engine.ping_adaptive(address, count=count, max_count=max_count or 2 * count,
+                                                   timeout=timeout, estimator=_rtt_estimator(address))
+            else:
+                rtts, error = engine.ping(address, count=count, timeout=timeout)
+    except Exception as e:
+        result["error"] = f"發生未知錯誤: {e}"
+        return result
+
+    result["rtts"] = rtts
+    received = [rtt for rtt in rtts if rtt is not None]
+    if received:
+        result["success"] = True
+        result["latency"] = f"{sum(received) / len(received):.3f}ms"
+    elif error:
+        result["error"] = error
+    else:
+        result["error"] = "100% 封包遺失 (目標主機無回應)"
+    return result
+
+def _stream_command(command, parser, parse_stage, on_item=None):
+    """Runs a command and feeds each line of its output to ``parser`` as it is printed; returns the exit code.
+
+    stderr is merged into stdout, so error messages reach the parser too. Whatever
+    ``parser.feed`` returns other than None is passed to ``on_item``. The process
+    is killed if the task is cancelled.
+    """
+    with span("spawn", "process", command=command[0]):
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                   creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0)) # No console window on Windows
+    decode_ns = parse_ns = 0
+    timed = tracing.enabled()
+    with span("wait", "network", command=command[0]), on_cancel(process.kill):
+        for data in process.stdout:
+            if timed:
+                started_ns = tracing.now()
+                line = decode_line(data)
+                decoded_ns = tracing.now()
+                item = parser.feed(line)
+                decode_ns += decoded_ns - started_ns
+                parse_ns += tracing.now() - decoded_ns
+            else:
+                item = parser.feed(decode_line(data))
+            if item is not None and on_item:
+                on_item(item)
+        returncode = process.wait()
+        process.stdout.close()
+    if timed:
+        # Decoding and parsing are interleaved with the wait; report their totals as spans ending now
+        end_ns = tracing.now()
+        tracing.record("decode cp950", "decode", end_ns - decode_ns - parse_ns, end_ns - parse_ns)
+        tracing.record(parse_stage, "parse", end_ns - parse_ns, end_ns)
+    return returncode
+
+def _ping_host_subprocess(host, count=4, timeout=1000, family=None):
+    """Pings a host with the system ping command and returns success status and latency."""
+    result = {"success": False, "latency": "N/A", "error": "", "rtts": []}
     param = "-n" if platform.system() == "Windows" else "-c"
     timeout_param = "-w" if platform.system() == "Windows" else "-W"
     
-    # Convert timeout to seconds for non-Windows systems if it's in ms
-    actual_timeout = str(timeout) if platform.system() == "Windows" else str(int(timeout / 1000))
+    # Convert timeout to seconds for non-Windows systems if it's in ms; iputils accepts fractions,
+    # so a 500 ms timeout no longer truncates to 0 and 1500 ms no longer to 1 s
+    actual_timeout = str(timeout) if platform.system() == "Windows" else f"{timeout / 1000:g}"
 
     try:
         command = ["ping", param, str(count), timeout_param, actual_timeout, host]
-        process = subprocess.run(command, capture_output=True, text=True, encoding='cp950', check=False, creationflags=subprocess.CREATE_NO_WINDOW) # check=False to handle non-zero exit codes gracefully
-        output = process.stdout
-        stderr = process.stderr
-
-        # Determine success based on output content, not just returncode
-        if platform.system() == "Windows":
-            if "回覆自" in output or "Reply from" in output:
-                if "目的地主機無法連線" in output or "Destination host unreachable" in output:
-                    result["error"] = "目的地主機無法連線 (來自本機的回覆)"
-                elif "要求等候逾時" in output or "Request timed out" in output:
-                    result["error"] = "要求等候逾時"
-                elif "已遺失 = 0 (0% 遺失)" in output:
-                    result["success"] = True
-                    latency_match = re.search(r"平均 = (\d+)ms", output)
-                    if latency_match:
-                        result["latency"] = f"{latency_match.group(1)}ms"
-                    else:
-                        single_latency_match = re.search(r"時間=(\d+)ms", output)
-                        if single_latency_match:
-                            result["latency"] = f"{single_latency_match.group(1)}ms"
-                elif "已遺失 = 4 (100% 遺失)" in output: # Assuming count=4
-                    result["error"] = "100% 封包遺失 (目標主機無回應)"
-                else:
-                    # Some packets received, but not 0% loss, or other partial success
-                    # If '回覆自' is present and no explicit failure, consider it success for now
-                    result["success"] = True 
-                    latency_match = re.search(r"平均 = (\d+)ms", output)
-                    if latency_match:
-                        result["latency"] = f"{latency_match.group(1)}ms"
-                    else:
-                        single_latency_match = re.search(r"時間=(\d+)ms", output)
-                        if single_latency_match:
-                            result["latency"] = f"{single_latency_match.group(1)}ms"
-            elif "要求等候逾時" in output or "Request timed out" in output:
-                result["error"] = "要求等候逾時"
-            elif "無法找到主機" in output or "could not find host" in output:
-                result["error"] = "無法找到主機"
-            elif "一般失敗" in output or "General failure" in output:
-                result["error"] = "一般失敗 (可能網路不通)"
-            elif "Destination host unreachable" in output or "目的主機無法連線" in output:
-                result["error"] = "目的主機無法連線"
-            else:
-                # Fallback for other non-success cases
-                result["error"] = f"Ping 失敗或未知錯誤. Stdout: {output.strip()} Stderr: {stderr.strip()}"
-        else:
-            # Linux/macOS output parsing
-            if "bytes from" in output:
-                result["success"] = True
-                latency_match = re.search(r"min/avg/max/mdev = [\d.]+/([\d.]+)/", output)
-                if latency_match:
-                    result["latency"] = f"{latency_match.group(1)}ms"
-            else:
-                result["error"] = f"Ping 失敗或未知錯誤. Stdout: {output.strip()} Stderr: {stderr.strip()}"
+        if platform.system() != "Windows":
+            command[1:1] = ["-i", "0.2"] # Shortest interval allowed without root, instead of 1 s
+        if family:
+            command.insert(1, "-6" if family == socket.AF_INET6 else "-4")
+        parser = PingParser(count)
+        _stream_command(command, parser, "parse ping") # Non-zero exit codes mean lost packets, read from the output
+        result = parser.result()
 
     except FileNotFoundError:
         result["error"] = "Ping 命令未找到，請確認系統環境變數設定。"
@@ -184,10 +208,59 @@ def ping_host(host, count=4, timeout=1000):
 
     return result
 
+@observed(record_tracert)
+def tracert_host(host, max_hops=30, timeout=2000, on_hop=None, path_cache=None, hop_names=None):
+    """Performs a traceroute to a host and returns the hops.
+
+    Uses the parallel-TTL engine (``trace_hops``) when ICMP sockets are permitted
+    and falls back to the system traceroute/tracert command otherwise. ``on_hop``
+    is called with each hop as its reply arrives when the native engine is used.
+    With a ``path_cache`` (see path_cache.PathCache) the last known path to the
+    host is only verified and re-probed from the first changed hop, and the new
+    path is stored; its diff is then available from ``path_cache.last_diff(host)``.
+    With ``hop_names`` (see reverse_dns.HopNameResolver) hops get a "name" from
+    reverse DNS. Lookups start as each hop arrives and never delay the trace:
+    hops whose name is not cached yet are named later (see HopNameResolver.annotate).
+    """
+    def _on_hop(hop):
+        if hop_names:
+            hop_names.prefetch([hop["ip"]])
+        if on_hop:
+            on_hop(hop)
+
+    hops = _tracert_host_native(host, max_hops, timeout, _on_hop, path_cache.get(host) if path_cache else None)
+    if hops is None:
+        hops = _tracert_host_subprocess(host, max_hops, _on_hop)
+    if hop_names:
+        hop_names.annotate(hops, host)
+    if path_cache and not is_cancelled(): # A cancelled trace is incomplete, not a route change
+        path_cache.update(host, hops)
+    return hops
+
+def _tracert_host_native(host, max_hops, timeout, on_hop, cached_hops):
+    """Traces with the native engine, calling ``on_hop`` per hop; returns None if no ICMP socket can be opened."""
+    try:
+        hops = []
+        if cached_hops:
+            hop_iter = trace_incremental(host, cached_hops, max_hops=max_hops, timeout=timeout)
+        else:
+            hop_iter = trace_hops(host, max_hops=max_hops, timeout=timeout)
+        with span("trace", "network", host=host):
+            for hop in hop_iter:
+                hops.append(hop)
+                on_hop(hop)
+        return sorted(hops, key=lambda hop: hop["num"])
+    except TracerouteError as e:
+        return [{"num": "Error", "ip": str(e), "latency": "N/A"}]
+    except OSError as e:
+        print(f"ICMP socket unavailable, falling back to the traceroute command: {e}")
+    return None
 
+def _tracert_host_subprocess(host, max_hops=30, on_hop=None):
+    """Performs a traceroute with the system traceroute/tracert command and returns the hops.
 
-def tracert_host(host, max_hops=30):
-    """Performs a traceroute to a host and returns the hops."""
+    ``on_hop`` is called with each hop as soon as the command prints it.
+    """
     hops = []
     # Force IPv4 on Windows with -4 flag
     command_name = "tracert" if platform.system() == "Windows" else "traceroute"
@@ -199,44 +272,14 @@ def tracert_host(host, max_hops=30):
         if platform.system() == "Windows":
             command.insert(1, "-4") # Insert -4 flag for IPv4 tracert on Windows
 
-        process = subprocess.run(command, capture_output=True, text=True, encoding='cp950', check=False, creationflags=subprocess.CREATE_NO_WINDOW) # check=False to handle non-zero exit codes gracefully
-        output = process.stdout
-        stderr = process.stderr
+        parser = TraceParser()
+        returncode = _stream_command(command, parser, "parse traceroute", on_hop)
 
-        if process.returncode != 0:
-            hops.append({"num": "Error", "ip": f"Tracert 命令執行失敗 (Exit Code: {process.returncode}). Stderr: {stderr.strip()}", "latency": "N/A"})
+        if returncode != 0:
+            hops.append({"num": "Error", "ip": f"Tracert 命令執行失敗 (Exit Code: {returncode}). {parser.other_output()}", "latency": "N/A"})
             return hops
 
-        if platform.system() == "Windows":
-            # Windows tracert output parsing for IPv4
-            for line in output.splitlines():
-                if "Tracing route to" in line or "追蹤" in line:
-                    continue
-                if "over a maximum of" in line or "在最多" in line:
-                    continue
-                
-                # Match lines with hop number, multiple latencies, and an IP address
-                match = re.search(r"^\s*(\d+)\s+([<\d.]+\s*ms|\*)\s+([<\d.]+\s*ms|\*)\s+([<\d.]+\s*ms|\*)\s+([\d.]+)", line)
-                if match:
-                    hop_num = int(match.group(1))
-                    ip = match.group(5)
-                    latency_values = [m for m in match.groups()[1:4] if m != '*']
-                    latency = latency_values[0] if latency_values else "N/A"
-                    hops.append({"num": hop_num, "ip": ip, "latency": latency})
-                elif re.match(r"^\s*(\d+)\s+\*", line): # Handle lines with all asterisks
-                    hop_num = int(re.match(r"^\s*(\d+)", line).group(1))
-                    hops.append({"num": hop_num, "ip": "要求等候逾時", "latency": "N/A"})
-        else:
-            # Linux/macOS traceroute output parsing
-            for line in output.splitlines():
-                match = re.match(r"^\s*(\d+)\s+([\w.-]+)\s+\((\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})\)\s+([\d.]+)\s*ms", line)
-                if match:
-                    hop_num = int(match.group(1))
-                    ip = match.group(3)
-                    latency = f"{match.group(4)}ms"
-                    hops.append({"num": hop_num, "ip": ip, "latency": latency})
-                elif re.match(r"^\s*(\d+)\s+\*", line):
-                    hops.append({"num": len(hops) + 1, "ip": "Request timed out", "latency": "N/A"})
+        hops.extend(parser.result())
 
     except FileNotFoundError:
         hops.append({"num": "Error", "ip": "Tracert 命令未找到，請確認系統環境變數設定。", "latency": "N/A"})
@@ -245,6 +288,85 @@ def tracert_host(host, max_hops=30):
 
     return hops
 
+class _RateLimiter:
+    """Token bucket capping the number of packets sent per second across threads."""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, packets=1):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                # Allow a request larger than the bucket once it is full so it cannot stall forever
+                if self.tokens >= packets or self.tokens >= self.rate:
+                    self.tokens -= packets
+                    return
+                wait_time = (packets - self.tokens) / self.rate
+            time.sleep(wait_time)
+
+def _iter_targets(targets):
+    """Expands a CIDR string, a single host, or an iterable of hosts/CIDRs lazily."""
+    if isinstance(targets, str):
+        targets = [targets]
+    for target in targets:
+        target = target.strip()
+        if not target or target.startswith("#"):
+            continue
+        if "/" in target:
+            network = ipaddress.ip_network(target, strict=False)
+            # hosts() is a generator, so even a /8 never materializes as a list
+            yield from (str(address) for address in (network.hosts() if network.num_addresses > 2 else network))
+        else:
+            yield target
+
+def sweep_hosts(targets, count=1, timeout=1000, max_in_flight=64, packets_per_second=200, adaptive=False):
+    """Pings a range or list of hosts with bounded concurrency, yielding results as they complete.
+
+    ``targets`` is a CIDR string such as "172.16.0.0/16", a single host, or any
+    iterable of hosts/CIDRs (e.g. an open file of host names). At most
+    ``max_in_flight`` pings run at once and no more than ``packets_per_second``
+    echo requests are sent per second; only in-flight pings are held in memory.
+    Each result is ``ping_host``'s dict with an added "host" key, in completion order.
+    ``adaptive`` is passed to ping_host with up to twice ``count`` requests per
+    host, and the rate limit budgets that worst case.
+    """
+    limiter = _RateLimiter(packets_per_second) if packets_per_second else None
+    max_count = 2 * count if adaptive else count
+    target_iter = _iter_targets(targets)
+    in_flight = {}
+
+    def _probe(host):
+        result = ping_host(host, count=count, timeout=timeout, adaptive=adaptive, max_count=max_count)
+        result["host"] = host
+        return result
+
+    with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+        exhausted = False
+        while True:
+            while not exhausted and len(in_flight) < max_in_flight:
+                host = next(target_iter, None)
+                if host is None:
+                    exhausted = True
+                    break
+                if limiter:
+                    limiter.acquire(max_count)
+                in_flight[pool.submit(_probe, host)] = host
+            if not in_flight:
+                break
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                host = in_flight.pop(future)
+                try:
+                    yield future.result()
+                except Exception as e:
+                    yield {"host": host, "success": False, "latency": "N/A", "error": f"發生未知錯誤: {e}", "rtts": []}
+
 # Example usage (for testing purposes)
 if __name__ == "__main__":
     print("\n--- Network Info ---")
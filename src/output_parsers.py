@@ -0,0 +1,295 @@
+"""Single-pass parsers for ping, tracert/traceroute and ipconfig output.
+
+Each parser is fed the command's output one line at a time (``feed(line)``), so
+it can consume a subprocess's stdout while the command is still running, and
+``result()`` returns what the whole output amounts to. Lines are matched
+against patterns from per-locale tables (zh-TW and en-US Windows, Linux
+iputils/traceroute) compiled once at import; the Windows locale is detected
+from the first line that matches either table. All locales produce the same
+result shapes and the same (zh-TW) messages.
+"""
+import platform
+import re
+from traceroute_engine import HOP_TIMED_OUT # Also the "ip" of a parsed hop that did not answer, in every locale
+from tracing import traced
+
+MEDIA_DISCONNECTED = "媒體已中斷連線" # ipconfig adapter "status" once media is disconnected, in every locale
+
+_IPV4 = r"\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}"
+_ipv4_pattern = re.compile(_IPV4)
+
+# Ping line patterns per locale, tried in order. Events: "reply" (rtt, optional
+# seq), "timeout" and "unreachable" (a request that got no echo reply),
+# "unknown_host", "failure", "statistics" (sent, received) and "average".
+PING_PATTERNS = {
+    "zh_TW": [
+        ("reply", r"^回覆自 \S+?: 位元組=\d+ 時間[=<](?P<rtt>\d+)ms"),
+        ("timeout", r"^要求等候逾時"),
+        ("unreachable", r"^回覆自 \S+?: 目的地(?:主機|網路)無法連線"),
+        ("unknown_host", r"^Ping 要求找不到主機"),
+        ("failure", r"^一般失敗"),
+        ("statistics", r"已傳送 = (?P<sent>\d+)[，,]\s*已收到 = (?P<received>\d+)"),
+        ("average", r"平均 = (?P<avg>\d+)ms"),
+    ],
+    "en_US": [
+        ("reply", r"^Reply from \S+?: bytes=\d+ time[=<](?P<rtt>\d+)ms"),
+        ("timeout", r"^Request timed out"),
+        ("unreachable", r"^Reply from \S+?: Destination (?:host|net) unreachable"),
+        ("unknown_host", r"^Ping request could not find host"),
+        ("failure", r"^General failure"),
+        ("statistics", r"Sent = (?P<sent>\d+), Received = (?P<received>\d+)"),
+        ("average", r"Average = (?P<avg>\d+)ms"),
+    ],
+    "linux": [
+        ("reply", r"^\d+ bytes from [^:]+: icmp_seq=(?P<seq>\d+) .*?time[=<](?P<rtt>[\d.]+) ms"),
+        ("unreachable", r"^From \S+ icmp_seq=(?P<seq>\d+) Destination (?:Host|Net) Unreachable"),
+        ("unknown_host", r"^ping: .*(?:Name or service not known|unknown host|Temporary failure in name resolution"
+                         r"|No address associated)"),
+        ("statistics", r"^(?P<sent>\d+) packets transmitted, (?P<received>\d+) received"),
+        ("average", r"^(?:rtt|round-trip) min/avg/max/(?:mdev|stddev) = [\d.]+/(?P<avg>[\d.]+)/"),
+    ],
+}
+PING_ERRORS = {
+    "unknown_host": "無法找到主機",
+    "failure": "一般失敗 (可能網路不通)",
+    "unreachable": "目的主機無法連線",
+    "timeout": "100% 封包遺失 (目標主機無回應)",
+}
+
+# Hop lines of `tracert -d` (the same in every Windows locale) and `traceroute -n`
+TRACE_PATTERNS = {
+    "windows": r"^\s*(?P<num>\d+)\s+(?P<rtts>(?:(?:<?\d+ ms|\*)\s+){3})(?P<host>\S.*?)\s*$",
+    "linux": r"^\s*(?P<num>\d+)\s+(?P<probes>.*\S)\s*$",
+}
+_windows_rtt_pattern = re.compile(r"<?\d+ ms|\*")
+_windows_bracketed_address_pattern = re.compile(r"\[([^\]]+)\]")
+_linux_probe_pattern = re.compile(r"(?:\S+ \()?(?P<ip>" + _IPV4 + r"|[0-9a-fA-F]*:[0-9a-fA-F:]+)\)?\s+(?P<rtt>[\d.]+) ms")
+
+# ipconfig /all per locale: adapter header kinds (-> connection type), field labels
+# (-> result key) and the media state of an unplugged adapter
+IPCONFIG_LOCALES = {
+    "zh_TW": {
+        "adapters": {"乙太網路卡": "有線", "無線區域網路介面卡": "無線", "不明的介面卡": "有線",
+                     "PPP 介面卡": "有線", "通道介面卡": "有線"},
+        "fields": {"IPv4 位址": "ip_address", "自動設定 IPv4 位址": "ip_address", "子網路遮罩": "subnet_mask",
+                   "預設閘道": "default_gateway", "DNS 伺服器": "dns_servers", "媒體狀態": "status"},
+        "disconnected": "媒體已中斷連線",
+    },
+    "en_US": {
+        "adapters": {"Ethernet adapter": "有線", "Wireless LAN adapter": "無線", "Unknown adapter": "有線",
+                     "PPP adapter": "有線", "Tunnel adapter": "有線"},
+        "fields": {"IPv4 Address": "ip_address", "Autoconfiguration IPv4 Address": "ip_address",
+                   "Subnet Mask": "subnet_mask", "Default Gateway": "default_gateway", "DNS Servers": "dns_servers",
+                   "Media State": "status"},
+        "disconnected": "Media disconnected",
+    },
+}
+_ipconfig_field_pattern = re.compile(r"^\s+(?P<label>\S.*?)[ .]*:(?: (?P<value>.*))?$")
+
+
+def _compile_ping_patterns():
+    return {locale: [(event, re.compile(pattern)) for event, pattern in patterns]
+            for locale, patterns in PING_PATTERNS.items()}
+
+
+def _compile_ipconfig_tables():
+    adapters = {kind: connection_type for table in IPCONFIG_LOCALES.values()
+                for kind, connection_type in table["adapters"].items()}
+    header = re.compile(r"^(?P<kind>" + "|".join(map(re.escape, adapters)) + r") (?P<name>.+):$")
+    fields = {label: key for table in IPCONFIG_LOCALES.values() for label, key in table["fields"].items()}
+    disconnected = {table["disconnected"] for table in IPCONFIG_LOCALES.values()}
+    return header, adapters, fields, disconnected
+
+
+_ping_patterns = _compile_ping_patterns()
+_trace_patterns = {system: re.compile(pattern) for system, pattern in TRACE_PATTERNS.items()}
+_ipconfig_header_pattern, _ipconfig_adapters, _ipconfig_fields, _ipconfig_disconnected = _compile_ipconfig_tables()
+
+
+def decode_line(data):
+    """Decodes one line of command output (cp950, as Windows prints it) without its line ending."""
+    return data.decode('cp950').rstrip("\r\n")
+
+
+def decode_output(data):
+    """Decodes whole command output to text with "\\n" line endings."""
+    return data.decode('cp950').replace("\r\n", "\n").replace("\r", "\n")
+
+
+class PingParser:
+    """Builds ping_host's result dict from system ping output, one line at a time."""
+
+    def __init__(self, count, system=None):
+        self.count = count
+        windows = (system or platform.system()) == "Windows"
+        # Windows output is in one of several locales: the first recognized line decides
+        self._candidates = [_ping_patterns["zh_TW"], _ping_patterns["en_US"]] if windows else [_ping_patterns["linux"]]
+        self._patterns = None if windows else self._candidates[0]
+        self.rtts = [None] * count
+        self._index = 0 # Windows prints one line per request in order, replies and failures alike
+        self._events = set()
+        self._average = None
+        self._other_lines = []
+
+    def feed(self, line):
+        """Parses one line; returns the event it was ("reply", "timeout", ...) or None."""
+        for patterns in ([self._patterns] if self._patterns else self._candidates):
+            for event, pattern in patterns:
+                match = pattern.search(line)
+                if match:
+                    self._patterns = patterns
+                    self._handle(event, match)
+                    return event
+        if line.strip():
+            self._other_lines.append(line.strip())
+        return None
+
+    def _handle(self, event, match):
+        self._events.add(event)
+        if event == "average":
+            self._average = match.group("avg")
+        elif event in ("reply", "timeout", "unreachable", "failure"):
+            seq = match.groupdict().get("seq")
+            index = int(seq) - 1 if seq else self._index
+            self._index += 1
+            if event == "reply" and 0 <= index < self.count and self.rtts[index] is None:
+                self.rtts[index] = float(match.group("rtt"))
+
+    def result(self, stderr=""):
+        result = {"success": False, "latency": "N/A", "error": "", "rtts": self.rtts}
+        received = [rtt for rtt in self.rtts if rtt is not None]
+        if received:
+            result["success"] = True
+            result["latency"] = f"{self._average}ms" if self._average else f"{sum(received) / len(received):.3f}ms"
+            return result
+        for event, message in PING_ERRORS.items():
+            if event in self._events:
+                result["error"] = message
+                return result
+        if "statistics" in self._events:
+            result["error"] = PING_ERRORS["timeout"]
+        else:
+            result["error"] = f"Ping 失敗或未知錯誤: {' '.join(self._other_lines + [stderr.strip()]).strip()}"
+        return result
+
+
+class TraceParser:
+    """Collects tracert_host's hop dicts from system tracert/traceroute output, one line at a time."""
+
+    def __init__(self, system=None):
+        self.windows = (system or platform.system()) == "Windows"
+        self._pattern = _trace_patterns["windows" if self.windows else "linux"]
+        self.hops = []
+        self._other_lines = []
+
+    def feed(self, line):
+        """Parses one line; returns the hop dict if it was a hop line, else None."""
+        match = self._pattern.match(line)
+        hop = match and (self._windows_hop(match) if self.windows else self._linux_hop(match))
+        if hop:
+            self.hops.append(hop)
+            return hop
+        if line.strip():
+            self._other_lines.append(line.strip())
+        return None
+
+    @staticmethod
+    def _windows_hop(match):
+        rtts = [rtt for rtt in _windows_rtt_pattern.findall(match.group("rtts")) if rtt != "*"]
+        if not rtts:
+            return {"num": int(match.group("num")), "ip": HOP_TIMED_OUT, "latency": "N/A"}
+        host = match.group("host")
+        bracketed = _windows_bracketed_address_pattern.search(host)
+        return {"num": int(match.group("num")), "ip": bracketed.group(1) if bracketed else host.split()[0],
+                "latency": rtts[0]}
+
+    @staticmethod
+    def _linux_hop(match):
+        probe = _linux_probe_pattern.search(match.group("probes"))
+        if probe:
+            return {"num": int(match.group("num")), "ip": probe.group("ip"), "latency": f"{probe.group('rtt')}ms"}
+        if not match.group("probes").replace("*", "").strip():
+            return {"num": int(match.group("num")), "ip": HOP_TIMED_OUT, "latency": "N/A"}
+        return None
+
+    def result(self):
+        return self.hops
+
+    def other_output(self):
+        """The lines that were not hops (headers, error messages), joined."""
+        return " ".join(self._other_lines)
+
+
+class IpconfigParser:
+    """Collects one info dict per adapter from ``ipconfig /all`` output (zh-TW or en-US), one line at a time."""
+
+    def __init__(self):
+        self.adapters = []
+        self._adapter = None
+        self._continued_key = None # Gateway and DNS values continue on the following lines
+
+    def feed(self, line):
+        header = _ipconfig_header_pattern.match(line)
+        if header:
+            self._adapter = {
+                "adapter_name": f"{header.group('kind')} {header.group('name')}",
+                "ip_address": "N/A",
+                "subnet_mask": "N/A",
+                "default_gateway": "N/A",
+                "dns_servers": [],
+                "connection_type": _ipconfig_adapters[header.group("kind")],
+                "status": "N/A",
+            }
+            self.adapters.append(self._adapter)
+            self._continued_key = None
+            return self._adapter
+        if self._adapter is None or not line.strip():
+            return None
+        field = _ipconfig_field_pattern.match(line)
+        if field:
+            key = _ipconfig_fields.get(field.group("label"))
+            self._continued_key = key if key in ("default_gateway", "dns_servers") else None
+            if key:
+                self._set(key, (field.group("value") or "").strip())
+        elif self._continued_key:
+            self._set(self._continued_key, line.strip())
+        return None
+
+    def _set(self, key, value):
+        if key == "status":
+            self._adapter["status"] = MEDIA_DISCONNECTED if value in _ipconfig_disconnected else value
+            return
+        address = _ipv4_pattern.search(value)
+        if not address:
+            return # e.g. the IPv6 link-local gateway line; the IPv4 one follows
+        if key == "dns_servers":
+            self._adapter["dns_servers"].append(address.group())
+        elif self._adapter[key] == "N/A":
+            self._adapter[key] = address.group()
+
+    def result(self):
+        return self.adapters
+
+
+def _parse_lines(parser, output):
+    for line in output.splitlines():
+        parser.feed(line)
+    return parser
+
+
+@traced("parse ping", "parse")
+def parse_ping(output, count, system=None, stderr=""):
+    """Parses complete ping output; see PingParser."""
+    return _parse_lines(PingParser(count, system), output).result(stderr)
+
+
+@traced("parse traceroute", "parse")
+def parse_trace(output, system=None):
+    """Parses complete tracert/traceroute output into hops; see TraceParser."""
+    return _parse_lines(TraceParser(system), output).result()
+
+
+@traced("parse ipconfig", "parse")
+def parse_ipconfig(output):
+    """Parses complete ``ipconfig /all`` output into adapters; see IpconfigParser."""
+    return _parse_lines(IpconfigParser(), output).result()
@@ -0,0 +1,92 @@
+import json
+import os
+import threading
+import time
+from traceroute_engine import HOP_TIMED_OUT
+
+DEFAULT_PATH_CACHE_FILE_NAME = "trace_paths.json"
+
+
+def default_path_cache_path(config_manager):
+    """Path cache file from [Traceroute] PathCache, defaulting to a file next to config.ini."""
+    path = config_manager.get_setting('Traceroute', 'PathCache')
+    if path:
+        return path
+    return os.path.join(os.path.dirname(config_manager.config_file_path), DEFAULT_PATH_CACHE_FILE_NAME)
+
+
+def diff_paths(old_hops, new_hops):
+    """Compares two hop lists hop number by hop number.
+
+    Returns {"changed", "added", "removed", "changed_hops"}: hops only in the new
+    path, hops only in the old path, and {"num", "old_ip", "new_ip"} for hops whose
+    responder differs. A hop that timed out in either run is not counted as
+    changed, since a silent router says nothing about the route.
+    """
+    old = {hop["num"]: hop for hop in old_hops if isinstance(hop.get("num"), int)}
+    new = {hop["num"]: hop for hop in new_hops if isinstance(hop.get("num"), int)}
+    added = [new[num] for num in sorted(new.keys() - old.keys())]
+    removed = [old[num] for num in sorted(old.keys() - new.keys())]
+    changed_hops = [{"num": num, "old_ip": old[num]["ip"], "new_ip": new[num]["ip"]}
+                    for num in sorted(old.keys() & new.keys())
+                    if old[num]["ip"] != new[num]["ip"] and HOP_TIMED_OUT not in (old[num]["ip"], new[num]["ip"])]
+    return {"changed": bool(added or removed or changed_hops), "added": added, "removed": removed,
+            "changed_hops": changed_hops}
+
+
+def _is_valid_path(hops):
+    return bool(hops) and all(isinstance(hop.get("num"), int) for hop in hops)
+
+
+class PathCache:
+    """Last known traceroute path per target, persisted as a JSON file.
+
+    ``update`` stores a new path and returns its diff against the previous one,
+    which stays available from ``last_diff`` until the next update. Error results
+    are never stored. With ``path=None`` the cache lives in memory only.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._paths = {}
+        self._diffs = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as cache_file:
+                    self._paths = json.load(cache_file)
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable path cache {path}: {e}")
+
+    def get(self, target):
+        """The hops of the last stored path to ``target``, or None."""
+        with self._lock:
+            entry = self._paths.get(target)
+        return entry["hops"] if entry else None
+
+    def last_diff(self, target):
+        with self._lock:
+            return self._diffs.get(target)
+
+    def update(self, target, hops):
+        """Stores ``hops`` as the path to ``target``; returns the diff to the previous path (None if none)."""
+        if not _is_valid_path(hops):
+            return None
+        with self._lock:
+            previous = self._paths.get(target)
+            diff = diff_paths(previous["hops"], hops) if previous else None
+            self._paths[target] = {"hops": hops, "updated": time.time()}
+            self._diffs[target] = diff
+            self._save_locked()
+        return diff
+
+    def _save_locked(self):
+        if not self.path:
+            return
+        temporary_path = f"{self.path}.tmp"
+        try:
+            with open(temporary_path, "w", encoding="utf-8") as cache_file:
+                json.dump(self._paths, cache_file, ensure_ascii=False)
+            os.replace(temporary_path, self.path) # Readers never see a half-written file
+        except OSError as e:
+            print(f"Could not save path cache {self.path}: {e}")
@@ -0,0 +1,82 @@
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PySide6.QtGui import QColor, QFont
+
+LEVEL_INFO = "info"
+LEVEL_SUCCESS = "success"
+LEVEL_FAILURE = "failure"
+
+_LEVEL_COLORS = {LEVEL_SUCCESS: QColor("green"), LEVEL_FAILURE: QColor("red")}
+
+
+def make_record(section, text, level=LEVEL_INFO):
+    """A structured result line: the test it belongs to, its text and its success level."""
+    return {"section": section, "text": text, "level": level}
+
+
+class ResultTableModel(QAbstractTableModel):
+    """Table model over diagnostic result records (section / text), appended in batches.
+
+    Rows are plain dicts from make_record(); nothing is laid out as rich text, so
+    a QTableView over this model only paints the rows that are visible.
+    """
+
+    HEADERS = ("測試項目", "結果")
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._records = []
+        self._bold_font = QFont()
+        self._bold_font.setBold(True)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._records)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        record = self._records[index.row()]
+        if role == Qt.DisplayRole:
+            return record["section"] if index.column() == 0 else record["text"]
+        if role == Qt.ForegroundRole and index.column() == 1:
+            return _LEVEL_COLORS.get(record["level"])
+        if role == Qt.FontRole and index.column() == 0:
+            return self._bold_font
+        if role == Qt.ToolTipRole and index.column() == 1:
+            return record["text"]
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def append_records(self, records):
+        """Appends a batch of records with a single row-insertion notification."""
+        if not records:
+            return
+        first = len(self._records)
+        self.beginInsertRows(QModelIndex(), first, first + len(records) - 1)
+        self._records.extend(records)
+        self.endInsertRows()
+
+    def clear(self):
+        self.beginResetModel()
+        self._records = []
+        self.endResetModel()
+
+    def to_plain_text(self):
+        """Renders the plain text report: a "--- section ---" header before each test's lines."""
+        lines = []
+        current_section = None
+        for record in self._records:
+            if record["section"] != current_section:
+                if lines:
+                    lines.append("")
+                if record["section"]:
+                    lines.append(f"--- {record['section']} ---")
+                current_section = record["section"]
+            lines.append(record["text"])
+        return "\n".join(lines)
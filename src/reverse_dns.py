@@ -0,0 +1,206 @@
+import ipaddress
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from dns_probe import query_resolvers, QTYPE_PTR
+
+DEFAULT_HOP_NAMES_FILE_NAME = "hop_names.json"
+
+
+def default_hop_names_path(config_manager):
+    """PTR cache file from [Traceroute] HopNamesCache, defaulting to a file next to config.ini."""
+    path = config_manager.get_setting('Traceroute', 'HopNamesCache')
+    if path:
+        return path
+    return os.path.join(os.path.dirname(config_manager.config_file_path), DEFAULT_HOP_NAMES_FILE_NAME)
+
+
+def _reverse_name(ip):
+    try:
+        return ipaddress.ip_address(ip).reverse_pointer
+    except ValueError:
+        return None # Not an address, e.g. a timed-out hop
+
+
+def _valid_entry(entry):
+    """True for a cache file row of [ip, name or null, expires_at]."""
+    return (isinstance(entry, list) and len(entry) == 3 and isinstance(entry[0], str)
+            and (entry[1] is None or isinstance(entry[1], str))
+            and isinstance(entry[2], (int, float)) and not isinstance(entry[2], bool))
+
+
+class PtrCache:
+    """LRU cache of reverse-DNS names with per-entry expiry, optionally persisted as JSON.
+
+    Names are kept for their record TTL, capped at ``max_ttl`` seconds; addresses
+    without a PTR record (NXDOMAIN or an empty answer) are remembered for
+    ``negative_ttl`` seconds. Beyond ``max_entries`` the least recently used entry
+    is evicted. Expiry uses wall-clock time so entries survive restarts.
+    """
+
+    def __init__(self, path=None, max_entries=4096, max_ttl=86400, negative_ttl=3600):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_ttl = max_ttl
+        self.negative_ttl = negative_ttl
+        self._entries = OrderedDict() # ip -> (name or None, expires_at)
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as cache_file:
+                    entries = json.load(cache_file)
+                if not isinstance(entries, list):
+                    raise TypeError(f"expected a list, got {type(entries).__name__}")
+            except (OSError, ValueError, TypeError) as e:
+                print(f"Ignoring unreadable hop name cache {path}: {e}")
+                entries = []
+            now = time.time()
+            for entry in entries[-max_entries:]:
+                if not _valid_entry(entry):
+                    continue # Skip rows that were hand-edited or written by something else
+                ip, name, expires_at = entry
+                if expires_at > now:
+                    self._entries[ip] = (name, expires_at)
+
+    def get(self, ip):
+        """Returns (found, name); ``name`` is None for an address cached as having no PTR record."""
+        with self._lock:
+            entry = self._entries.get(ip)
+            if entry is None:
+                return False, None
+            if entry[1] <= time.time():
+                del self._entries[ip]
+                return False, None
+            self._entries.move_to_end(ip)
+            return True, entry[0]
+
+    def put(self, ip, name, ttl=None):
+        ttl = self.negative_ttl if name is None else min(ttl if ttl is not None else self.max_ttl, self.max_ttl)
+        with self._lock:
+            self._entries[ip] = (name, time.time() + ttl)
+            self._entries.move_to_end(ip)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            entries = [[ip, name, expires_at] for ip, (name, expires_at) in self._entries.items()]
+        temporary_path = f"{self.path}.tmp"
+        try:
+            with open(temporary_path, "w", encoding="utf-8") as cache_file:
+                json.dump(entries, cache_file, ensure_ascii=False)
+            os.replace(temporary_path, self.path)
+        except OSError as e:
+            print(f"Could not save hop name cache {self.path}: {e}")
+
+
+def lookup_ptr(ips, resolver, cache, timeout=1000):
+    """Resolves the PTR names of ``ips`` that are not cached, as one batch of concurrent queries.
+
+    Answers (and NXDOMAIN) are stored in ``cache``; addresses whose query timed
+    out are left uncached so they are retried next time. Returns {ip: name or None}
+    for every address now known to the cache.
+    """
+    names = {}
+    missing = {}
+    for ip in dict.fromkeys(ips):
+        found, name = cache.get(ip)
+        if found:
+            names[ip] = name
+        elif _reverse_name(ip):
+            missing[_reverse_name(ip)] = ip
+    if missing and resolver:
+        details = query_resolvers([resolver], list(missing), qtype=QTYPE_PTR, timeout=timeout)[resolver]
+        for reverse_name, ip in missing.items():
+            if reverse_name in details["answers"]:
+                name = details["answers"][reverse_name][0] if details["answers"][reverse_name] else None
+                cache.put(ip, name, details["ttls"].get(reverse_name))
+                names[ip] = name
+            elif details["errors"].get(reverse_name) == "NXDOMAIN":
+                cache.put(ip, None)
+                names[ip] = None
+        cache.save()
+    return names
+
+
+class HopNameResolver:
+    """Adds reverse-DNS names to traceroute hops, resolved while the trace runs.
+
+    ``prefetch`` is fed hop addresses while the trace runs; they are gathered for
+    ``batch_window`` seconds and looked up as one batch on a background thread.
+    ``annotate`` only reads the cache, so lookups never add latency to the trace.
+    Hops whose lookup was still in flight get their "name" set when it lands,
+    and ``on_name(host, hop)`` is then called from the lookup thread.
+    """
+
+    def __init__(self, resolver, cache, timeout=1000, batch_window=0.02, on_name=None):
+        self.resolver = resolver
+        self.cache = cache
+        self.timeout = timeout
+        self.batch_window = batch_window
+        self.on_name = on_name
+        self._pending = []
+        self._in_flight = set()
+        self._unnamed = {} # ip -> [(host, hop)] annotated before their lookup finished
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._batch_scheduled = False
+
+    def prefetch(self, ips):
+        with self._lock:
+            for ip in ips:
+                if ip not in self._in_flight and _reverse_name(ip) and not self.cache.get(ip)[0]:
+                    self._in_flight.add(ip)
+                    self._pending.append(ip)
+            if not self._pending or self._batch_scheduled:
+                return
+            self._batch_scheduled = True
+        threading.Thread(target=self._run_batch, name="ptr-lookup", daemon=True).start()
+
+    def _run_batch(self):
+        time.sleep(self.batch_window) # Hops of a parallel trace arrive within milliseconds of each other
+        with self._lock:
+            batch, self._pending = self._pending, []
+            self._batch_scheduled = False
+        try:
+            lookup_ptr(batch, self.resolver, self.cache, self.timeout)
+        except (OSError, ValueError) as e:
+            print(f"Reverse DNS lookup failed: {e}")
+        finally:
+            named = []
+            with self._lock:
+                self._in_flight.difference_update(batch)
+                for ip in batch:
+                    for host, hop in self._unnamed.pop(ip, ()):
+                        found, name = self.cache.get(ip)
+                        if found and name:
+                            hop["name"] = name
+                            named.append((host, hop))
+                self._idle.notify_all()
+            if self.on_name:
+                for host, hop in named:
+                    self.on_name(host, hop)
+
+    def annotate(self, hops, host=None):
+        """Sets "name" on every hop already in the cache; the rest are named once their lookup lands."""
+        self.prefetch([hop.get("ip") for hop in hops])
+        with self._lock:
+            for hop in hops:
+                found, name = self.cache.get(hop.get("ip"))
+                if found and name:
+                    hop["name"] = name
+                elif hop.get("ip") in self._in_flight:
+                    self._unnamed.setdefault(hop["ip"], []).append((host, hop))
+        return hops
+
+    def wait(self, timeout=None):
+        """Waits until no lookup is in flight; returns False if ``timeout`` seconds passed first."""
+        with self._lock:
+            return self._idle.wait_for(lambda: not self._in_flight and not self._batch_scheduled, timeout)
@@ -0,0 +1,128 @@
+"""Vectorized RTT statistics over many samples and many targets at once (requires NumPy).
+
+Samples are laid out as a 2-D float matrix, one row per target and one column
+per echo request, with NaN marking lost packets (rows shorter than the widest
+one are padded with NaN and those columns are not counted as sent).
+"""
+import warnings
+import numpy as np
+
+JITTER_GAIN = 1 / 16 # RFC 3550 section 6.4.1
+
+
+def to_matrix(rtt_lists):
+    """Builds the (targets x samples) matrix from per-target lists of RTTs (None = lost).
+
+    Returns (matrix, sent) where ``sent`` is the number of echo requests per row.
+    """
+    rtt_lists = list(rtt_lists)
+    sent = np.array([len(rtts) for rtts in rtt_lists], dtype=np.int64)
+    width = int(sent.max()) if len(sent) else 0
+    matrix = np.full((len(rtt_lists), width), np.nan)
+    for row, rtts in enumerate(rtt_lists):
+        matrix[row, :len(rtts)] = [np.nan if rtt is None else rtt for rtt in rtts]
+    return matrix, sent
+
+
+def jitter(matrix):
+    """RFC 3550 interarrival jitter per row, computed from consecutive received RTTs.
+
+    The estimator J += (|D| - J) / 16 is a recursive filter; unrolled it is a
+    weighted sum of |D| with weight (1/16) * (15/16)^k for the k-th newest
+    difference, which is evaluated for every row at once.
+    """
+    matrix = np.atleast_2d(matrix)
+    received = ~np.isnan(matrix)
+    # Index of the most recent received sample at or before each column
+    columns = np.where(received, np.arange(matrix.shape[1]), -1)
+    last_received = np.maximum.accumulate(columns, axis=1)
+    previous = np.concatenate([np.full((matrix.shape[0], 1), -1), last_received[:, :-1]], axis=1)
+    has_difference = received & (previous >= 0)
+    previous_values = np.take_along_axis(matrix, np.maximum(previous, 0), axis=1)
+    differences = np.where(has_difference, np.abs(matrix - previous_values), 0.0)
+
+    updates = np.cumsum(has_difference, axis=1)
+    newer_updates = updates[:, -1:] - updates
+    weights = np.where(has_difference, JITTER_GAIN * (1 - JITTER_GAIN) ** newer_updates, 0.0)
+    return (weights * differences).sum(axis=1)
+
+
+def loss_bursts(matrix, sent=None):
+    """Returns (burst_count, max_burst_length) per row for runs of consecutive lost packets."""
+    matrix = np.atleast_2d(matrix)
+    rows, width = matrix.shape
+    lost = np.isnan(matrix)
+    if sent is not None:
+        lost &= np.arange(width) < np.asarray(sent)[:, None]
+    # A False column on both sides keeps runs from crossing row boundaries
+    padded = np.zeros((rows, width + 2), dtype=np.int8)
+    padded[:, 1:-1] = lost
+    edges = np.diff(padded.ravel())
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    lengths = ends - starts
+    burst_rows = starts // (width + 2)
+    counts = np.bincount(burst_rows, minlength=rows)
+    longest = np.zeros(rows, dtype=np.int64)
+    np.maximum.at(longest, burst_rows, lengths)
+    return counts, longest
+
+
+def summarize(matrix, sent=None, percentiles=(50, 95, 99)):
+    """Computes per-row statistics for a (targets x samples) RTT matrix.
+
+    Returns a dict of 1-D arrays: sent, received, loss_percent, min, avg, max,
+    stddev, jitter, loss_bursts, max_loss_burst and p<N> for each percentile.
+    Rows without any reply get NaN for the latency statistics.
+    """
+    matrix = np.atleast_2d(np.asarray(matrix, dtype=float))
+    if sent is None:
+        sent = np.full(matrix.shape[0], matrix.shape[1])
+    sent = np.asarray(sent)
+    received = (~np.isnan(matrix)).sum(axis=1)
+    bursts, longest_burst = loss_bursts(matrix, sent)
+
+    with warnings.catch_warnings():
+        # All-NaN rows (targets that never answered) legitimately produce NaN
+        warnings.simplefilter("ignore", RuntimeWarning)
+        stats = {
+            "sent": sent,
+            "received": received,
+            "loss_percent": np.where(sent > 0, 100.0 * (sent - received) / np.maximum(sent, 1), np.nan),
+            "min": np.nanmin(matrix, axis=1),
+            "avg": np.nanmean(matrix, axis=1),
+            "max": np.nanmax(matrix, axis=1),
+            "stddev": np.nanstd(matrix, axis=1),
+            "jitter": np.where(received > 1, jitter(matrix), np.nan),
+            "loss_bursts": bursts,
+            "max_loss_burst": longest_burst,
+        }
+    # One sort serves every percentile; NaNs sort to the end of each row
+    ordered = np.sort(matrix, axis=1)
+    last = np.maximum(received - 1, 0)[:, None]
+    for percentile in percentiles:
+        # Linear interpolation between closest ranks, as numpy.percentile does
+        position = last * (percentile / 100)
+        lower = np.floor(position).astype(np.int64)
+        upper = np.ceil(position).astype(np.int64)
+        low_values = np.take_along_axis(ordered, lower, axis=1)[:, 0]
+        high_values = np.take_along_axis(ordered, upper, axis=1)[:, 0]
+        values = low_values + (high_values - low_values) * (position - lower)[:, 0]
+        stats[f"p{percentile}"] = np.where(received > 0, values, np.nan)
+    return stats
+
+
+def summarize_rtts(rtts):
+    """Statistics for a single ping_host ``rtts`` list as plain Python floats (None if undefined)."""
+    matrix, sent = to_matrix([rtts])
+    return rows_to_dicts(summarize(matrix, sent))[0]
+
+
+def rows_to_dicts(stats):
+    """Splits summarize() output into one dict of Python numbers per row (NaN becomes None)."""
+    columns = {key: values.tolist() for key, values in stats.items()}
+    rows = []
+    for row in range(len(columns["sent"])):
+        values = {key: column[row] for key, column in columns.items()}
+        rows.append({key: None if value != value else value for key, value in values.items()}) # NaN != NaN
+    return rows
@@ -1,5 +1,5 @@
-from PySide6.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, QGroupBox, QFormLayout
-from config_manager import ConfigurationManager
+from PySide6.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, QGroupBox, QFormLayout, QMessageBox
+from config_manager import ConfigurationManager, ConfigError
 
 class SettingsWindow(QDialog):
     def __init__(self, config_manager: ConfigurationManager, parent=None):
@@ -69,17 +69,16 @@ class SettingsWindow(QDialog):
         self.settings_fields['TracertMaxHops'].setText(self.config_manager.get_setting('TestParameters', 'TracertMaxHops'))
 
     def _save_settings(self):
-        # Save Network Settings
-        self.config_manager.set_setting('NetworkSettings', 'GatewayIP', self.settings_fields['GatewayIP'].text())
-        self.config_manager.set_setting('NetworkSettings', 'PrimaryDNS', self.settings_fields['PrimaryDNS'].text())
-        self.config_manager.set_setting('NetworkSettings', 'SecondaryDNS', self.settings_fields['SecondaryDNS'].text())
-        self.config_manager.set_setting('NetworkSettings', 'InternalServerIP', self.settings_fields['InternalServerIP'].text())
-        self.config_manager.set_setting('NetworkSettings', 'TestWebsite', self.settings_fields['TestWebsite'].text())
+        network_keys = ('GatewayIP', 'PrimaryDNS', 'SecondaryDNS', 'InternalServerIP', 'TestWebsite')
+        test_parameter_keys = ('PingCount', 'PingTimeout', 'TracertMaxHops')
+        settings = {
+            'NetworkSettings': {key: self.settings_fields[key].text() for key in network_keys},
+            'TestParameters': {key: self.settings_fields[key].text() for key in test_parameter_keys},
+        }
 
-        # Save Test Parameters
-        self.config_manager.set_setting('TestParameters', 'PingCount', self.settings_fields['PingCount'].text())
-        self.config_manager.set_setting('TestParameters', 'PingTimeout', self.settings_fields['PingTimeout'].text())
-        self.config_manager.set_setting('TestParameters', 'TracertMaxHops', self.settings_fields['TracertMaxHops'].text())
-
-        self.config_manager.save_config()
+        try:
+            self.config_manager.update_settings(settings) # Validated before anything is changed
+        except ConfigError as e:
+            QMessageBox.warning(self, "設定錯誤", str(e)) # Keep the dialog open so the value can be corrected
+            return
         self.accept() # accept closes the dialog with QDialog.Accepted
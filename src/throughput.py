@@ -0,0 +1,414 @@
+"""iperf-like throughput and path-MTU tests against the bundled ThroughputServer.
+
+Each test opens a TCP control connection to the server and sends one JSON line:
+
+    {"mode": "upload", "duration": s}    the client streams data for ``duration``
+                                         seconds, then the server replies
+                                         {"bytes", "seconds"} as it measured them
+    {"mode": "download", "duration": s}  the server streams data for ``duration`` seconds
+    {"mode": "udp", "test_id": n}        the server replies {"ready": true}, counts the
+                                         test's datagrams sent to its UDP port (same port
+                                         number) and, after the client sends
+                                         {"sent": n}, replies with loss and jitter
+
+UDP datagrams start with HEADER: kind, test id, sequence number and send time.
+MTU probes are echoed back as a bare header. Bulk data is sent with
+socket.sendfile from a preallocated file and received with recv_into into one
+reused buffer, so neither side copies payload through Python.
+"""
+import errno
+import json
+import os
+import random
+import select
+import socket
+import socketserver
+import struct
+import sys
+import tempfile
+import threading
+import time
+from cancellation import is_cancelled, on_cancel, CANCEL_POLL_INTERVAL
+from dns_probe import parse_resolver
+
+DEFAULT_THROUGHPUT_PORT = 5201
+MAX_DURATION = 30 # Seconds a client may ask the server to stream for
+PAYLOAD_SIZE = 1 << 20 # Bytes of the file bulk data is sent from, one sendfile call each
+RECV_BUFFER_SIZE = 1 << 18
+UDP_BUFFER_SIZE = 65536
+HEADER = struct.Struct("!BQIq") # kind, test id, sequence number, send time (ns)
+KIND_DATA = 1
+KIND_MTU_PROBE = 2
+UDP_DRAIN_TIME = 0.25 # Seconds the server waits for datagrams still in flight after the client is done
+
+# Don't-fragment socket options; the socket module does not export them everywhere
+IP_MTU_DISCOVER, IP_PMTUDISC_DO, IP_MTU = 10, 2, 14 # Linux
+IPV6_MTU_DISCOVER, IPV6_PMTUDISC_DO, IPV6_MTU = 23, 2, 24 # Linux
+IP_DONTFRAGMENT = 14 # Windows
+IP_DONTFRAG = 28 # macOS
+WSAEMSGSIZE = 10040
+
+_payload_file = None
+_payload_lock = threading.Lock()
+
+
+def _payload():
+    """A temporary file of PAYLOAD_SIZE random bytes (incompressible), created once per process."""
+    global _payload_file
+    with _payload_lock:
+        if _payload_file is None:
+            _payload_file = tempfile.TemporaryFile()
+            _payload_file.write(os.urandom(PAYLOAD_SIZE))
+            _payload_file.flush()
+        return _payload_file
+
+
+def _send_for(sock, duration):
+    """Streams the payload file over ``sock`` with sendfile for ``duration`` seconds; returns bytes sent."""
+    payload = _payload()
+    sent = 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline and not is_cancelled():
+        sent += sock.sendfile(payload, 0, PAYLOAD_SIZE)
+    return sent
+
+
+def _receive_all(sock):
+    """Reads until the peer closes; returns (bytes, seconds from first to last byte)."""
+    view = memoryview(bytearray(RECV_BUFFER_SIZE))
+    received = 0
+    first = last = None
+    while True:
+        count = sock.recv_into(view)
+        if not count:
+            break
+        last = time.perf_counter()
+        if first is None:
+            first = last
+        received += count
+    return received, (last - first) if first is not None else 0.0
+
+
+def _read_line(sock, limit=4096):
+    """Reads one newline-terminated line byte by byte, so no bulk data after it is consumed."""
+    line = bytearray()
+    while len(line) < limit:
+        byte = sock.recv(1)
+        if not byte or byte == b"\n":
+            break
+        line += byte
+    return bytes(line)
+
+
+def _send_json(sock, body):
+    sock.sendall(json.dumps(body).encode("utf-8") + b"\n")
+
+
+class _UdpTest:
+    """Receiver-side statistics of one UDP test; jitter as in RFC 3550 (section 6.4.1)."""
+
+    def __init__(self):
+        self.received = 0
+        self.out_of_order = 0
+        self.highest_seq = -1
+        self.jitter_ns = 0.0
+        self._last_transit = None
+
+    def add(self, seq, sent_ns, received_ns):
+        self.received += 1
+        if seq < self.highest_seq:
+            self.out_of_order += 1
+        self.highest_seq = max(self.highest_seq, seq)
+        transit = received_ns - sent_ns # Clock offset between the hosts cancels out in the difference
+        if self._last_transit is not None:
+            self.jitter_ns += (abs(transit - self._last_transit) - self.jitter_ns) / 16
+        self._last_transit = transit
+
+
+class _ThroughputRequestHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        sock = self.request
+        try:
+            request = json.loads(_read_line(sock) or b"{}")
+            mode = request.get("mode")
+            if mode == "upload":
+                received, seconds = _receive_all(sock)
+                _send_json(sock, {"bytes": received, "seconds": seconds})
+            elif mode == "download":
+                _send_for(sock, min(float(request.get("duration", 3)), MAX_DURATION))
+                sock.shutdown(socket.SHUT_WR)
+            elif mode == "udp":
+                self._handle_udp(sock, int(request["test_id"]))
+            else:
+                _send_json(sock, {"error": f"unknown mode: {mode}"})
+        except (OSError, ValueError, KeyError, TypeError):
+            pass # Client went away or sent garbage; nothing to report to
+
+    def _handle_udp(self, sock, test_id):
+        server = self.server
+        with server.udp_lock:
+            server.udp_tests[test_id] = _UdpTest()
+        try:
+            _send_json(sock, {"ready": True})
+            done = json.loads(_read_line(sock) or b"{}")
+            time.sleep(UDP_DRAIN_TIME)
+            with server.udp_lock:
+                test = server.udp_tests[test_id]
+                stats = {"received": test.received, "out_of_order": test.out_of_order,
+                         "jitter_ms": test.jitter_ns / 1e6}
+            sent = int(done.get("sent", 0))
+            stats["sent"] = sent
+            stats["loss_percent"] = 100 * max(sent - stats["received"], 0) / sent if sent else 0.0
+            _send_json(sock, stats)
+        finally:
+            with server.udp_lock:
+                server.udp_tests.pop(test_id, None)
+
+
+class ThroughputServer(socketserver.ThreadingTCPServer):
+    """Bundled test server: TCP control/bulk connections plus a UDP socket on the same port.
+
+    ``start()`` serves both on daemon threads; ``close()`` stops them.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address=("127.0.0.1", DEFAULT_THROUGHPUT_PORT)):
+        self.address_family = socket.AF_INET6 if ":" in address[0] else socket.AF_INET
+        super().__init__(address, _ThroughputRequestHandler)
+        self.udp_socket = socket.socket(self.address_family, socket.SOCK_DGRAM)
+        self.udp_socket.bind(self.server_address[:2])
+        self.udp_tests = {} # test id -> _UdpTest
+        self.udp_lock = threading.Lock()
+        self._closed = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name="throughput-tcp", daemon=True).start()
+        threading.Thread(target=self._serve_udp, name="throughput-udp", daemon=True).start()
+        return self
+
+    def _serve_udp(self):
+        view = memoryview(bytearray(UDP_BUFFER_SIZE))
+        while not self._closed.is_set():
+            readable, _, _ = select.select([self.udp_socket], [], [], CANCEL_POLL_INTERVAL)
+            if not readable:
+                continue
+            try:
+                count, sender = self.udp_socket.recvfrom_into(view)
+            except OSError:
+                continue
+            received_ns = time.perf_counter_ns()
+            if count < HEADER.size:
+                continue
+            kind, test_id, seq, sent_ns = HEADER.unpack_from(view)
+            if kind == KIND_MTU_PROBE:
+                try:
+                    self.udp_socket.sendto(view[:HEADER.size], sender)
+                except OSError:
+                    pass
+            elif kind == KIND_DATA:
+                with self.udp_lock:
+                    test = self.udp_tests.get(test_id)
+                    if test:
+                        test.add(seq, sent_ns, received_ns)
+
+    def close(self):
+        self._closed.set()
+        self.shutdown()
+        self.server_close()
+        self.udp_socket.close()
+
+
+def _connect(server, timeout):
+    host, port = parse_resolver(server, DEFAULT_THROUGHPUT_PORT)
+    family, _, _, _, address = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)[0]
+    sock = socket.create_connection(address[:2], timeout=timeout)
+    return sock, family, address
+
+
+def tcp_upload(server, duration=3, timeout=5000):
+    """Streams to the server for ``duration`` seconds; returns Mbit/s as measured by the server."""
+    sock = _connect(server, timeout / 1000)[0]
+    with sock, on_cancel(sock.close):
+        _send_json(sock, {"mode": "upload", "duration": duration})
+        _send_for(sock, duration)
+        sock.shutdown(socket.SHUT_WR)
+        reply = json.loads(_read_line(sock) or b"{}")
+    if not reply.get("seconds"):
+        raise OSError("伺服器未回報接收量")
+    return reply["bytes"] * 8 / reply["seconds"] / 1e6
+
+
+def tcp_download(server, duration=3, timeout=5000):
+    """Has the server stream to us for ``duration`` seconds; returns Mbit/s."""
+    sock = _connect(server, timeout / 1000)[0]
+    with sock, on_cancel(sock.close):
+        _send_json(sock, {"mode": "download", "duration": duration})
+        received, seconds = _receive_all(sock)
+    if not seconds:
+        raise OSError("未收到任何資料")
+    return received * 8 / seconds / 1e6
+
+
+def udp_test(server, duration=3, bitrate=10_000_000, size=1200, timeout=5000):
+    """Sends ``size``-byte datagrams at ``bitrate`` bit/s for ``duration`` seconds.
+
+    Returns the server's count as {"sent", "received", "loss_percent", "jitter_ms",
+    "out_of_order"} plus the achieved "bitrate_mbps".
+    """
+    control, family, address = _connect(server, timeout / 1000)
+    with control, on_cancel(control.close), socket.socket(family, socket.SOCK_DGRAM) as sock:
+        test_id = random.getrandbits(64)
+        _send_json(control, {"mode": "udp", "test_id": test_id})
+        if not json.loads(_read_line(control) or b"{}").get("ready"):
+            raise OSError("伺服器未接受 UDP 測試")
+        sock.connect(address)
+        buffer = bytearray(max(size, HEADER.size))
+        interval = len(buffer) * 8 / bitrate
+        sent = 0
+        started = time.perf_counter()
+        deadline = started + duration
+        while not is_cancelled():
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            due = started + sent * interval
+            if now < due:
+                time.sleep(min(due - now, CANCEL_POLL_INTERVAL))
+                continue
+            HEADER.pack_into(buffer, 0, KIND_DATA, test_id, sent, time.perf_counter_ns())
+            try:
+                sock.send(buffer)
+            except OSError as e:
+                if e.errno != errno.ENOBUFS:
+                    raise
+            sent += 1 # A datagram dropped by our own full send queue still counts as lost
+        elapsed = time.perf_counter() - started
+        _send_json(control, {"sent": sent})
+        stats = json.loads(_read_line(control) or b"{}")
+    if "received" not in stats:
+        raise OSError("伺服器未回報 UDP 統計")
+    stats["bitrate_mbps"] = sent * len(buffer) * 8 / elapsed / 1e6 if elapsed else 0.0
+    return stats
+
+
+def throughput_test(server, duration=3, udp_bitrate=10_000_000, udp_size=1200, timeout=5000):
+    """Runs TCP upload, TCP download and a UDP test at ``udp_bitrate`` against a ThroughputServer.
+
+    Returns {"success", "error", "upload_mbps", "download_mbps", "udp"}; parts that
+    failed are None and the first failure is the error.
+    """
+    result = {"success": False, "error": "", "upload_mbps": None, "download_mbps": None, "udp": None}
+    errors = []
+    for field, func, kwargs in (("upload_mbps", tcp_upload, {}), ("download_mbps", tcp_download, {}),
+                                ("udp", udp_test, {"bitrate": udp_bitrate, "size": udp_size})):
+        if is_cancelled():
+            errors.append("已取消")
+            break
+        try:
+            result[field] = func(server, duration=duration, timeout=timeout, **kwargs)
+        except socket.gaierror:
+            result["error"] = "無法找到主機"
+            return result
+        except (OSError, ValueError) as e:
+            if is_cancelled():
+                errors.append("已取消")
+                break
+            errors.append("連線逾時" if isinstance(e, socket.timeout) else str(e))
+    result["success"] = not errors
+    result["error"] = errors[0] if errors else ""
+    return result
+
+
+def _set_dont_fragment(sock, family):
+    """Sets DF on ``sock``; returns the getsockopt arguments for the kernel's path MTU, or None."""
+    if sys.platform.startswith("linux"):
+        if family == socket.AF_INET6:
+            sock.setsockopt(socket.IPPROTO_IPV6, IPV6_MTU_DISCOVER, IPV6_PMTUDISC_DO)
+            return (socket.IPPROTO_IPV6, IPV6_MTU)
+        sock.setsockopt(socket.IPPROTO_IP, IP_MTU_DISCOVER, IP_PMTUDISC_DO)
+        return (socket.IPPROTO_IP, IP_MTU)
+    if family == socket.AF_INET6:
+        raise OSError("IPv6 不分段旗標僅支援 Linux")
+    sock.setsockopt(socket.IPPROTO_IP, IP_DONTFRAGMENT if sys.platform == "win32" else IP_DONTFRAG, 1)
+    return None
+
+
+def path_mtu_probe(server, timeout=500, retries=2):
+    """Finds the largest packet that reaches the ThroughputServer unfragmented.
+
+    Sends don't-fragment UDP probes of varying size, binary-searching on whether
+    the server echoes them. Returns {"success", "error", "mtu", "kernel_mtu",
+    "probes"}: "mtu" is the IP packet size including headers, "kernel_mtu" the
+    path MTU the OS has learned (None where it cannot be read).
+    """
+    result = {"success": False, "error": "", "mtu": None, "kernel_mtu": None, "probes": 0}
+    try:
+        host, port = parse_resolver(server, DEFAULT_THROUGHPUT_PORT)
+        family, _, _, _, address = socket.getaddrinfo(host, port, type=socket.SOCK_DGRAM)[0]
+    except (socket.gaierror, UnicodeError):
+        result["error"] = "無法找到主機"
+        return result
+    overhead = (40 if family == socket.AF_INET6 else 20) + 8 # IP + UDP headers
+    with socket.socket(family, socket.SOCK_DGRAM) as sock, on_cancel(sock.close):
+        try:
+            mtu_option = _set_dont_fragment(sock, family)
+        except OSError as e:
+            result["error"] = f"無法設定不分段旗標: {e}"
+            return result
+        sock.connect(address)
+        sock.settimeout(timeout / 1000)
+        view = memoryview(bytearray(UDP_BUFFER_SIZE))
+        test_id = random.getrandbits(64)
+
+        def _kernel_mtu():
+            try:
+                return sock.getsockopt(*mtu_option) if mtu_option else None
+            except OSError:
+                return None
+
+        def _fits(payload_size):
+            for attempt in range(retries):
+                if is_cancelled():
+                    return False
+                result["probes"] += 1
+                HEADER.pack_into(view, 0, KIND_MTU_PROBE, test_id, result["probes"], 0)
+                try:
+                    sock.send(view[:payload_size])
+                    while True:
+                        count = sock.recv_into(view[HEADER.size:2 * HEADER.size])
+                        if count >= HEADER.size and HEADER.unpack_from(view, HEADER.size)[2] == result["probes"]:
+                            return True
+                except socket.timeout:
+                    continue
+                except OSError as e:
+                    if e.errno == errno.EMSGSIZE or getattr(e, "winerror", None) == WSAEMSGSIZE:
+                        return False # Larger than the path MTU the OS already knows about
+                    raise
+            return False
+
+        try:
+            low = HEADER.size # Largest size known to fit
+            if not _fits(low):
+                result["error"] = "伺服器無回應"
+                return result
+            high = min(_kernel_mtu() or 65535, 65535) - overhead + 1 # Smallest size known not to fit
+            while high - low > 1:
+                middle = (low + high) // 2
+                if _fits(middle):
+                    low = middle
+                else:
+                    high = middle
+                    kernel_mtu = _kernel_mtu() # An ICMP "fragmentation needed" lowers this at once
+                    if kernel_mtu:
+                        high = max(min(high, kernel_mtu - overhead + 1), low + 1)
+        except OSError as e:
+            result["error"] = "已取消" if is_cancelled() else str(e)
+            return result
+        result["kernel_mtu"] = _kernel_mtu()
+    result["mtu"] = low + overhead
+    result["success"] = not is_cancelled()
+    if is_cancelled():
+        result["error"] = "已取消"
+    return result
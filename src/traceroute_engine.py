@@ -0,0 +1,243 @@
+import itertools
+import os
+import select
+import socket
+import struct
+import time
+from cancellation import is_cancelled, CANCEL_POLL_INTERVAL
+from icmp_engine import icmp_checksum, ICMP_ECHO_REPLY, ICMP_ECHO_REQUEST, ICMP_DEST_UNREACHABLE, ICMP_TIME_EXCEEDED
+
+IP_RECVERR = getattr(socket, "IP_RECVERR", 11)
+MSG_ERRQUEUE = getattr(socket, "MSG_ERRQUEUE", 0x2000)
+SO_EE_ORIGIN_ICMP = 2
+
+HOP_TIMED_OUT = "要求等候逾時" # "ip" of a hop that never answered
+
+_PAYLOAD = bytes(range(2, 32))
+_identifiers = itertools.count(os.getpid())
+
+
+class TracerouteError(Exception):
+    pass
+
+
+def _open_socket():
+    """Opens an unprivileged ICMP datagram socket with IP_RECVERR, or a raw socket."""
+    try:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP)
+        # Time Exceeded / Unreachable for datagram sockets are delivered on the error queue
+        sock.setsockopt(socket.SOL_IP, IP_RECVERR, 1)
+        return sock, False
+    except OSError:
+        return socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_ICMP), True
+
+
+def _echo_packet(identifier, seq):
+    # Paris-traceroute style: the first payload word compensates for the sequence
+    # number so every probe carries the same identifier AND checksum, keeping all
+    # TTLs on one ECMP flow while the sequence still identifies the probe.
+    payload = struct.pack("!H", ~seq & 0xFFFF) + _PAYLOAD
+    header = struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, 0, identifier, seq)
+    checksum = icmp_checksum(header + payload)
+    return struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, checksum, identifier, seq) + payload
+
+
+def _format_latency(rtt):
+    return f"{rtt:.3f}ms"
+
+
+def _resolve(host):
+    try:
+        return socket.getaddrinfo(host, None, socket.AF_INET)[0][4][0]
+    except (socket.gaierror, UnicodeError) as e:
+        raise TracerouteError(f"無法找到主機: {host}") from e
+
+
+def trace_hops(host, max_hops=30, timeout=1000, probes=3, first_ttl=1):
+    """Traces the route to a host by probing every TTL at once, yielding hops as replies arrive.
+
+    Intermediate hops are yielded as soon as their first Time Exceeded reply is
+    received, so they come out in arrival order rather than by hop number. Once
+    all probes are answered or ``timeout`` ms have passed since the last probe
+    was sent, the destination hop and timed-out hops below it are yielded.
+    Each hop is a dict with ``num``, ``ip`` and ``latency`` like ``tracert_host``.
+    TTLs below ``first_ttl`` are neither probed nor reported.
+    Raises TracerouteError if the host cannot be resolved and OSError if no ICMP
+    socket can be opened. Stops without yielding further hops if the current task
+    is cancelled.
+    """
+    address = _resolve(host)
+    sock, raw = _open_socket()
+    identifier = next(_identifiers) & 0xFFFF
+    sent = {} # seq -> (ttl, sent_at)
+    answered = {} # ttl -> hop dict (intermediate hops)
+    destination = None # hop dict for the lowest TTL answered by the target itself
+    try:
+        for ttl in range(first_ttl, max_hops + 1):
+            sock.setsockopt(socket.IPPROTO_IP, socket.IP_TTL, ttl)
+            for probe in range(probes):
+                seq = (ttl - 1) * probes + probe + 1
+                sent[seq] = (ttl, time.perf_counter())
+                sock.sendto(_echo_packet(identifier, seq), (address, 0))
+        deadline = time.perf_counter() + timeout / 1000
+
+        while True:
+            if destination is not None and all(ttl in answered for ttl in range(first_ttl, destination["num"])):
+                break
+            if is_cancelled():
+                return
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            readable, _, _ = select.select([sock], [], [], min(remaining, CANCEL_POLL_INTERVAL))
+            if not readable:
+                continue
+            for kind, ip, seq, received_at in _read_replies(sock, raw, identifier):
+                if seq not in sent:
+                    continue
+                ttl, sent_at = sent[seq]
+                hop = {"num": ttl, "ip": ip, "latency": _format_latency((received_at - sent_at) * 1000)}
+                if kind == ICMP_TIME_EXCEEDED:
+                    if ttl not in answered:
+                        answered[ttl] = hop
+                        yield hop
+                elif destination is None or ttl < destination["num"]:
+                    # Echo reply or unreachable from the target ends the path at this TTL
+                    destination = hop
+    finally:
+        sock.close()
+
+    last_hop = destination["num"] if destination else max_hops + 1
+    for ttl in range(first_ttl, last_hop):
+        if ttl not in answered:
+            yield {"num": ttl, "ip": HOP_TIMED_OUT, "latency": "N/A"}
+    if destination:
+        yield destination
+
+
+def probe_ttls(address, ttls, timeout=1000):
+    """Sends one probe per TTL in ``ttls`` to an already resolved address.
+
+    Returns {ttl: (hop, reached)} for every TTL that answered within ``timeout``
+    ms, where ``reached`` is True if the target itself answered rather than a
+    router on the way. Returns as soon as every TTL has answered.
+    """
+    sock, raw = _open_socket()
+    identifier = next(_identifiers) & 0xFFFF
+    sent = {} # seq -> (ttl, sent_at)
+    answers = {}
+    try:
+        for seq, ttl in enumerate(ttls, start=1):
+            sock.setsockopt(socket.IPPROTO_IP, socket.IP_TTL, ttl)
+            sent[seq] = (ttl, time.perf_counter())
+            sock.sendto(_echo_packet(identifier, seq), (address, 0))
+        deadline = time.perf_counter() + timeout / 1000
+
+        while len(answers) < len(sent) and not is_cancelled():
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            readable, _, _ = select.select([sock], [], [], min(remaining, CANCEL_POLL_INTERVAL))
+            if not readable:
+                continue
+            for kind, ip, seq, received_at in _read_replies(sock, raw, identifier):
+                if seq not in sent or sent[seq][0] in answers:
+                    continue
+                ttl, sent_at = sent[seq]
+                hop = {"num": ttl, "ip": ip, "latency": _format_latency((received_at - sent_at) * 1000)}
+                answers[ttl] = (hop, kind != ICMP_TIME_EXCEEDED)
+    finally:
+        sock.close()
+    return answers
+
+
+def trace_incremental(host, cached_hops, max_hops=30, timeout=1000, probes=3):
+    """Traces the route to a host starting from the last known path, yielding hops like trace_hops.
+
+    Every hop of ``cached_hops`` that answered last time is verified with a
+    single probe, all at once; hops that did not answer last time are assumed
+    to still be silent. The path is re-probed in full (``probes`` per TTL) only
+    from the first hop whose responder differs, so an unchanged route costs one
+    probe per hop and one round trip. Raises like trace_hops.
+    """
+    address = _resolve(host)
+    cached = sorted((hop for hop in cached_hops if isinstance(hop.get("num"), int) and hop["num"] <= max_hops),
+                    key=lambda hop: hop["num"])
+    if not cached or cached[-1]["ip"] == HOP_TIMED_OUT:
+        # The last trace never reached the target, so there is no path worth verifying
+        yield from trace_hops(address, max_hops=max_hops, timeout=timeout, probes=probes)
+        return
+    answers = probe_ttls(address, [hop["num"] for hop in cached if hop["ip"] != HOP_TIMED_OUT], timeout)
+
+    for hop in cached:
+        ttl = hop["num"]
+        if hop["ip"] == HOP_TIMED_OUT:
+            yield hop
+            continue
+        if ttl not in answers:
+            break # Silent now: re-probe from here in case the route moved
+        answer, reached = answers[ttl]
+        if answer["ip"] != hop["ip"]:
+            break
+        yield answer
+        if reached:
+            return # Path unchanged up to the target
+    else:
+        # Every cached hop still answers as before but the target was not reached: continue past the last one
+        ttl = cached[-1]["num"] + 1
+    if is_cancelled():
+        return
+    yield from trace_hops(address, max_hops=max_hops, timeout=timeout, probes=probes, first_ttl=ttl)
+
+
+def _read_replies(sock, raw, identifier):
+    """Drains the socket, returning (icmp_type, responder_ip, seq, received_at) tuples."""
+    replies = []
+    while True:
+        try:
+            data, responder = sock.recvfrom(2048, socket.MSG_DONTWAIT)
+        except BlockingIOError:
+            break
+        except OSError:
+            # A pending ICMP error on a datagram socket surfaces here; read the error queue below
+            break
+        received_at = time.perf_counter()
+        if raw:
+            data = data[(data[0] & 0x0F) * 4:]
+        if len(data) < 8:
+            continue
+        icmp_type, _, _, reply_id, seq = struct.unpack("!BBHHH", data[:8])
+        if icmp_type == ICMP_ECHO_REPLY:
+            if raw and reply_id != identifier:
+                continue
+            replies.append((ICMP_ECHO_REPLY, responder[0], seq, received_at))
+        elif raw and icmp_type in (ICMP_TIME_EXCEEDED, ICMP_DEST_UNREACHABLE):
+            # Quoted original datagram: inner IP header followed by our echo header
+            inner = data[8:]
+            if not inner:
+                continue
+            inner = inner[(inner[0] & 0x0F) * 4:]
+            if len(inner) < 8:
+                continue
+            _, _, _, quoted_id, seq = struct.unpack("!BBHHH", inner[:8])
+            if quoted_id == identifier:
+                replies.append((icmp_type, responder[0], seq, received_at))
+
+    if not raw:
+        while True:
+            try:
+                data, ancdata, _, _ = sock.recvmsg(2048, 512, MSG_ERRQUEUE | socket.MSG_DONTWAIT)
+            except (BlockingIOError, InterruptedError):
+                break
+            received_at = time.perf_counter()
+            for level, cmsg_type, cmsg_data in ancdata:
+                if level != socket.SOL_IP or cmsg_type != IP_RECVERR or len(cmsg_data) < 24:
+                    continue
+                # struct sock_extended_err followed by the offender's sockaddr_in
+                _, origin, ee_type, _, _, _, _ = struct.unpack("=IBBBBII", cmsg_data[:16])
+                if origin != SO_EE_ORIGIN_ICMP or len(data) < 8:
+                    continue
+                offender = socket.inet_ntoa(cmsg_data[20:24])
+                seq = struct.unpack("!H", data[6:8])[0]
+                replies.append((ee_type, offender, seq, received_at))
+    return replies
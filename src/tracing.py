@@ -0,0 +1,133 @@
+"""Timing spans for the diagnostic hot paths, exported as Chrome trace-event JSON.
+
+Tracing is off by default; ``span()`` then returns a shared no-op context
+manager, so an instrumented stage costs one global lookup. Between start() and
+stop() every span is appended to one list (list.append needs no lock) and can
+be written with write_chrome_trace() (open in chrome://tracing or Perfetto) or
+summarized per stage with format_summary().
+"""
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+
+_enabled = False
+_events = [] # (name, category, start_ns, end_ns, thread_id, args)
+_thread_names = {}
+_NULL_SPAN = contextlib.nullcontext()
+
+
+def enabled():
+    return _enabled
+
+
+def start():
+    """Discards earlier spans and starts recording."""
+    global _enabled, _events
+    _events = []
+    _enabled = True
+
+
+def stop():
+    """Stops recording and returns the recorded spans."""
+    global _enabled
+    _enabled = False
+    return list(_events)
+
+
+def now():
+    return time.perf_counter_ns()
+
+
+def record(name, category, start_ns, end_ns=None, **args):
+    """Records a span whose start was taken elsewhere, e.g. on another thread."""
+    if _enabled:
+        thread = threading.current_thread()
+        _thread_names[thread.ident] = thread.name
+        _events.append((name, category, start_ns, end_ns or time.perf_counter_ns(), thread.ident, args))
+
+
+class _Span:
+    __slots__ = ("name", "category", "args", "start_ns")
+
+    def __init__(self, name, category, args):
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        record(self.name, self.category, self.start_ns, **self.args)
+
+
+def span(name, category="", **args):
+    """Context manager timing the enclosed block as one span; a no-op while tracing is off."""
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name, category, args)
+
+
+def traced(name, category=""):
+    """Decorator timing every call of the function as a span."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Span(name, category, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def to_chrome_trace(events):
+    """Chrome trace-event JSON object ("X" complete events, microseconds) for ``events``."""
+    pid = os.getpid()
+    origin = min((event[2] for event in events), default=0)
+    trace_events = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": thread_id, "args": {"name": name}}
+                    for thread_id, name in _thread_names.items() if any(event[4] == thread_id for event in events)]
+    for name, category, start_ns, end_ns, thread_id, args in events:
+        trace_events.append({"name": name, "cat": category, "ph": "X", "pid": pid, "tid": thread_id,
+                             "ts": (start_ns - origin) / 1000, "dur": (end_ns - start_ns) / 1000,
+                             "args": {key: str(value) for key, value in args.items()}})
+    return {"traceEvents": trace_events, "displayTimeUnit": "ms"}
+
+
+def write_chrome_trace(path, events):
+    with open(path, "w", encoding="utf-8") as trace_file:
+        json.dump(to_chrome_trace(events), trace_file, ensure_ascii=False)
+
+
+def summarize(events):
+    """Per-stage totals, largest first: [{"name", "category", "count", "total", "mean", "max"}] in ms.
+
+    Spans on parallel threads overlap, so totals can add up to more than the run's wall time.
+    """
+    stages = {}
+    for name, category, start_ns, end_ns, _, _ in events:
+        stage = stages.setdefault(name, {"name": name, "category": category, "count": 0, "total": 0.0, "max": 0.0})
+        duration = (end_ns - start_ns) / 1e6
+        stage["count"] += 1
+        stage["total"] += duration
+        stage["max"] = max(stage["max"], duration)
+    for stage in stages.values():
+        stage["mean"] = stage["total"] / stage["count"]
+    return sorted(stages.values(), key=lambda stage: stage["total"], reverse=True)
+
+
+def format_summary(events):
+    """Plain-text table of summarize(events), with the wall time the spans cover."""
+    if not events:
+        return "No spans recorded."
+    wall = (max(event[3] for event in events) - min(event[2] for event in events)) / 1e6
+    lines = [f"{'stage':<28} {'category':<10} {'calls':>6} {'total ms':>10} {'mean ms':>9} {'max ms':>9}"]
+    for stage in summarize(events):
+        lines.append(f"{stage['name']:<28} {stage['category']:<10} {stage['count']:>6} {stage['total']:>10.1f} "
+                     f"{stage['mean']:>9.2f} {stage['max']:>9.2f}")
+    lines.append(f"wall time {wall:.1f} ms")
+    return "\n".join(lines)